@@ -0,0 +1 @@
+"""Load generation helpers behind test_pushing_log.py."""
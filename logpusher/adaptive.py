@@ -0,0 +1,89 @@
+"""AIMD concurrency limit, the way TCP congestion control sizes its window.
+
+The limit on requests in flight grows by about one per round trip (1/limit
+per successful response) while latency stays under the target, and is cut
+by `backoff` on a failed request or a response slower than the target.
+Responses to requests sent before a cut carry the old congestion signal, so
+after a decrease further decreases are ignored for one round trip.
+"""
+import threading
+import time
+
+
+class AimdLimit:
+    """Drop-in for the runner's semaphore whose size follows the responses."""
+
+    def __init__(self, target_latency, min_limit=1, max_limit=64, initial=None, backoff=0.5):
+        self.target_latency = target_latency
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.limit = float(initial if initial is not None else min_limit)
+        self.in_flight = 0
+        self.increases = 0
+        self.decreases = 0
+        self._hold_until = 0.0
+        self._started = time.monotonic()
+        self._last_change = self._started
+        self._area = 0.0  # integral of the limit over time, for the time-weighted mean
+        self.lowest = self.highest = self.limit
+        self._cond = threading.Condition()
+
+    @property
+    def current(self):
+        return int(self.limit)
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify()
+
+    def _set(self, limit, now):
+        self._area += self.limit * (now - self._last_change)
+        self._last_change = now
+        self.limit = limit
+        self.lowest = min(self.lowest, limit)
+        self.highest = max(self.highest, limit)
+
+    def update(self, latency, ok):
+        """Feed back one response; called before the request's slot is released."""
+        now = time.monotonic()
+        with self._cond:
+            if ok and latency <= self.target_latency:
+                if self.limit < self.max_limit:
+                    self._set(min(self.limit + 1 / self.limit, self.max_limit), now)
+                    self.increases += 1
+                    self._cond.notify_all()
+            elif now >= self._hold_until:
+                self._set(max(self.limit * self.backoff, self.min_limit), now)
+                self.decreases += 1
+                self._hold_until = now + max(latency, 0.001)
+
+    def summary(self):
+        with self._cond:
+            now = time.monotonic()
+            area = self._area + self.limit * (now - self._last_change)
+            elapsed = now - self._started
+            return {
+                "target_latency_ms": self.target_latency * 1000,
+                "final": self.current,
+                "min": int(self.lowest),
+                "max": int(self.highest),
+                "mean": area / elapsed if elapsed > 0 else self.limit,
+                "increases": self.increases,
+                "decreases": self.decreases,
+            }
+
+
+def print_limit_summary(summary):
+    print("=== Adaptive concurrency ===")
+    print(f"  target:       {summary['target_latency_ms']:.0f}ms")
+    print(f"  limit:        final {summary['final']}  min {summary['min']}  max {summary['max']}  "
+          f"time-weighted mean {summary['mean']:.1f}")
+    print(f"  adjustments:  {summary['increases']} increases, {summary['decreases']} decreases")
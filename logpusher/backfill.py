@@ -0,0 +1,106 @@
+"""Historical backfill: spread generated records over a past time range.
+
+Record `log_id` (1..num_logs) gets a `_timestamp` (microseconds) inside
+[start, end). How timestamps map onto the send order decides what the
+ingester and compactor see:
+
+- `partition`: ascending time, so hour partitions are filled one after
+  another, like a well-behaved backfill job.
+- `shuffled-partitions`: every batch covers a contiguous slice of time, but
+  slices are sent in random order, so hours are reopened out of order.
+- `random`: every record gets an independent random time, so each batch
+  touches many partitions (worst case for late data).
+"""
+import random
+import re
+from datetime import datetime, timedelta, timezone
+
+ORDERS = ("partition", "shuffled-partitions", "random")
+HOUR_US = 3600 * 1_000_000
+
+_RELATIVE = re.compile(r"^(?:now)?-(\d+(?:\.\d+)?)([smhd])$")
+_UNITS = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days"}
+
+
+def parse_time(text, now=None):
+    """ISO-8601 (naive means UTC), 'now', or relative like '-6h' / 'now-2d'."""
+    now = now or datetime.now(timezone.utc)
+    text = text.strip()
+    if text == "now":
+        return now
+    m = _RELATIVE.match(text)
+    if m:
+        return now - timedelta(**{_UNITS[m.group(2)]: float(m.group(1))})
+    parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+class Backfill:
+    def __init__(self, start, end, num_logs, batch_size, order="partition", rng=random):
+        if end <= start:
+            raise ValueError("backfill end must be after start")
+        if order not in ORDERS:
+            raise ValueError(f"unknown backfill order {order!r}")
+        self.start_us = int(start.timestamp() * 1_000_000)
+        self.end_us = int(end.timestamp() * 1_000_000)
+        self.num_logs = num_logs
+        self.batch_size = batch_size
+        self.order = order
+        self.rng = rng
+        self.step_us = (self.end_us - self.start_us) / num_logs
+        self._slots = None
+        if order == "shuffled-partitions":
+            self._slots = list(range((num_logs + batch_size - 1) // batch_size))
+            rng.shuffle(self._slots)
+        self.partitions = {}
+        # How often consecutive records land in a different hour than the one before.
+        self.switches = 0
+        self._last_hour = None
+
+    def timestamp(self, log_id):
+        index = log_id - 1
+        if self.order == "random":
+            ts = self.rng.randrange(self.start_us, self.end_us)
+        else:
+            if self._slots is not None:
+                batch, offset = divmod(index, self.batch_size)
+                index = self._slots[batch] * self.batch_size + offset
+            ts = self.start_us + int(index * self.step_us)
+        hour = ts // HOUR_US
+        self.partitions[hour] = self.partitions.get(hour, 0) + 1
+        if hour != self._last_hour:
+            self.switches += self._last_hour is not None
+            self._last_hour = hour
+        return ts
+
+    def wrap(self, make_record):
+        def make_backfill_record(log_id):
+            ts = self.timestamp(log_id)
+            # Timestamps inside the record body follow the backfilled time too.
+            record = make_record(log_id, now=datetime.fromtimestamp(ts / 1e6, timezone.utc))
+            record["_timestamp"] = ts
+            return record
+        return make_backfill_record
+
+    def summary(self):
+        fmt = "%Y-%m-%dT%H:%M:%SZ"
+        return {
+            "start": datetime.fromtimestamp(self.start_us / 1e6, timezone.utc).strftime(fmt),
+            "end": datetime.fromtimestamp(self.end_us / 1e6, timezone.utc).strftime(fmt),
+            "order": self.order,
+            "partition_switches": self.switches,
+            "partitions": {
+                datetime.fromtimestamp(hour * 3600, timezone.utc).strftime("%Y-%m-%dT%H"): count
+                for hour, count in sorted(self.partitions.items())
+            },
+        }
+
+
+def print_backfill_summary(summary):
+    partitions = summary["partitions"]
+    print("=== Backfill ===")
+    print(f"  range:        {summary['start']} .. {summary['end']} ({summary['order']})")
+    print(f"  partitions:   {len(partitions)} hours touched, {summary['partition_switches']} partition switches")
+    if partitions:
+        counts = list(partitions.values())
+        print(f"  per hour:     min {min(counts)}  max {max(counts)}  mean {sum(counts) / len(counts):.0f} records")
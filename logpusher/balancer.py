@@ -0,0 +1,141 @@
+"""Client-side load balancing across several ingester endpoints.
+
+Endpoints come from a list of base URLs, optionally expanded into one
+endpoint per A record of each hostname, so ingester tasks can be hit
+directly inside the VPC instead of through the ALB. Policies:
+
+- `round-robin`: endpoints in turn.
+- `least-outstanding`: the endpoint with the fewest requests in flight.
+- `p2c`: power of two choices; the less loaded of two random endpoints.
+
+Health is judged passively from responses, like outlier detection in
+Envoy: after `eject_after` consecutive retryable failures an endpoint is
+ejected for `eject_seconds`, doubling on every ejection in a row (up to
+`max_eject_seconds`). Once the time is up it is tried again, and a single
+success resets it. If every endpoint is ejected, all of them are used
+rather than none.
+"""
+import itertools
+import random
+import socket
+import threading
+import time
+from urllib.parse import urlparse, urlunparse
+
+from .senders import RETRYABLE
+
+POLICIES = ("round-robin", "least-outstanding", "p2c")
+
+
+def resolve_endpoints(urls):
+    """Expand each URL into one URL per IPv4 address its hostname resolves to."""
+    endpoints = []
+    for url in urls:
+        parsed = urlparse(url)
+        port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        addresses = sorted({info[4][0] for info in socket.getaddrinfo(parsed.hostname, port, socket.AF_INET,
+                                                                       socket.SOCK_STREAM)})
+        for address in addresses:
+            netloc = f"{address}:{parsed.port}" if parsed.port else address
+            endpoints.append(urlunparse(parsed._replace(netloc=netloc)))
+    return endpoints
+
+
+class Endpoint:
+    __slots__ = ("url", "outstanding", "requests", "failures", "consecutive_failures", "ejections",
+                 "ejected_until", "ejected_streak")
+
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+        self.ejected_streak = 0
+
+
+class Balancer:
+    def __init__(self, urls, policy="round-robin", eject_after=3, eject_seconds=10.0, max_eject_seconds=300.0,
+                 rng=random):
+        if not urls:
+            raise ValueError("no endpoints to balance across")
+        if policy not in POLICIES:
+            raise ValueError(f"unknown balancing policy {policy!r}")
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.policy = policy
+        self.eject_after = eject_after
+        self.eject_seconds = eject_seconds
+        self.max_eject_seconds = max_eject_seconds
+        self.rng = rng
+        self._next = itertools.count()
+        self._lock = threading.Lock()
+
+    def _healthy(self, now):
+        healthy = [e for e in self.endpoints if e.ejected_until <= now]
+        return healthy or self.endpoints
+
+    def acquire(self):
+        """Pick the endpoint for the next request; pair with `release`."""
+        with self._lock:
+            candidates = self._healthy(time.monotonic())
+            if self.policy == "round-robin" or len(candidates) == 1:
+                endpoint = candidates[next(self._next) % len(candidates)]
+            elif self.policy == "least-outstanding":
+                # Rotate the starting point so ties do not always go to the first endpoint.
+                start = next(self._next) % len(candidates)
+                rotated = candidates[start:] + candidates[:start]
+                endpoint = min(rotated, key=lambda e: e.outstanding)
+            else:
+                a, b = self.rng.sample(candidates, 2)
+                endpoint = a if a.outstanding <= b.outstanding else b
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def release(self, endpoint, ok, status):
+        with self._lock:
+            endpoint.outstanding -= 1
+            if ok:
+                endpoint.consecutive_failures = 0
+                endpoint.ejected_streak = 0
+                return
+            endpoint.failures += 1
+            if status not in RETRYABLE:
+                # 4xx says something about the request, not the endpoint's health.
+                return
+            now = time.monotonic()
+            if endpoint.ejected_until > now:
+                return  # a request sent before the ejection
+            endpoint.consecutive_failures += 1
+            # A failure while on probation (just back from ejection) ejects again straight away.
+            if endpoint.consecutive_failures >= self.eject_after or endpoint.ejected_streak:
+                seconds = min(self.eject_seconds * 2 ** endpoint.ejected_streak, self.max_eject_seconds)
+                endpoint.ejected_until = now + seconds
+                endpoint.ejected_streak += 1
+                endpoint.ejections += 1
+                endpoint.consecutive_failures = 0
+
+    def summary(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "policy": self.policy,
+                "endpoints": [{
+                    "url": e.url,
+                    "requests": e.requests,
+                    "failures": e.failures,
+                    "ejections": e.ejections,
+                    "ejected": e.ejected_until > now,
+                } for e in self.endpoints],
+            }
+
+
+def print_balancer_summary(summary):
+    print(f"=== Endpoints ({summary['policy']}) ===")
+    total = sum(e["requests"] for e in summary["endpoints"]) or 1
+    for e in summary["endpoints"]:
+        state = "  EJECTED" if e["ejected"] else ""
+        print(f"  {e['url']:<40} {e['requests']:>8} requests ({e['requests'] / total * 100:5.1f}%), "
+              f"{e['failures']} failed, {e['ejections']} ejections{state}")
@@ -0,0 +1,85 @@
+"""Reusable request-body buffers.
+
+Batch bodies are serialized in slices of records straight into a pooled,
+pre-allocated `bytearray` and handed to the transport as a `memoryview`, so
+a batch never exists as one big `str` plus an encoded `bytes` copy.
+Buffers keep their capacity between uses (slice assignment within the
+current length never reallocates) and only grow when a batch is larger than
+anything seen before.
+"""
+import json
+import threading
+
+_dumps = json.JSONEncoder().encode
+# Records serialized per encoder call.
+ENCODE_SLICE = 256
+
+
+class BufferPool:
+    """Free-list of bytearrays, pre-allocated up front."""
+
+    def __init__(self, count=1, size=1024 * 1024, max_free=None):
+        self.size = size
+        self.max_free = max_free if max_free is not None else max(count, 1)
+        self._free = [bytearray(size) for _ in range(count)]
+        self._lock = threading.Lock()
+        self.allocated = count
+        self.reused = 0
+        self.grown = 0
+
+    def acquire(self):
+        with self._lock:
+            if self._free:
+                self.reused += 1
+                return self._free.pop()
+            self.allocated += 1
+        return bytearray(self.size)
+
+    def release(self, buf):
+        with self._lock:
+            if len(self._free) < self.max_free:
+                self._free.append(buf)
+
+    def summary(self):
+        with self._lock:
+            return {"allocated": self.allocated, "reused": self.reused, "grown": self.grown,
+                    "capacity_bytes": sum(len(b) for b in self._free)}
+
+
+class Writer:
+    """Appends bytes into a pooled buffer, growing it geometrically when full."""
+
+    __slots__ = ("buf", "pos", "pool")
+
+    def __init__(self, buf, pool=None):
+        self.buf = buf
+        self.pos = 0
+        self.pool = pool
+
+    def write(self, data):
+        end = self.pos + len(data)
+        if end > len(self.buf):
+            self.buf.extend(bytes(max(end - len(self.buf), len(self.buf))))
+            if self.pool is not None:
+                self.pool.grown += 1
+        self.buf[self.pos:end] = data
+        self.pos = end
+
+    def view(self):
+        return memoryview(self.buf)[:self.pos]
+
+
+def encode_json_array_into(records, writer, slice_size=ENCODE_SLICE):
+    """Serialize records as a JSON array into writer, `slice_size` records at a time.
+
+    Encoding a slice in one call keeps the per-record Python overhead out of
+    the hot path while the temporary string stays small.
+    """
+    if not isinstance(records, list):
+        records = list(records)
+    writer.write(b"[")
+    for start in range(0, len(records), slice_size):
+        if start:
+            writer.write(b", ")
+        writer.write(_dumps(records[start:start + slice_size])[1:-1].encode("utf-8"))
+    writer.write(b"]")
@@ -0,0 +1,102 @@
+"""Maximum-sustainable-throughput search.
+
+Each step runs the workload at a fixed target rate: a short warm-up whose
+numbers are discarded, then a measured window. A step passes when, over the
+measured window, p99 latency and the error rate stay within the SLOs and
+the achieved rate is within `min_achieved` of the target (a client that
+cannot keep up, e.g. for lack of --concurrency, is not a pass).
+
+The rate is doubled from `start_eps` until a step fails (or `max_eps` is
+reached), then bisected between the last pass and the first failure until
+the gap is below `tolerance`.
+"""
+from .stats import RunStats
+
+
+class CapacitySearch:
+    def __init__(self, runner, make_record, p99_slo_ms, max_error_rate, step_seconds=30.0, warmup_seconds=5.0,
+                 start_eps=1000.0, max_eps=1_000_000.0, tolerance=0.05, min_achieved=0.95):
+        self.runner = runner
+        self.make_record = make_record
+        self.p99_slo_ms = p99_slo_ms
+        self.max_error_rate = max_error_rate
+        self.step_seconds = step_seconds
+        self.warmup_seconds = warmup_seconds
+        self.start_eps = start_eps
+        self.max_eps = max_eps
+        self.tolerance = tolerance
+        self.min_achieved = min_achieved
+        self.steps = []
+
+    def evaluate(self, eps):
+        self.runner.rate = eps
+        if self.warmup_seconds > 0:
+            self.runner.stats = RunStats()
+            self.runner.run(None, self.make_record, duration=self.warmup_seconds)
+        self.runner.stats = RunStats()
+        self.runner.run(None, self.make_record, duration=self.step_seconds)
+        summary = self.runner.stats.summary()
+
+        reasons = []
+        if summary["latency"]["p99_ms"] > self.p99_slo_ms:
+            reasons.append(f"p99 {summary['latency']['p99_ms']:.0f}ms > {self.p99_slo_ms:.0f}ms")
+        if summary["error_rate"] > self.max_error_rate:
+            reasons.append(f"errors {summary['error_rate'] * 100:.2f}% > {self.max_error_rate * 100:.2f}%")
+        # Failed records are offered load too; only delivered ones count towards the rate.
+        if summary["eps"] < eps * self.min_achieved:
+            reasons.append(f"achieved {summary['eps']:.0f} EPS < {self.min_achieved * 100:.0f}% of target")
+        step = {
+            "target_eps": eps,
+            "achieved_eps": summary["eps"],
+            "p99_ms": summary["latency"]["p99_ms"],
+            "error_rate": summary["error_rate"],
+            "passed": not reasons,
+            "reasons": reasons,
+        }
+        self.steps.append(step)
+        verdict = "PASS" if step["passed"] else "FAIL (" + "; ".join(reasons) + ")"
+        print(f"  step {len(self.steps):>2}: target {eps:>10.0f} EPS -> achieved {summary['eps']:>10.0f} EPS, "
+              f"p99 {summary['latency']['p99_ms']:>8.1f}ms, errors {summary['error_rate'] * 100:5.2f}%  {verdict}")
+        return step["passed"]
+
+    def search(self):
+        best = None      # highest passing rate
+        ceiling = None   # lowest failing rate
+        eps = self.start_eps
+        while ceiling is None:
+            if self.evaluate(eps):
+                best = eps
+                if eps >= self.max_eps:
+                    break
+                eps = min(eps * 2, self.max_eps)
+            else:
+                ceiling = eps
+        if best is not None and ceiling is not None:
+            while (ceiling - best) / best > self.tolerance:
+                mid = (best + ceiling) / 2
+                if self.evaluate(mid):
+                    best = mid
+                else:
+                    ceiling = mid
+        return {
+            "max_sustainable_eps": best or 0.0,
+            "first_failing_eps": ceiling,
+            "slo": {"p99_ms": self.p99_slo_ms, "error_rate": self.max_error_rate,
+                    "step_seconds": self.step_seconds},
+            "steps": self.steps,
+        }
+
+
+def print_capacity_result(result):
+    print("=== Capacity search ===")
+    slo = result["slo"]
+    print(f"  SLO:          p99 <= {slo['p99_ms']:.0f}ms, error rate <= {slo['error_rate'] * 100:.2f}% "
+          f"over {slo['step_seconds']:.0f}s steps")
+    if not result["max_sustainable_eps"]:
+        print(f"  result:       the starting rate of {result['first_failing_eps']:.0f} EPS already breaks the SLO")
+        return
+    print(f"  result:       {result['max_sustainable_eps']:.0f} EPS sustained")
+    if result["first_failing_eps"] is None:
+        print("                (search stopped at --max-eps without a failing step)")
+    else:
+        print(f"                first failing rate: {result['first_failing_eps']:.0f} EPS")
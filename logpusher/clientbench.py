@@ -0,0 +1,127 @@
+"""Head-to-head benchmark of the HTTP client backends (see logpusher.transports).
+
+One batch of records is encoded once, and each client then POSTs that
+same body in a closed loop from `concurrency` threads for `duration`
+seconds, after `warmup` seconds that open the connections and are not
+counted. Throughput is the maximum each client reaches at that
+concurrency. CPU per request is the process CPU time (user + system, all
+threads) spent during the measured part, divided by the requests sent, so
+it covers everything the client does per request except encoding (the
+body is fixed) and nothing the server does. Run it against a server that
+is not the bottleneck, or the clients will all look alike.
+"""
+import argparse
+import json
+import threading
+import time
+
+from .records import prometheus_record
+from .runner import batches
+from .senders import HttpSender
+from .stats import latency_summary
+from .transports import TRANSPORTS, make_transport
+
+
+def bench_client(client, args, body):
+    transport = make_transport(client, connections=args.concurrency)
+    sender = HttpSender(args.host, args.org, args.stream, args.user, args.password, transport=transport)
+    latencies = []
+    counts = {"ok": 0, "failed": 0}
+    lock = threading.Lock()
+    measuring = threading.Event()
+    deadline = time.monotonic() + args.warmup + args.duration
+
+    def worker():
+        local, ok, failed = [], 0, 0
+        while time.monotonic() < deadline:
+            t0 = time.perf_counter()
+            sent, _, _ = sender.send_body(body)
+            if measuring.is_set():
+                local.append(time.perf_counter() - t0)
+                if sent:
+                    ok += 1
+                else:
+                    failed += 1
+        with lock:
+            latencies.extend(local)
+            counts["ok"] += ok
+            counts["failed"] += failed
+
+    threads = [threading.Thread(target=worker, name=f"bench-{client}-{i}", daemon=True)
+               for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.warmup)
+    measuring.set()
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    for thread in threads:
+        thread.join()
+    cpu, wall = time.process_time() - cpu0, time.perf_counter() - wall0
+    sender.close()
+    requests_sent = counts["ok"] + counts["failed"]
+    return {
+        "client": client,
+        "requests": requests_sent,
+        "failed": counts["failed"],
+        "elapsed_s": wall,
+        "rps": requests_sent / wall if wall else 0.0,
+        "eps": counts["ok"] * args.batch_size / wall if wall else 0.0,
+        "cpu_s": cpu,
+        "cpu_ms_per_request": cpu / requests_sent * 1000 if requests_sent else 0.0,
+        "cpu_utilization": cpu / wall if wall else 0.0,
+        "latency": latency_summary(latencies),
+    }
+
+
+def print_bench(results, body_bytes, concurrency):
+    print(f"=== HTTP clients ({body_bytes / 1024:.0f} KiB bodies, {concurrency} in flight) ===")
+    print(f"  {'client':<12} {'req/s':>9} {'EPS':>10} {'CPU/req':>10} {'CPU':>6} {'p50':>8} {'p99':>8} {'failed':>7}")
+    best = max((r["rps"] for r in results), default=0) or 1
+    for r in results:
+        lat = r["latency"]
+        print(f"  {r['client']:<12} {r['rps']:>9.0f} {r['eps']:>10.0f} {r['cpu_ms_per_request']:>8.3f}ms "
+              f"{r['cpu_utilization'] * 100:>5.0f}% {lat['p50_ms']:>6.1f}ms {lat['p99_ms']:>6.1f}ms {r['failed']:>7}"
+              + ("  <- fastest" if r["rps"] == best else ""))
+
+
+def build_bench_parser():
+    parser = argparse.ArgumentParser(prog='test_pushing_log.py bench-clients',
+                                     description='Send the same batch through each HTTP client backend and '
+                                                 'compare throughput and CPU per request')
+    parser.add_argument('--host', type=str, default='https://openobserve-ingester.example.com', help='OpenObserve host')
+    parser.add_argument('--org', type=str, default='default', help='OpenObserve organization')
+    parser.add_argument('--stream', type=str, default='quickstart1', help='OpenObserve stream')
+    parser.add_argument('--user', type=str, default='root@example.com', help='OpenObserve user')
+    parser.add_argument('--password', type=str, default='xyzabc123', help='OpenObserve password')
+    parser.add_argument('--clients', nargs='+', choices=TRANSPORTS, default=list(TRANSPORTS),
+                        help='Backends to compare (default: all)')
+    parser.add_argument('--concurrency', type=int, default=8, help='Requests in flight (default: 8)')
+    parser.add_argument('--duration', type=float, default=10.0, help='Measured seconds per client (default: 10)')
+    parser.add_argument('--warmup', type=float, default=2.0, help='Unmeasured seconds per client (default: 2)')
+    parser.add_argument('--batch-size', type=int, default=100, help='Records in the body (default: 100)')
+    parser.add_argument('--template', type=str, default=None, help='Record template for the body')
+    parser.add_argument('--out', type=str, default=None, help='Also write the results to this JSON file')
+    return parser
+
+
+def bench_main(argv):
+    parser = build_bench_parser()
+    args = parser.parse_args(argv)
+    make_record = prometheus_record
+    if args.template:
+        from .templates import TemplateError, load_template
+        try:
+            make_record = load_template(args.template)
+        except (OSError, TemplateError) as e:
+            parser.error(f"--template: {e}")
+    _, _, records = next(batches(args.batch_size, args.batch_size, make_record))
+    body = json.dumps(records).encode("utf-8")
+    results = []
+    for client in args.clients:
+        print(f"Benchmarking {client} for {args.warmup + args.duration:.0f}s...")
+        results.append(bench_client(client, args, body))
+    print_bench(results, len(body), args.concurrency)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"body_bytes": len(body), "concurrency": args.concurrency, "results": results}, f, indent=2)
+        print(f"Results written to {args.out}")
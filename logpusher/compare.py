@@ -0,0 +1,143 @@
+"""Compare two run summaries (written with --summary-out) and gate on regressions.
+
+Each metric is compared on its per-window values: EPS, p50 and p99 latency
+and error rate of every window that saw traffic (the last, partial window
+is dropped). The delta is the difference of the window means, relative to
+the baseline for throughput and latency and in percentage points for the
+error rate. Its confidence interval comes from bootstrapping: both sets of
+windows are resampled with replacement and the delta recomputed, and the
+percentile interval of those deltas is reported.
+
+A change is significant when its interval excludes zero. A metric
+regresses when it is significantly worse than its threshold: the whole
+interval lies past the threshold in the bad direction (its lower bound is
+above the allowed increase, or its upper bound below the allowed drop).
+`compare` exits with status 1 if any metric regresses.
+"""
+import argparse
+import json
+import random
+import sys
+
+# name, window key, worse when, unit of the delta
+METRICS = (
+    ("eps", "eps", "lower", "%"),
+    ("p50 latency", "p50_ms", "higher", "%"),
+    ("p99 latency", "p99_ms", "higher", "%"),
+    ("error rate", "error_rate", "higher", "pp"),
+)
+
+
+def load_summary(path):
+    with open(path) as f:
+        data = json.load(f)
+    return data.get("summary", data)
+
+
+def window_values(summary, key):
+    windows = [w for w in summary.get("windows", [])[:-1] if w["requests"]]
+    return [w[key] for w in windows]
+
+
+def _mean(values):
+    return sum(values) / len(values)
+
+
+def _delta(base, cand, unit):
+    if unit == "pp":
+        return (_mean(cand) - _mean(base)) * 100
+    b = _mean(base)
+    return (_mean(cand) - b) / b * 100 if b else 0.0
+
+
+def bootstrap_ci(base, cand, unit, resamples=2000, confidence=0.95, rng=None):
+    rng = rng or random.Random(0)
+    deltas = sorted(_delta(rng.choices(base, k=len(base)), rng.choices(cand, k=len(cand)), unit)
+                    for _ in range(resamples))
+    tail = (1 - confidence) / 2
+    return deltas[int(tail * (resamples - 1))], deltas[int((1 - tail) * (resamples - 1))]
+
+
+def compare(baseline, candidate, thresholds, resamples=2000, confidence=0.95):
+    """One result per metric; `thresholds` maps metric name to the allowed change in its unit."""
+    rng = random.Random(0)
+    results = []
+    for name, key, worse, unit in METRICS:
+        base = window_values(baseline, key)
+        cand = window_values(candidate, key)
+        if len(base) < 2 or len(cand) < 2:
+            raise ValueError(f"not enough windows to compare {name} (need 2 per run, got {len(base)} and {len(cand)})")
+        delta = _delta(base, cand, unit)
+        low, high = bootstrap_ci(base, cand, unit, resamples, confidence, rng)
+        significant = low > 0 or high < 0
+        threshold = thresholds[name]
+        # The bound of the interval nearest to no change has to be past the threshold too.
+        regressed = high < -threshold if worse == "lower" else low > threshold
+        results.append({
+            "metric": name,
+            "baseline": _mean(base),
+            "candidate": _mean(cand),
+            "delta": delta,
+            "unit": unit,
+            "ci": [low, high],
+            "significant": significant,
+            "threshold": threshold,
+            "regressed": regressed,
+        })
+    return results
+
+
+def print_comparison(results, confidence):
+    print(f"=== Comparison (window means, {confidence * 100:.0f}% bootstrap CI) ===")
+    for r in results:
+        unit = r["unit"]
+        scale = 100 if unit == "pp" else 1
+        verdict = "REGRESSION" if r["regressed"] else ("significant" if r["significant"] else "no significant change")
+        print(f"  {r['metric']:<12} {r['baseline'] * scale:>10.2f} -> {r['candidate'] * scale:>10.2f}  "
+              f"{r['delta']:+7.2f}{unit} [{r['ci'][0]:+.2f}, {r['ci'][1]:+.2f}]  {verdict}")
+
+
+def build_compare_parser():
+    parser = argparse.ArgumentParser(prog='test_pushing_log.py compare',
+                                     description='Compare two run summaries written with --summary-out')
+    parser.add_argument('baseline', help='Summary of the reference run')
+    parser.add_argument('candidate', help='Summary of the run under test')
+    parser.add_argument('--max-eps-drop', type=float, default=5.0,
+                        help='Allowed throughput drop in percent (default: 5)')
+    parser.add_argument('--max-p50-increase', type=float, default=10.0,
+                        help='Allowed p50 latency increase in percent (default: 10)')
+    parser.add_argument('--max-p99-increase', type=float, default=10.0,
+                        help='Allowed p99 latency increase in percent (default: 10)')
+    parser.add_argument('--max-error-rate-increase', type=float, default=0.5,
+                        help='Allowed error rate increase in percentage points (default: 0.5)')
+    parser.add_argument('--confidence', type=float, default=0.95,
+                        help='Confidence level of the bootstrap intervals (default: 0.95)')
+    parser.add_argument('--resamples', type=int, default=2000,
+                        help='Bootstrap resamples (default: 2000)')
+    return parser
+
+
+def compare_main(argv):
+    parser = build_compare_parser()
+    args = parser.parse_args(argv)
+    try:
+        baseline = load_summary(args.baseline)
+        candidate = load_summary(args.candidate)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    thresholds = {
+        "eps": args.max_eps_drop,
+        "p50 latency": args.max_p50_increase,
+        "p99 latency": args.max_p99_increase,
+        "error rate": args.max_error_rate_increase,
+    }
+    try:
+        results = compare(baseline, candidate, thresholds, resamples=args.resamples, confidence=args.confidence)
+    except ValueError as e:
+        parser.error(str(e))
+    print_comparison(results, args.confidence)
+    regressed = [r["metric"] for r in results if r["regressed"]]
+    if regressed:
+        print(f"FAIL: {', '.join(regressed)} regressed past the thresholds")
+        sys.exit(1)
+    print("PASS")
@@ -0,0 +1,158 @@
+"""Dashboard refresh storms: many UI users refreshing the same dashboard.
+
+Each simulated user loads the dashboard, then reloads it every `refresh`
+seconds, +/- `jitter` (a fraction of the interval). A load issues all
+panel queries at once over at most `connections` parallel connections, as
+a browser does over HTTP/1.1, and its time to full dashboard is the wall
+time until the last panel has answered. Users start within `ramp` seconds
+of each other; 0 starts them all together, like the morning rush.
+
+A dashboard is JSON:
+
+    {"title": "klog overview",
+     "panels": [{"name": "errors per minute", "range": "1h",
+                 "sql": "SELECT histogram(_timestamp, '1 minute') AS ts, count(*) AS n FROM \\"{stream}\\" ..."}]}
+
+`range` is the panel's time range (`30s`, `15m`, `6h`, `7d`), `size` its
+page size; per-panel statistics are collected like query classes.
+"""
+import json
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from .queries import QueryLoad
+from .stats import latency_summary
+
+DEFAULT_DASHBOARD = {
+    "title": "klog overview",
+    "panels": [
+        {"name": "events over time", "range": "1h", "size": 0,
+         "sql": "SELECT histogram(_timestamp, '1 minute') AS ts, count(*) AS n FROM \"{stream}\" "
+                "GROUP BY ts ORDER BY ts"},
+        {"name": "events by pod", "range": "1h", "size": 0,
+         "sql": "SELECT kubernetes_pod_name, count(*) AS n FROM \"{stream}\" GROUP BY kubernetes_pod_name "
+                "ORDER BY n DESC"},
+        {"name": "forbidden errors", "range": "1h", "size": 0,
+         "sql": "SELECT histogram(_timestamp, '1 minute') AS ts, count(*) AS n FROM \"{stream}\" "
+                "WHERE match_all('forbidden') GROUP BY ts ORDER BY ts"},
+        {"name": "events by stream", "range": "24h", "size": 0,
+         "sql": "SELECT stream, count(*) AS n FROM \"{stream}\" GROUP BY stream"},
+        {"name": "latest logs", "range": "15m", "size": 50,
+         "sql": "SELECT * FROM \"{stream}\" ORDER BY _timestamp DESC"},
+    ],
+}
+
+_RANGE = re.compile(r"^(\d+(?:\.\d+)?)([smhd])$")
+_SECONDS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_range(text):
+    if isinstance(text, (int, float)):
+        return float(text)
+    m = _RANGE.match(str(text).strip())
+    if not m:
+        raise ValueError(f"bad panel range {text!r} (expected e.g. 15m, 6h, 7d)")
+    return float(m.group(1)) * _SECONDS[m.group(2)]
+
+
+def load_dashboard(path):
+    with open(path) as f:
+        dashboard = json.load(f)
+    panels = dashboard.get("panels") if isinstance(dashboard, dict) else None
+    if not panels:
+        raise ValueError("a dashboard needs a non-empty panels list")
+    names = [panel.get("name") for panel in panels]
+    if None in names or len(set(names)) != len(names) or any("sql" not in panel for panel in panels):
+        raise ValueError("every panel needs sql and a unique name")
+    return dashboard
+
+
+class DashboardSimulation:
+    def __init__(self, host, org, stream, user, password, dashboard=DEFAULT_DASHBOARD, users=10, refresh=30.0,
+                 jitter=0.1, connections=6, ramp=0.0, timeout=60.0, rng=random):
+        panels = [dict(panel, range_seconds=parse_range(panel.get("range", "15m")))
+                  for panel in dashboard["panels"]]
+        # Panels are run and accounted as query classes.
+        self.queries = QueryLoad(host, org, stream, user, password, mix=panels, timeout=timeout)
+        self.panels = self.queries.mix
+        self.title = dashboard.get("title", "dashboard")
+        self.users = users
+        self.refresh = refresh
+        self.jitter = jitter
+        self.connections = connections
+        self.ramp = ramp
+        self.rng = rng
+        self.loads = [[] for _ in range(users)]   # per user: (time to full dashboard, failed panels)
+        self.elapsed = 0.0
+
+    def _load(self, pool):
+        t0 = time.perf_counter()
+        futures = [pool.submit(self.queries.query, panel) for panel in self.panels]
+        wait(futures)
+        failed = sum(1 for future in futures if not future.result())
+        return time.perf_counter() - t0, failed
+
+    def _user(self, index, deadline):
+        with ThreadPoolExecutor(max_workers=self.connections,
+                                thread_name_prefix=f"dashboard-user-{index}") as pool:
+            if self.ramp:
+                time.sleep(self.rng.uniform(0, self.ramp))
+            while time.monotonic() < deadline:
+                self.loads[index].append(self._load(pool))
+                pause = self.refresh * (1 + self.rng.uniform(-self.jitter, self.jitter))
+                time.sleep(min(pause, max(deadline - time.monotonic(), 0)))
+
+    def run(self, duration):
+        started = time.monotonic()
+        users = [threading.Thread(target=self._user, args=(i, started + duration), name=f"dashboard-user-{i}",
+                                  daemon=True) for i in range(self.users)]
+        for user in users:
+            user.start()
+        for user in users:
+            user.join()
+        self.elapsed = time.monotonic() - started
+
+    def summary(self):
+        loads = [load for user in self.loads for load in user]
+        per_user = [latency_summary([ttfd for ttfd, _ in user]) for user in self.loads]
+        return {
+            "title": self.title,
+            "users": self.users,
+            "panels": len(self.panels),
+            "refresh_s": self.refresh,
+            "elapsed_s": self.elapsed,
+            "loads": len(loads),
+            "failed_loads": sum(1 for _, failed in loads if failed),
+            "time_to_full_dashboard": latency_summary([ttfd for ttfd, _ in loads]),
+            "per_user": per_user,
+            "queries": self.queries.summary(),
+        }
+
+
+def print_dashboard_summary(summary):
+    ttfd = summary["time_to_full_dashboard"]
+    print(f"=== Dashboard: {summary['title']} ===")
+    print(f"  users:        {summary['users']} refreshing every {summary['refresh_s']:.0f}s, "
+          f"{summary['panels']} panels each")
+    print(f"  loads:        {summary['loads']} in {summary['elapsed_s']:.1f}s, "
+          f"{summary['failed_loads']} with failed panels")
+    print(f"  full load (ms): p50 {ttfd['p50_ms']:.1f}  p90 {ttfd['p90_ms']:.1f}  p99 {ttfd['p99_ms']:.1f}  "
+          f"max {ttfd['max_ms']:.1f}")
+    users = summary["per_user"]
+    if len(users) <= 20:
+        for index, u in enumerate(users):
+            print(f"    user {index:<3} {u['count']:>4} loads, full load mean {u['mean_ms']:.1f}  "
+                  f"p90 {u['p90_ms']:.1f}  max {u['max_ms']:.1f} ms")
+    elif any(u["count"] for u in users):
+        means = sorted(u["mean_ms"] for u in users if u["count"])
+        print(f"  per user:     mean full load {means[0]:.1f}..{means[-1]:.1f}ms; "
+              f"slowest user p90 {max(u['p90_ms'] for u in users):.1f}ms")
+    print("  slowest panels (p99):")
+    panels = sorted(summary["queries"]["classes"].items(), key=lambda kv: -kv[1]["latency"]["p99_ms"])
+    for name, panel in panels:
+        lat = panel["latency"]
+        print(f"    {name:<28} p50 {lat['p50_ms']:8.1f}  p99 {lat['p99_ms']:8.1f} ms, "
+              f"errors {panel['error_rate'] * 100:.2f}%")
@@ -0,0 +1,215 @@
+"""Source-side sampling and deduplication of repeated messages.
+
+A record's fingerprint is its `field` (default `log`) with `#` in place of
+every word that contains a digit or is a run of 8+ hex letters, so
+timestamps, ids and counters do not make otherwise identical messages
+distinct. Within each time window of
+`window` seconds, the first `keep` records of a fingerprint go through.
+Each later one is kept with probability `sample_rate` (0 drops them all)
+and otherwise suppressed. When the window closes, one summary record per
+suppressed fingerprint is sent in their place. It is a copy of the first
+suppressed record, plus:
+
+    "dedup_suppressed": 1234, "dedup_window_s": 60.0, "dedup_fingerprint": "9f2c41d07ab3e865"
+
+so `sum(dedup_suppressed)` recovers the original volume. Records without
+the field pass untouched.
+
+Occurrences per window are counted exactly in a dict (`mode="exact"`, memory
+grows with the distinct messages of a window), or in a count-min sketch
+(`mode="approx"`, fixed at `width * depth` counters). The sketch uses
+conservative update, so it only overestimates. An overestimate can
+suppress a rare message that collides with a flood, with probability about
+`depth` hash collisions in a row. Suppressed counts are kept per
+fingerprint for at most `max_summaries` fingerprints per window; the rest
+are folded into one generic summary record, which has no example to copy
+fields from; `stamp`, if given, is applied to it (e.g. `Checksum.stamp`,
+so it carries a content hash like every other record).
+
+Windows follow the wall clock of the pipeline, not record timestamps.
+"""
+import hashlib
+import random
+import re
+import time
+from array import array
+
+# Word-anchored so words without digits are skipped in one step instead of backtracking per character.
+_VARIABLE = re.compile(r"\b(?:[^\W\d]*\d\w*|[a-fA-F]{8,}\b)")
+
+
+def fingerprint(text):
+    """64-bit fingerprint of a message, ignoring words that look like numbers or ids."""
+    normalized = _VARIABLE.sub("#", text)
+    return int.from_bytes(hashlib.blake2b(normalized.encode("utf-8", "replace"), digest_size=8).digest(), "little")
+
+
+class CountMinSketch:
+    """Approximate counts in `depth` rows of `width` counters (conservative update)."""
+
+    def __init__(self, width=1 << 16, depth=4):
+        self.width = width
+        self.depth = depth
+        self.rows = [array("I", bytes(4 * width)) for _ in range(depth)]
+
+    def add(self, key):
+        """Count one occurrence of a 64-bit key; returns its estimated count so far."""
+        h1, h2 = key & 0xFFFFFFFF, (key >> 32) | 1
+        width = self.width
+        slots = [(h1 + i * h2) % width for i in range(self.depth)]
+        estimate = min(row[slot] for row, slot in zip(self.rows, slots)) + 1
+        for row, slot in zip(self.rows, slots):
+            if row[slot] < estimate:
+                row[slot] = estimate
+        return estimate
+
+    def clear(self):
+        self.rows = [array("I", bytes(4 * self.width)) for _ in range(self.depth)]
+
+    @property
+    def memory_bytes(self):
+        return 4 * self.width * self.depth
+
+
+class _ExactCounts:
+    def __init__(self):
+        self.counts = {}
+
+    def add(self, key):
+        count = self.counts.get(key, 0) + 1
+        self.counts[key] = count
+        return count
+
+    def clear(self):
+        self.counts = {}
+
+
+class Deduplicator:
+    def __init__(self, field="log", window=60.0, keep=1, sample_rate=0.0, mode="approx", width=1 << 16,
+                 depth=4, max_summaries=1000, rng=random, clock=time.monotonic, stamp=None):
+        self.field = field
+        self.window = window
+        self.keep = keep
+        self.sample_rate = sample_rate
+        self.mode = mode
+        self.counts = CountMinSketch(width, depth) if mode == "approx" else _ExactCounts()
+        self.max_summaries = max_summaries
+        self.rng = rng
+        self.clock = clock
+        self.stamp = stamp
+        self.records_in = 0
+        self.passed = 0
+        self.sampled = 0
+        self.suppressed = 0
+        self.summaries = 0
+        self.windows = 0
+        self.last_id = 0
+        self._window_start = None
+        self._suppressed = {}     # fingerprint -> [example record, count] for this window
+        self._overflow = 0        # suppressed past max_summaries fingerprints
+
+    def filter(self, records):
+        """The records to send in place of `records`: survivors, plus summaries of any window that closed."""
+        now = self.clock()
+        out = self._roll(now)
+        counts, keep, rate, field = self.counts, self.keep, self.sample_rate, self.field
+        for record in records:
+            text = record.get(field)
+            if not isinstance(text, str):
+                out.append(record)
+                continue
+            key = fingerprint(text)
+            if counts.add(key) <= keep:
+                out.append(record)
+                continue
+            if rate and self.rng.random() < rate:
+                self.sampled += 1
+                out.append(record)
+                continue
+            self.suppressed += 1
+            entry = self._suppressed.get(key)
+            if entry is not None:
+                entry[1] += 1
+            elif len(self._suppressed) < self.max_summaries:
+                self._suppressed[key] = [record, 1]
+            else:
+                self._overflow += 1
+        self.records_in += len(records)
+        self.passed += len(out)
+        return out
+
+    def _roll(self, now):
+        if self._window_start is None:
+            self._window_start = now
+            self.windows = 1
+            return []
+        if now - self._window_start < self.window:
+            return []
+        self._window_start = now
+        self.windows += 1
+        return self.flush()
+
+    def flush(self):
+        """Summary records for the current window, which is then started afresh."""
+        out = []
+        for key, (example, count) in self._suppressed.items():
+            out.append(dict(example, dedup_suppressed=count, dedup_window_s=self.window,
+                            dedup_fingerprint=f"{key:016x}"))
+        if self._overflow:
+            overflow = {self.field: f"dedup: {self._overflow} records of other repeated messages suppressed",
+                        "dedup_suppressed": self._overflow, "dedup_window_s": self.window}
+            out.append(self.stamp(overflow) if self.stamp is not None else overflow)
+        self._suppressed = {}
+        self._overflow = 0
+        self.counts.clear()
+        self.summaries += len(out)
+        return out
+
+    def apply(self, source):
+        """Filter a stream of (first_id, last_id, records) batches.
+
+        Batches keep their ids even when records were dropped (an emptied
+        batch is still yielded, so checkpoints advance). The summaries of the
+        last window follow as a batch of their own, numbered after the source.
+        """
+        for first, last, records in source:
+            self.last_id = last
+            yield first, last, self.filter(records)
+        rest = self.finish()
+        if rest:
+            yield self.last_id + 1, self.last_id + len(rest), rest
+
+    def finish(self):
+        """Summary records of the last window, for a source that was not read to its end."""
+        rest = self.flush()
+        self.passed += len(rest)
+        return rest
+
+    def summary(self):
+        sent = self.passed
+        return {
+            "mode": self.mode,
+            "field": self.field,
+            "window_s": self.window,
+            "keep": self.keep,
+            "sample_rate": self.sample_rate,
+            "records_in": self.records_in,
+            "records_out": sent,
+            "sampled": self.sampled,
+            "suppressed": self.suppressed,
+            "summary_records": self.summaries,
+            "windows": self.windows,
+            "reduction": 1 - sent / self.records_in if self.records_in else 0.0,
+            "sketch_bytes": self.counts.memory_bytes if self.mode == "approx" else None,
+        }
+
+
+def print_dedup_summary(summary):
+    print("=== Sampling and dedup ===")
+    print(f"  mode:         {summary['mode']} on {summary['field']!r}, window {summary['window_s']:.0f}s, "
+          f"keep {summary['keep']}, sample rate {summary['sample_rate']:g}"
+          + (f", sketch {summary['sketch_bytes'] / 1024:.0f} KiB" if summary["sketch_bytes"] else ""))
+    print(f"  records:      {summary['records_in']} in, {summary['records_out']} out "
+          f"({summary['reduction'] * 100:.1f}% fewer)")
+    print(f"  suppressed:   {summary['suppressed']} in {summary['summary_records']} summary records "
+          f"over {summary['windows']} windows; {summary['sampled']} sampled through")
@@ -0,0 +1,145 @@
+"""Drain chaos: put an ingester node into drain mode in the middle of a run.
+
+This does what the pre-stop hook in entrypoint.sh does on a rolling deploy:
+`PUT /node/enable?value=false` on one node, then poll `GET
+/node/drain_status` until `readyForShutdown`. The load keeps running
+through the drain, and the run is split into before / draining / after
+phases for comparing error rates, latency and throughput. Every status
+poll is kept, so `pendingParquetFiles` can be followed over time.
+
+The node has to be addressed directly (its private IP and HTTP port), not
+through the load balancer. Unless told otherwise, the node is enabled again
+when the run ends.
+"""
+import threading
+import time
+
+import requests
+
+from .senders import basic_auth
+
+STATUS_FIELDS = ("isDraining", "memoryFlushed", "pendingParquetFiles", "readyForShutdown")
+
+
+class DrainChaos(threading.Thread):
+    def __init__(self, node_url, user, password, stats, after=30.0, poll_interval=2.0, max_wait=1000.0,
+                 reenable=True, timeout=10.0):
+        super().__init__(name="drain-chaos", daemon=True)
+        self.node_url = node_url.rstrip("/")
+        self.headers = {"Authorization": basic_auth(user, password)}
+        self.stats = stats
+        self.after = after
+        self.poll_interval = poll_interval
+        self.max_wait = max_wait
+        self.reenable = reenable
+        self.timeout = timeout
+        self.triggered_at = None
+        self.trigger_status = None
+        self.ready_at = None
+        self.reenable_status = None
+        self.error = None
+        self.samples = []
+        self._stopping = threading.Event()
+
+    def _now(self):
+        # Seconds into the run, on the same clock as the RunStats windows.
+        return time.monotonic() - self.stats.started
+
+    def _enable(self, value):
+        response = requests.put(f"{self.node_url}/node/enable", params={"value": value},
+                                headers=self.headers, timeout=self.timeout)
+        return response.status_code
+
+    def _poll(self):
+        sample = {"t": self._now()}
+        try:
+            response = requests.get(f"{self.node_url}/node/drain_status", headers=self.headers,
+                                    timeout=self.timeout)
+            response.raise_for_status()
+            status = response.json()
+            sample.update((field, status.get(field)) for field in STATUS_FIELDS)
+        except (requests.RequestException, ValueError) as e:
+            sample["error"] = str(e)
+        self.samples.append(sample)
+        return sample
+
+    def run(self):
+        if self._stopping.wait(max(self.after - self._now(), 0)):
+            return
+        self.triggered_at = self._now()
+        print(f"[drain] t={self.triggered_at:.0f}s disabling {self.node_url}")
+        try:
+            self.trigger_status = self._enable("false")
+        except requests.RequestException as e:
+            self.error = f"PUT /node/enable failed: {e}"
+            return
+        if self.trigger_status != 200:
+            self.error = f"PUT /node/enable returned HTTP {self.trigger_status}"
+            return
+        while self._now() - self.triggered_at < self.max_wait:
+            sample = self._poll()
+            if sample.get("readyForShutdown") is True:
+                self.ready_at = sample["t"]
+                print(f"[drain] t={self.ready_at:.0f}s ready for shutdown after "
+                      f"{self.ready_at - self.triggered_at:.0f}s")
+                return
+            if self._stopping.wait(self.poll_interval):
+                return
+
+    def stop(self):
+        """End polling and, if the drain was triggered, enable the node again."""
+        self._stopping.set()
+        self.join()
+        if self.reenable and self.trigger_status == 200:
+            try:
+                self.reenable_status = self._enable("true")
+            except requests.RequestException as e:
+                self.reenable_status = f"failed: {e}"
+
+    def summary(self):
+        result = {
+            "node": self.node_url,
+            "triggered_at_s": self.triggered_at,
+            "trigger_status": self.trigger_status,
+            "ready_at_s": self.ready_at,
+            "drain_s": None if self.ready_at is None else self.ready_at - self.triggered_at,
+            "error": self.error,
+            "reenable_status": self.reenable_status,
+            "samples": self.samples,
+            "phases": {},
+        }
+        if self.triggered_at is not None:
+            result["phases"]["before"] = self.stats.span(0, self.triggered_at)
+            result["phases"]["draining"] = self.stats.span(self.triggered_at, self.ready_at)
+            if self.ready_at is not None:
+                result["phases"]["after"] = self.stats.span(self.ready_at)
+        return result
+
+
+def print_drain_summary(summary):
+    print("=== Drain chaos ===")
+    print(f"  node:         {summary['node']}")
+    if summary["triggered_at_s"] is None:
+        print("  not triggered: the run ended before --drain-after")
+        return
+    print(f"  triggered:    t={summary['triggered_at_s']:.0f}s (HTTP {summary['trigger_status']})")
+    if summary["error"]:
+        print(f"  error:        {summary['error']}")
+    if summary["drain_s"] is not None:
+        print(f"  drained:      ready for shutdown after {summary['drain_s']:.1f}s")
+    elif not summary["error"]:
+        print("  drained:      not ready for shutdown by the end of the run")
+    for name, phase in summary["phases"].items():
+        lat = phase["latency"]
+        print(f"  {name:<9}     {phase['eps']:>9.1f} EPS, errors {phase['error_rate'] * 100:5.2f}%, "
+              f"p50 {lat['p50_ms']:.1f}  p99 {lat['p99_ms']:.1f}  max {lat['max_ms']:.1f} ms")
+    pending = [(s["t"], s["pendingParquetFiles"]) for s in summary["samples"] if "pendingParquetFiles" in s]
+    if pending:
+        # Only print changes, so a long drain stays readable.
+        changes = [p for i, p in enumerate(pending) if i == 0 or p[1] != pending[i - 1][1]]
+        print("  pendingParquetFiles: " + "  ".join(f"t={t:.0f}s:{n}" for t, n in changes))
+    failed = sum(1 for s in summary["samples"] if "error" in s)
+    if failed:
+        print(f"  status polls: {failed} of {len(summary['samples'])} failed")
+    if summary["reenable_status"] is not None:
+        print(f"  re-enabled:   HTTP {summary['reenable_status']}")
@@ -0,0 +1,59 @@
+"""Kinesis Data Firehose HTTP endpoint delivery, as OpenObserve receives it.
+
+Firehose POSTs to `/aws/{org}/{stream}/_kinesis_firehose` with an envelope
+instead of a plain JSON array:
+
+    {"requestId": "<uuid>", "timestamp": <ms since epoch>,
+     "records": [{"data": "<base64 of one JSON record>"}, ...]}
+
+and authenticates with the `X-Amz-Firehose-Access-Key` header, which for
+OpenObserve holds the base64 `user:password` credential. A batch is one
+delivery request; its request ID is fixed when the batch is encoded, so a
+spooled batch keeps it when re-sent, as Firehose does on retries. The
+envelope costs about a third more bytes than `_json` for the same records,
+from the base64 encoding.
+"""
+import base64
+import json
+import time
+import uuid
+
+from .buffers import ENCODE_SLICE
+from .senders import HttpSender
+
+_dumps = json.JSONEncoder().encode
+_b64 = base64.b64encode
+
+
+class FirehoseSender(HttpSender):
+    """HttpSender that wraps each batch in a Firehose delivery request."""
+
+    name = "firehose"
+
+    def __init__(self, host, org, stream, user, password, **kwargs):
+        super().__init__(host, org, stream, user, password, **kwargs)
+        self.path = "/aws/" + org + "/" + stream + "/_kinesis_firehose"
+        self.url = host + self.path
+        access_key = self.headers["Authorization"][len("Basic "):]
+        self.headers.update({"X-Amz-Firehose-Access-Key": access_key,
+                             "X-Amz-Firehose-Protocol-Version": "1.0"})
+
+    def _head(self):
+        request_id = str(uuid.uuid4())
+        return ('{"requestId": "%s", "timestamp": %d, "records": [' % (request_id, time.time() * 1000)).encode()
+
+    def _records(self, records):
+        return b", ".join(b'{"data": "' + _b64(_dumps(record).encode("utf-8")) + b'"}' for record in records)
+
+    def encode(self, records):
+        return self._head() + self._records(records) + b"]}"
+
+    def encode_into(self, records, writer):
+        if not isinstance(records, list):
+            records = list(records)
+        writer.write(self._head())
+        for start in range(0, len(records), ENCODE_SLICE):
+            if start:
+                writer.write(b", ")
+            writer.write(self._records(records[start:start + ENCODE_SLICE]))
+        writer.write(b"]}")
@@ -0,0 +1,208 @@
+"""Production-like log message bodies.
+
+Messages come from weighted families per log level, with variable-length
+parts (ID lists, SQL, header dumps) and a vocabulary wide enough that the
+full-text index sees more than one token set. A small fraction are ERROR
+lines carrying a multi-line stack trace; those traces are built once into a
+corpus when the generator is created, so drawing one is just a list index.
+"""
+import bisect
+import itertools
+import random
+
+LEVELS = (("DEBUG", 15), ("INFO", 70), ("WARN", 10), ("ERROR", 5))
+
+WORDS = (
+    "account", "address", "allocation", "archive", "audit", "backend", "balance", "batch", "billing", "bucket",
+    "cache", "campaign", "cart", "catalog", "channel", "checkout", "claim", "client", "cluster", "config",
+    "consumer", "coupon", "customer", "dataset", "delivery", "device", "discount", "document", "domain", "export",
+    "feature", "feed", "fulfilment", "gateway", "import", "index", "inventory", "invoice", "ledger", "listing",
+    "location", "merchant", "metric", "notification", "offer", "order", "partner", "payment", "payout", "pipeline",
+    "policy", "price", "product", "profile", "promotion", "quota", "receipt", "refund", "region", "report",
+    "reservation", "return", "review", "route", "schedule", "search", "segment", "session", "settlement", "shipment",
+    "snapshot", "subscription", "supplier", "tenant", "ticket", "token", "transfer", "upload", "user", "voucher",
+    "warehouse", "webhook", "workflow", "zone",
+)
+SERVICES = ("checkout", "cart", "catalog", "payments", "users", "shipping", "search", "pricing", "inventory", "notify")
+PATHS = ("/", "/api/v1/cart", "/api/v1/products", "/api/v1/login", "/api/v1/orders", "/api/v2/search",
+         "/api/v1/users/me", "/api/v1/payments/authorize", "/healthz", "/metrics")
+HOSTS = ("orders-db.internal", "redis-main.internal", "kafka-1.internal", "payments.partner.example.com",
+         "catalog-svc.default.svc.cluster.local", "s3.us-east-2.amazonaws.com")
+EXCEPTIONS = (
+    ("java.lang.NullPointerException", "Cannot invoke \"{cls}.get{word}()\" because \"{var}\" is null"),
+    ("java.lang.IllegalStateException", "{word} {id} is in state {state}, expected ACTIVE"),
+    ("org.springframework.dao.DataAccessResourceFailureException", "Unable to acquire JDBC Connection"),
+    ("java.net.SocketTimeoutException", "Read timed out after {ms}ms"),
+    ("com.fasterxml.jackson.databind.exc.MismatchedInputException",
+     "Cannot deserialize value of type `{cls}` from Array value"),
+    ("java.util.concurrent.TimeoutException", "Waited {ms} milliseconds for {word} response"),
+    ("io.grpc.StatusRuntimeException", "UNAVAILABLE: io exception"),
+    ("java.sql.SQLTransientConnectionException", "HikariPool-1 - Connection is not available, request timed out"),
+)
+PACKAGES = ("com.example.orders", "com.example.payments", "com.example.catalog", "com.example.common.http",
+            "org.springframework.web.servlet", "org.springframework.transaction.interceptor",
+            "org.apache.catalina.core", "org.apache.coyote.http11", "com.zaxxer.hikari.pool",
+            "io.netty.channel", "io.grpc.internal", "java.util.concurrent")
+STATES = ("PENDING", "SUSPENDED", "CLOSED", "FAILED", "ARCHIVED")
+
+
+def _ident(rng, words=2):
+    return "".join(w.capitalize() for w in rng.sample(WORDS, words))
+
+
+def _stack_frames(rng, depth):
+    lines = []
+    for _ in range(depth):
+        pkg = rng.choice(PACKAGES)
+        cls = _ident(rng, rng.randint(1, 3))
+        method = rng.choice(WORDS) + _ident(rng, 1)
+        lines.append(f"\tat {pkg}.{cls}.{method}({cls}.java:{rng.randint(20, 2400)})")
+    return lines
+
+
+def build_stack_trace_corpus(size=64, seed=0x5EED):
+    """Pre-render `size` Java-style stack traces (roughly 1-12 KB each)."""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        lines = []
+        caused_by = ""
+        for _ in range(rng.choice((1, 1, 2, 3))):
+            exc, msg = rng.choice(EXCEPTIONS)
+            msg = msg.format(cls=_ident(rng), word=_ident(rng, 1), var=rng.choice(WORDS),
+                             id=rng.randint(1000, 99999), state=rng.choice(STATES), ms=rng.randint(500, 30000))
+            lines.append(f"{caused_by}{exc}: {msg}")
+            lines.extend(_stack_frames(rng, rng.randint(8, 60)))
+            if caused_by:
+                lines.append(f"\t... {rng.randint(10, 80)} common frames omitted")
+            caused_by = "Caused by: "
+        corpus.append("\n".join(lines))
+    return corpus
+
+
+# Message families per level: (weight, formatter(rng) -> str)
+
+def _http_done(rng):
+    return (f"{rng.choice(('GET', 'GET', 'GET', 'POST', 'PUT', 'DELETE'))} {rng.choice(PATHS)} "
+            f"completed status={rng.choice((200, 200, 200, 201, 204, 304))} duration_ms={rng.randint(1, 900)} "
+            f"bytes={rng.randint(80, 60000)} request_id={rng.getrandbits(64):016x}")
+
+
+def _order_processed(rng):
+    items = ",".join(f"SKU-{rng.randint(10000, 99999)}" for _ in range(rng.randint(1, 30)))
+    return (f"processed {rng.choice(WORDS)} {rng.randint(100000, 999999)} for customer "
+            f"{rng.randint(1, 200000)} items=[{items}] total={rng.randint(1, 500000) / 100:.2f}")
+
+
+def _job_done(rng):
+    return (f"job {rng.choice(WORDS)}-{rng.choice(WORDS)} finished in {rng.randint(5, 120000)}ms, "
+            f"{rng.randint(0, 50000)} {rng.choice(WORDS)} records updated")
+
+
+def _consumer_rebalance(rng):
+    parts = ", ".join(f"{rng.choice(WORDS)}-events-{rng.randint(0, 63)}" for _ in range(rng.randint(1, 12)))
+    return f"[Consumer clientId={rng.choice(SERVICES)}-{rng.randint(1, 9)}] Adding newly assigned partitions: {parts}"
+
+
+def _login(rng):
+    return (f"user {rng.randint(1, 500000)} authenticated via {rng.choice(('password', 'sso', 'api_key', 'refresh'))} "
+            f"from 10.{rng.randint(0, 3)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}")
+
+
+def _sql(rng):
+    ids = ", ".join(str(rng.randint(1, 10_000_000)) for _ in range(rng.randint(1, 80)))
+    table = rng.choice(WORDS) + "s"
+    return (f"executing: SELECT id, {rng.choice(WORDS)}_id, status, created_at FROM {table} "
+            f"WHERE id IN ({ids}) AND tenant_id = {rng.randint(1, 400)} ORDER BY created_at DESC")
+
+
+def _headers(rng):
+    extra = " ".join(f"x-{rng.choice(WORDS)}={rng.getrandbits(32):08x}" for _ in range(rng.randint(0, 10)))
+    return (f"request headers: host={rng.choice(HOSTS)} user-agent=okhttp/4.12.0 "
+            f"traceparent=00-{rng.getrandbits(128):032x}-{rng.getrandbits(64):016x}-01 {extra}")
+
+
+def _cache(rng):
+    return (f"cache {rng.choice(('hit', 'miss', 'miss', 'evict'))} key={rng.choice(WORDS)}:{rng.randint(1, 99999)} "
+            f"ttl={rng.randint(0, 3600)}s")
+
+
+def _slow_query(rng):
+    return (f"slow query took {rng.randint(1000, 20000)}ms on {rng.choice(WORDS)}s "
+            f"(rows_examined={rng.randint(10000, 9000000)})")
+
+
+def _retry(rng):
+    return (f"retrying call to {rng.choice(HOSTS)} attempt {rng.randint(1, 5)}/5 after "
+            f"{rng.choice(('timeout', 'connection reset', '503 Service Unavailable', '429 Too Many Requests'))}")
+
+
+def _klog_forbidden(rng):
+    return ("pkg/mod/k8s.io/client-go@v0.25.1/tools/cache/reflector.go:169: failed to list *v1.Pod: pods is "
+            "forbidden: User \"system:serviceaccount:monitoring:prometheus-k8s\" cannot list resource \"pods\" "
+            "in API group \"\" at the cluster scope")
+
+
+def _gc_pause(rng):
+    return (f"GC pause (G1 Evacuation Pause) young {rng.randint(200, 4000)}M->{rng.randint(100, 2000)}M"
+            f"({rng.randint(4000, 8000)}M) {rng.randint(5, 900)}.{rng.randint(0, 999):03d}ms")
+
+
+def _pool_exhausted(rng):
+    return (f"HikariPool-1 - Connection is not available, request timed out after {rng.randint(1000, 30000)}ms "
+            f"(total={rng.randint(10, 50)}, active={rng.randint(10, 50)}, idle=0, waiting={rng.randint(1, 300)})")
+
+
+def _conn_refused(rng):
+    return f"connection refused: {rng.choice(HOSTS)}:{rng.choice((443, 5432, 6379, 9092, 8080))}"
+
+
+def _upstream_5xx(rng):
+    return (f"upstream {rng.choice(SERVICES)} returned {rng.choice((500, 502, 503, 504))} for "
+            f"{rng.choice(PATHS)} after {rng.randint(1, 30000)}ms")
+
+
+def _validation(rng):
+    return (f"rejected {rng.choice(WORDS)} {rng.randint(1, 999999)}: field '{rng.choice(WORDS)}' "
+            f"{rng.choice(('must not be null', 'exceeds maximum length', 'has invalid format', 'is out of range'))}")
+
+
+FAMILIES = {
+    "DEBUG": ((40, _sql), (30, _headers), (30, _cache)),
+    "INFO": ((50, _http_done), (20, _order_processed), (10, _job_done), (10, _consumer_rebalance), (10, _login)),
+    "WARN": ((30, _slow_query), (25, _retry), (20, _klog_forbidden), (15, _gc_pause), (10, _pool_exhausted)),
+    "ERROR": ((40, _conn_refused), (40, _upstream_5xx), (20, _validation)),
+}
+
+
+class _Weighted:
+    def __init__(self, pairs):
+        self.values = [v for v, _ in pairs]
+        self.cum = list(itertools.accumulate(w for _, w in pairs))
+        self.last = len(self.values) - 1
+
+    def pick(self, rng):
+        return self.values[min(bisect.bisect_right(self.cum, rng.random() * self.cum[-1]), self.last)]
+
+
+class MessageGenerator:
+    """Draws (level, message) pairs with production-like variety.
+
+    `stack_trace_rate` is the fraction of all messages that are ERROR lines
+    followed by a stack trace from the precomputed corpus.
+    """
+
+    def __init__(self, stack_trace_rate=0.01, levels=LEVELS, corpus_size=64, rng=random):
+        self.stack_trace_rate = stack_trace_rate
+        self.rng = rng
+        self._levels = _Weighted(levels)
+        self._families = {level: _Weighted([(f, w) for w, f in fams]) for level, fams in FAMILIES.items()}
+        self._traces = build_stack_trace_corpus(corpus_size) if stack_trace_rate > 0 else []
+
+    def message(self, rng=None):
+        rng = rng or self.rng
+        if self._traces and rng.random() < self.stack_trace_rate:
+            trace = self._traces[rng.randrange(len(self._traces))]
+            return "ERROR", f"unhandled exception in {rng.choice(SERVICES)} worker\n{trace}"
+        level = self._levels.pick(rng)
+        return level, self._families[level].pick(rng)(rng)
@@ -0,0 +1,70 @@
+"""Interference between ingest and query load running at the same time.
+
+Both workloads record into their own RunStats on a shared clock, so their
+one-second windows line up. The report groups windows into rows of
+`every` seconds for a side-by-side view, and correlates the per-window
+series (Pearson's r over windows where both saw traffic): a strongly
+positive r between write EPS and query p99 says ingest slows queries down.
+"""
+import math
+
+# (label, write series key, query series key)
+PAIRS = (
+    ("write EPS vs query p50", "eps", "p50_ms"),
+    ("write EPS vs query p99", "eps", "p99_ms"),
+    ("write p99 vs query p99", "p99_ms", "p99_ms"),
+)
+
+
+def pearson(xs, ys):
+    """Pearson correlation of two equally long series; None if either is constant or too short."""
+    n = len(xs)
+    if n < 3:
+        return None
+    mx, my = sum(xs) / n, sum(ys) / n
+    sxy = sum((x - mx) * (y - my) for x, y in zip(xs, ys))
+    sxx = sum((x - mx) ** 2 for x in xs)
+    syy = sum((y - my) ** 2 for y in ys)
+    if sxx == 0 or syy == 0:
+        return None
+    return sxy / math.sqrt(sxx * syy)
+
+
+def interference(write_stats, query_stats, every=10.0):
+    writes = write_stats.window_series()
+    queries = query_stats.window_series()
+    paired = [(w, q) for w, q in zip(writes, queries) if w["requests"] and q["requests"]]
+    correlations = {
+        label: pearson([w[wk] for w, _ in paired], [q[qk] for _, q in paired]) for label, wk, qk in PAIRS
+    }
+    rows = []
+    step = write_stats.window
+    for start in range(0, int(math.ceil(max(write_stats.elapsed(), query_stats.elapsed()) / every))):
+        t0, t1 = start * every, (start + 1) * every
+        w = write_stats.span(t0, t1)
+        q = query_stats.span(t0, t1)
+        rows.append({
+            "t": t0,
+            "write_eps": w["eps"],
+            "write_p99_ms": w["latency"]["p99_ms"],
+            "write_error_rate": w["error_rate"],
+            "queries": q["requests"],
+            "query_p50_ms": q["latency"]["p50_ms"],
+            "query_p99_ms": q["latency"]["p99_ms"],
+            "query_error_rate": q["error_rate"],
+        })
+    return {"window_s": step, "row_s": every, "paired_windows": len(paired), "correlations": correlations,
+            "rows": rows}
+
+
+def print_interference(summary):
+    print("=== Read/write interference ===")
+    print(f"  {'t':>6}  {'write EPS':>10}  {'write p99':>9}  {'w err%':>6}  {'queries':>7}  "
+          f"{'query p50':>9}  {'query p99':>9}  {'q err%':>6}")
+    for r in summary["rows"]:
+        print(f"  {r['t']:>5.0f}s  {r['write_eps']:>10.0f}  {r['write_p99_ms']:>7.1f}ms  "
+              f"{r['write_error_rate'] * 100:>6.2f}  {r['queries']:>7}  {r['query_p50_ms']:>7.1f}ms  "
+              f"{r['query_p99_ms']:>7.1f}ms  {r['query_error_rate'] * 100:>6.2f}")
+    print(f"  correlation over {summary['paired_windows']} windows of {summary['window_s']:.0f}s:")
+    for label, r in summary["correlations"].items():
+        print(f"    {label:<24} " + ("n/a" if r is None else f"r = {r:+.2f}"))
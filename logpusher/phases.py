@@ -0,0 +1,150 @@
+"""Per-phase timing of sampled HTTP requests.
+
+`requests` hides where the time of a request goes, so a sample of batches is
+sent through `PhaseTimer`, a minimal HTTP/1.1 client on a raw socket that
+timestamps each step:
+
+    dns       getaddrinfo
+    connect   TCP handshake
+    tls       TLS handshake (https only)
+    send      writing headers and body
+    ttfb      body written -> first response byte (server time + one RTT)
+    transfer  first byte -> response fully read
+
+Like the session it stands in for, the timer keeps its connection alive, so
+dns/connect/tls are only paid when the previous connection was closed (e.g.
+by an ALB idle timeout); `fresh=True` opens a new connection per sample.
+"""
+import select
+import socket
+import ssl
+import threading
+import time
+from http.client import HTTPException, HTTPResponse, RemoteDisconnected
+from urllib.parse import urlparse
+
+from .stats import bucket_counts, latency_summary
+
+PHASES = ("dns", "connect", "tls", "send", "ttfb", "transfer")
+# Upper bounds (ms) of the histogram buckets printed in the run summary.
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+class PhaseStats:
+    def __init__(self):
+        self.samples = {phase: [] for phase in PHASES}
+        self.requests = 0
+        self.new_connections = 0
+        self._lock = threading.Lock()
+
+    def record(self, timings, new_connection):
+        with self._lock:
+            self.requests += 1
+            if new_connection:
+                self.new_connections += 1
+            for phase, seconds in timings.items():
+                self.samples[phase].append(seconds)
+
+    def summary(self):
+        with self._lock:
+            result = {"requests": self.requests, "new_connections": self.new_connections, "phases": {}}
+            for phase in PHASES:
+                values = self.samples[phase]
+                result["phases"][phase] = dict(latency_summary(values), histogram=bucket_counts(values, BUCKETS_MS))
+        return result
+
+
+def print_phase_summary(summary):
+    print("=== Connection phases ===")
+    print(f"  sampled:      {summary['requests']} requests, {summary['new_connections']} new connections")
+    labels = [f"<{b}ms" for b in BUCKETS_MS] + [f">={BUCKETS_MS[-1]}ms"]
+    for phase in PHASES:
+        p = summary["phases"][phase]
+        if not p["count"]:
+            continue
+        print(f"  {phase:<9} n={p['count']:<6} p50 {p['p50_ms']:.1f}  p90 {p['p90_ms']:.1f}  "
+              f"p99 {p['p99_ms']:.1f}  max {p['max_ms']:.1f} ms")
+        print("            " + "  ".join(f"{label}:{n}" for label, n in zip(labels, p["histogram"]) if n))
+
+
+class PhaseTimer:
+    """Sends POSTs over its own socket, timing each phase (one per thread)."""
+
+    def __init__(self, url, headers, stats, timeout=30.0, fresh=False):
+        parsed = urlparse(url)
+        self.tls = parsed.scheme == "https"
+        self.host = parsed.hostname
+        self.port = parsed.port or (443 if self.tls else 80)
+        self.path = (parsed.path or "/") + (f"?{parsed.query}" if parsed.query else "")
+        host_header = parsed.netloc.rsplit("@", 1)[-1]
+        self.head = "".join(f"{k}: {v}\r\n" for k, v in headers.items() if k.lower() != "host")
+        self.head = f"Host: {host_header}\r\nConnection: keep-alive\r\n" + self.head
+        self.stats = stats
+        self.timeout = timeout
+        self.fresh = fresh
+        self._ssl = ssl.create_default_context() if self.tls else None
+        self._sock = None
+
+    def _connect(self, timings):
+        t0 = time.perf_counter()
+        family, socktype, proto, _, addr = socket.getaddrinfo(self.host, self.port, type=socket.SOCK_STREAM)[0]
+        t1 = time.perf_counter()
+        sock = socket.socket(family, socktype, proto)
+        sock.settimeout(self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.connect(addr)
+        t2 = time.perf_counter()
+        if self._ssl is not None:
+            sock = self._ssl.wrap_socket(sock, server_hostname=self.host)
+        t3 = time.perf_counter()
+        timings.update(dns=t1 - t0, connect=t2 - t1)
+        if self._ssl is not None:
+            timings["tls"] = t3 - t2
+        return sock
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def post(self, body):
+        """POST body; returns the status code (0 if the request failed)."""
+        timings = {}
+        new_connection = self._sock is None or self.fresh
+        sending = True
+        try:
+            if new_connection:
+                self.close()
+                self._sock = self._connect(timings)
+            else:
+                timings.update(dns=0.0, connect=0.0)
+                if self.tls:
+                    timings["tls"] = 0.0
+            sock = self._sock
+            t0 = time.perf_counter()
+            sock.sendall(f"POST {self.path} HTTP/1.1\r\n{self.head}Content-Length: {len(body)}\r\n\r\n"
+                         .encode("latin-1"))
+            sock.sendall(body)
+            sending = False
+            t1 = time.perf_counter()
+            # Nothing is buffered yet, so readability of the raw socket is the first response byte.
+            select.select([sock], [], [], self.timeout)
+            t2 = time.perf_counter()
+            response = HTTPResponse(sock)
+            response.begin()
+            response.read()
+            t3 = time.perf_counter()
+            if response.will_close:
+                self.close()
+        except (OSError, ValueError, HTTPException) as e:
+            self.close()
+            # A kept-alive connection the server had already dropped fails on the write or ends before a
+            # byte of response: retry once on a new one. Anything else (a timeout above all) may come after
+            # the server took the batch, so resending could ingest it twice.
+            if not new_connection and (isinstance(e, RemoteDisconnected)
+                                       or (sending and isinstance(e, ConnectionError))):
+                return self.post(body)
+            return 0
+        timings.update(send=t1 - t0, ttfb=t2 - t1, transfer=t3 - t2)
+        self.stats.record(timings, new_connection)
+        return response.status
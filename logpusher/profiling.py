@@ -0,0 +1,211 @@
+"""Profiling hooks for finding out when the pusher itself is the bottleneck.
+
+Three modes, all covering the main thread and every worker thread:
+
+- `cpu`: deterministic cProfile; writes `cpu.pstats` (for snakeviz,
+  gprof2dot, `python -m pstats`) and a top-N text report.
+- `sample`: a wall-clock sampling profiler that snapshots every thread's
+  stack at a fixed interval; writes `cpu.folded`, collapsed stacks ready for
+  flamegraph.pl or speedscope. Much lower overhead than `cpu`.
+- `alloc`: tracemalloc; writes `alloc.txt` with the peak traced memory and
+  the top-N allocation sites per pipeline stage (generate, encode, send,
+  spool, stats), taken from the largest snapshot seen during the run.
+"""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+# Pipeline stage of an allocation, by the innermost frame matching one of these path fragments.
+STAGES = (
+    ("send", ("requests/", "urllib3/", "http/client.py", "ssl.py", "socket.py", "grpc/",
+              "logpusher/senders.py", "logpusher/grpc_ingest.py", "logpusher/phases.py")),
+    ("encode", ("logpusher/buffers.py", "logpusher/firehose.py")),
+    ("generate", ("logpusher/records.py", "logpusher/templates.py", "logpusher/messages.py", "<template>")),
+    ("spool", ("logpusher/spool.py",)),
+    ("stats", ("logpusher/stats.py",)),
+)
+
+
+def _stage(traceback):
+    for frame in reversed(traceback):
+        filename = frame.filename.replace(os.sep, "/")
+        for stage, fragments in STAGES:
+            if any(fragment in filename for fragment in fragments):
+                return stage
+    return "other"
+
+
+class _CpuProfiler:
+    def __init__(self):
+        self.profiles = []
+        self._lock = threading.Lock()
+
+    def _new(self):
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ hooks cProfile into sys.monitoring, which is interpreter-wide:
+            # the main-thread profiler already sees this thread.
+            return
+        with self._lock:
+            self.profiles.append(profile)
+
+    def _bootstrap(self, frame, event, arg):
+        # Runs on the first profiling event of each new thread; hands the thread over to cProfile.
+        sys.setprofile(None)
+        self._new()
+
+    def start(self):
+        threading.setprofile(self._bootstrap)
+        self._new()
+
+    def stop(self, out_dir, top):
+        threading.setprofile(None)
+        self.profiles[0].disable()
+        stats = None
+        for profile in self.profiles:
+            profile.create_stats()
+            if stats is None:
+                stats = pstats.Stats(profile)
+            elif profile.stats:
+                stats.add(profile)
+        stats.strip_dirs()
+        path = os.path.join(out_dir, "cpu.pstats")
+        stats.dump_stats(path)
+        report = io.StringIO()
+        stats.stream = report
+        stats.sort_stats("cumulative").print_stats(top)
+        stats.sort_stats("tottime").print_stats(top)
+        with open(os.path.join(out_dir, "cpu.txt"), "w") as f:
+            f.write(report.getvalue())
+        return [path, os.path.join(out_dir, "cpu.txt")]
+
+
+class _Sampler:
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stopping.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self, out_dir, top):
+        self._stopping.set()
+        self._thread.join()
+        path = os.path.join(out_dir, "cpu.folded")
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return [path]
+
+
+class _AllocTracer:
+    def __init__(self, frames=25, interval=1.0):
+        self.frames = frames
+        self.interval = interval
+        self.best = None
+        self.best_size = -1
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="alloc-snapshots", daemon=True)
+
+    def _snapshot(self):
+        snapshot = tracemalloc.take_snapshot()
+        size = sum(stat.size for stat in snapshot.statistics("filename"))
+        if size > self.best_size:
+            self.best, self.best_size = snapshot, size
+
+    def _run(self):
+        while not self._stopping.wait(self.interval):
+            self._snapshot()
+
+    def start(self):
+        tracemalloc.start(self.frames)
+        self._thread.start()
+
+    def stop(self, out_dir, top):
+        self._stopping.set()
+        self._thread.join()
+        self._snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        snapshot = self.best.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ))
+        by_stage = {}
+        for stat in snapshot.statistics("traceback"):
+            by_stage.setdefault(_stage(stat.traceback), []).append(stat)
+
+        lines = [f"peak traced memory: {peak / 1024:.1f} KiB",
+                 f"largest snapshot:   {self.best_size / 1024:.1f} KiB", ""]
+        for stage, stats in sorted(by_stage.items(), key=lambda kv: -sum(s.size for s in kv[1])):
+            lines.append(f"== {stage}: {sum(s.size for s in stats) / 1024:.1f} KiB "
+                         f"in {sum(s.count for s in stats)} blocks")
+            sites = Counter()
+            counts = Counter()
+            for stat in stats:
+                frame = stat.traceback[-1]  # innermost frame: where the block was allocated
+                sites[(frame.filename, frame.lineno)] += stat.size
+                counts[(frame.filename, frame.lineno)] += stat.count
+            for (filename, lineno), size in sites.most_common(top):
+                lines.append(f"  {size / 1024:10.1f} KiB {counts[(filename, lineno)]:8d} blocks  "
+                             f"{filename}:{lineno}")
+            lines.append("")
+        path = os.path.join(out_dir, "alloc.txt")
+        with open(path, "w") as f:
+            f.write("\n".join(lines))
+        return [path]
+
+
+PROFILERS = {"cpu": _CpuProfiler, "sample": _Sampler, "alloc": _AllocTracer}
+
+
+class Profiling:
+    """Context manager running the workload under the chosen profiler."""
+
+    def __init__(self, mode, out_dir="profile", top=25):
+        self.mode = mode
+        self.out_dir = out_dir
+        self.top = top
+        self.profiler = PROFILERS[mode]()
+        self.written = []
+
+    def __enter__(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        self.started = time.perf_counter()
+        self.profiler.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.written = self.profiler.stop(self.out_dir, self.top)
+        print(f"=== Profile ({self.mode}, {time.perf_counter() - self.started:.1f}s) ===")
+        for path in self.written:
+            print(f"  wrote {path}")
+        return False
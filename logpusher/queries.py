@@ -0,0 +1,221 @@
+"""Search load against the `_search` API, for sizing the querier role.
+
+A mix of query classes is run at a target rate (queries per second) with a
+bounded number in flight. Each query covers the last `range_seconds` of the
+stream. Per class, the latency, errors and status codes are recorded along
+with what the response says about the work done: `took` (server time),
+`scan_size` (MB scanned), `scan_records` and hits.
+
+A mix is a JSON list of classes:
+
+    [{"name": "match", "weight": 4, "size": 100,
+      "sql": "SELECT * FROM \\"{stream}\\" WHERE match_all('forbidden')"}]
+
+`{stream}` is replaced by the stream name; `size` is the page size (default
+100) and `weight` the relative frequency (default 1).
+"""
+import bisect
+import json
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from .senders import basic_auth
+from .stats import bucket_counts, latency_summary
+
+# Defaults for the prometheus-k8s records the pusher generates (OpenObserve flattens dots to underscores).
+DEFAULT_MIX = (
+    {"name": "full-text", "weight": 4, "size": 100,
+     "sql": "SELECT * FROM \"{stream}\" WHERE match_all('forbidden') ORDER BY _timestamp DESC"},
+    {"name": "aggregation", "weight": 2, "size": 0,
+     "sql": "SELECT kubernetes_pod_name, count(*) AS n FROM \"{stream}\" GROUP BY kubernetes_pod_name "
+            "ORDER BY n DESC"},
+    {"name": "histogram", "weight": 3, "size": 0,
+     "sql": "SELECT histogram(_timestamp) AS ts, count(*) AS n FROM \"{stream}\" GROUP BY ts ORDER BY ts"},
+    {"name": "range-scan", "weight": 1, "size": 1000,
+     "sql": "SELECT * FROM \"{stream}\" ORDER BY _timestamp DESC"},
+)
+# Upper bounds (ms) of the per-class latency histograms.
+BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+def load_mix(path):
+    with open(path) as f:
+        mix = json.load(f)
+    if not isinstance(mix, list) or not mix:
+        raise ValueError("a query mix is a non-empty JSON list of query classes")
+    names = set()
+    total = 0
+    for query in mix:
+        if not isinstance(query, dict) or "name" not in query or "sql" not in query:
+            raise ValueError("every query class needs a name and sql")
+        if query["name"] in names:
+            raise ValueError(f"query class {query['name']!r} appears twice; names must be unique")
+        names.add(query["name"])
+        weight = query.get("weight", 1)
+        if isinstance(weight, bool) or not isinstance(weight, (int, float)) or not 0 <= weight < math.inf:
+            raise ValueError(f"weight of query class {query['name']!r} must be a number >= 0, not {weight!r}")
+        total += weight
+    if total <= 0:
+        raise ValueError("the weights of a query mix must add up to more than 0")
+    return mix
+
+
+class _ClassStats:
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.status_codes = {}
+        self.took_ms = []
+        self.scan_mb = []
+        self.scan_records = []
+        self.hits = 0
+
+
+class QueryLoad:
+    def __init__(self, host, org, stream, user, password, mix=DEFAULT_MIX, qps=5.0, concurrency=4,
+                 range_seconds=900.0, timeout=60.0, rng=random, stats=None):
+        self.url = host + "/api/" + org + "/_search"
+        self.headers = {"Content-type": "application/json", "Authorization": basic_auth(user, password)}
+        self.stream = stream
+        self.mix = [dict(query, sql=query["sql"].replace("{stream}", stream)) for query in mix]
+        total = 0
+        self._cumulative = []
+        for query in self.mix:
+            total += query.get("weight", 1)
+            self._cumulative.append(total)
+        self.qps = qps
+        self.concurrency = concurrency
+        self.range_seconds = range_seconds
+        self.timeout = timeout
+        self.rng = rng
+        # Optional RunStats fed every query (one "record" each), for windowed latency over the run.
+        self.stats = stats
+        self.classes = {query["name"]: _ClassStats() for query in self.mix}
+        self.elapsed = 0.0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _choose(self):
+        point = self.rng.random() * self._cumulative[-1]
+        return self.mix[min(bisect.bisect_right(self._cumulative, point), len(self.mix) - 1)]
+
+    def query(self, query):
+        """Run one query of the mix (a `range_seconds` key overrides the load's range); True if it succeeded."""
+        end = int(time.time() * 1_000_000)
+        range_seconds = query.get("range_seconds", self.range_seconds)
+        body = {"query": {"sql": query["sql"], "start_time": end - int(range_seconds * 1_000_000),
+                          "end_time": end, "from": 0, "size": query.get("size", 100)}}
+        t0 = time.perf_counter()
+        result = None
+        try:
+            res = self._session().post(self.url, params={"type": "logs"}, headers=self.headers, json=body,
+                                       timeout=self.timeout)
+            status = res.status_code
+            if status == 200:
+                result = res.json()
+        except (requests.RequestException, ValueError):
+            status = 0
+        latency = time.perf_counter() - t0
+        if self.stats is not None:
+            self.stats.record(latency, 1, result is not None, status)
+        stats = self.classes[query["name"]]
+        with self._lock:
+            stats.latencies.append(latency)
+            stats.status_codes[str(status)] = stats.status_codes.get(str(status), 0) + 1
+            if result is None:
+                stats.errors += 1
+                return False
+            if "took" in result:
+                stats.took_ms.append(result["took"])
+            if "scan_size" in result:
+                stats.scan_mb.append(result["scan_size"])
+            if "scan_records" in result:
+                stats.scan_records.append(result["scan_records"])
+            stats.hits += len(result.get("hits", ()))
+        return True
+
+    def run(self, duration):
+        slots = threading.BoundedSemaphore(self.concurrency)
+
+        def task(query):
+            try:
+                self.query(query)
+            finally:
+                slots.release()
+
+        started = time.monotonic()
+        issued = 0
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            while time.monotonic() - started < duration:
+                wait = started + issued / self.qps - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                slots.acquire()
+                pool.submit(task, self._choose())
+                issued += 1
+        self.elapsed = time.monotonic() - started
+
+    def summary(self):
+        with self._lock:
+            classes = {}
+            for name, stats in self.classes.items():
+                count = len(stats.latencies)
+                classes[name] = {
+                    "queries": count,
+                    "errors": stats.errors,
+                    "error_rate": stats.errors / count if count else 0.0,
+                    "status_codes": dict(sorted(stats.status_codes.items())),
+                    "latency": latency_summary(stats.latencies),
+                    "histogram": bucket_counts(stats.latencies, BUCKETS_MS),
+                    "took": latency_summary([ms / 1000 for ms in stats.took_ms]),
+                    "scan_mb": _spread(stats.scan_mb),
+                    "scan_records": _spread(stats.scan_records),
+                    "hits": stats.hits,
+                }
+        queries = sum(c["queries"] for c in classes.values())
+        return {
+            "elapsed_s": self.elapsed,
+            "queries": queries,
+            "qps": queries / self.elapsed if self.elapsed else 0.0,
+            "range_s": self.range_seconds,
+            "classes": classes,
+        }
+
+
+def _spread(values):
+    if not values:
+        return None
+    values = sorted(values)
+    return {"mean": sum(values) / len(values), "p50": values[len(values) // 2], "max": values[-1],
+            "total": sum(values)}
+
+
+def print_query_summary(summary):
+    print("=== Query load ===")
+    print(f"  elapsed:      {summary['elapsed_s']:.2f}s")
+    print(f"  queries:      {summary['queries']} ({summary['qps']:.1f} QPS) over the last {summary['range_s']:.0f}s")
+    labels = [f"<{b}ms" for b in BUCKETS_MS] + [f">={BUCKETS_MS[-1]}ms"]
+    for name, c in summary["classes"].items():
+        if not c["queries"]:
+            continue
+        lat = c["latency"]
+        print(f"  {name}: {c['queries']} queries, errors {c['error_rate'] * 100:.2f}%, "
+              f"status codes {c['status_codes']}")
+        print(f"    latency (ms): p50 {lat['p50_ms']:.1f}  p90 {lat['p90_ms']:.1f}  p99 {lat['p99_ms']:.1f}  "
+              f"max {lat['max_ms']:.1f}   server took p50 {c['took']['p50_ms']:.1f}")
+        print("    " + "  ".join(f"{label}:{n}" for label, n in zip(labels, c["histogram"]) if n))
+        if c["scan_mb"]:
+            print(f"    scanned:      mean {c['scan_mb']['mean']:.1f} MB  max {c['scan_mb']['max']:.1f} MB"
+                  + (f", mean {c['scan_records']['mean']:.0f} records" if c["scan_records"] else "")
+                  + f", {c['hits']} hits")
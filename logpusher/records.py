@@ -0,0 +1,61 @@
+import random
+import uuid
+from datetime import datetime, timezone
+
+HEX = '0123456789abcdef'
+
+
+def prometheus_record(log_id, message=None, rng=random, now=None):
+    """The prometheus-k8s klog warning shipped by fluent-bit on EKS.
+
+    `message` is an optional (level, text) pair replacing the fixed
+    "pods is forbidden" warning in the `log` field. `rng` and `now` let
+    callers make the record deterministic (see logpusher.seeding).
+    """
+    # Generate fresh UTC timestamp for each log
+    current_timestamp = (now or datetime.now(timezone.utc)).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+    # Generate unique identifiers for each log
+    unique_pod_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+    unique_docker_id = ''.join(rng.choices(HEX, k=64))
+    unique_revision_hash = ''.join(rng.choices(HEX, k=16))
+    pod_instance = rng.randint(1, 5)  # Random pod instance 1-5
+
+    if message is None:
+        log = f"ts={current_timestamp} caller=klog.go:108 level=warn component=k8s_client_runtime func=Warningf msg=\"pkg/mod/k8s.io/client-go@v0.25.1/tools/cache/reflector.go:169: failed to list *v1.Pod: pods is forbidden: User \\\"system:serviceaccount:monitoring:prometheus-k8s\\\" cannot list resource \\\"pods\\\" in API group \\\"\\\" at the cluster scope\" log_id={log_id} unique_id={unique_pod_id[:8]}"
+    else:
+        level, text = message
+        log = f"ts={current_timestamp} level={level.lower()} msg=\"{text}\" log_id={log_id} unique_id={unique_pod_id[:8]}"
+
+    return {
+        "kubernetes.annotations.kubectl.kubernetes.io/default-container": "prometheus",
+        "kubernetes.annotations.kubernetes.io/psp": "eks.privileged",
+        "kubernetes.container_hash": "quay.io/prometheus/prometheus@sha256:4748e26f9369ee7270a7cd3fb9385c1adb441c05792ce2bce2f6dd622fd91d38",
+        "kubernetes.container_image": "quay.io/prometheus/prometheus:v2.39.1",
+        "kubernetes.container_name": "prometheus",
+        "kubernetes.docker_id": unique_docker_id,
+        "kubernetes.host": "ip-10-2-50-35.us-east-2.compute.internal",
+        "kubernetes.labels.app.kubernetes.io/component": "prometheus",
+        "kubernetes.labels.app.kubernetes.io/instance": "k8s",
+        "kubernetes.labels.app.kubernetes.io/managed-by": "prometheus-operator",
+        "kubernetes.labels.app.kubernetes.io/name": "prometheus",
+        "kubernetes.labels.app.kubernetes.io/part-of": "kube-prometheus",
+        "kubernetes.labels.app.kubernetes.io/version": "2.39.1",
+        "kubernetes.labels.controller-revision-hash": f"prometheus-k8s-{unique_revision_hash}",
+        "kubernetes.labels.operator.prometheus.io/name": "k8s",
+        "kubernetes.labels.operator.prometheus.io/shard": "0",
+        "kubernetes.labels.prometheus": "k8s",
+        "kubernetes.labels.statefulset.kubernetes.io/pod-name": f"prometheus-k8s-{pod_instance}",
+        "kubernetes.namespace_name": "monitoring",
+        "kubernetes.pod_id": unique_pod_id,
+        "kubernetes.pod_name": f"prometheus-k8s-{pod_instance}",
+        "log": log,
+        "stream": "stderr"
+    }
+
+
+def prometheus_record_with_messages(generator):
+    """prometheus_record with `log` bodies drawn from a MessageGenerator."""
+    def make_record(log_id, rng=random, now=None):
+        return prometheus_record(log_id, generator.message(rng), rng, now)
+    return make_record
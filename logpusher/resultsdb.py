@@ -0,0 +1,123 @@
+"""Persist run results to PostgreSQL for trends across OpenObserve upgrades.
+
+Each run becomes one row in `logpusher_runs` plus its per-window series in
+`logpusher_windows`, written in one transaction with two statements: an
+INSERT for the run and a COPY for all of its windows. The tables are
+created on first use:
+
+    logpusher_runs     run_id, created, image_tag, task_size, config_hash,
+                       config, transport, elapsed_s, records_ok,
+                       records_failed, eps, error_rate, p50_ms, p99_ms,
+                       summary (the JSON summary without the windows, plus
+                       any extra report sections)
+    logpusher_windows  run_id, t, requests, errors, eps, bytes_per_sec,
+                       error_rate, p50_ms, p99_ms
+
+Runs are keyed by the OpenObserve image tag, the task size and a hash of
+the workload configuration (the command-line options that shape the load,
+minus where it goes and how it is reported), so like can be charted
+against like:
+
+    SELECT created, image_tag, eps, p99_ms FROM logpusher_runs
+    WHERE config_hash = '...' AND task_size = '4vCPU/8GB' ORDER BY created;
+
+Needs `psycopg2` (the `psycopg2-binary` wheel is enough).
+"""
+import csv
+import hashlib
+import io
+import json
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS logpusher_runs (
+    run_id         bigserial PRIMARY KEY,
+    created        timestamptz NOT NULL DEFAULT now(),
+    image_tag      text,
+    task_size      text,
+    config_hash    text NOT NULL,
+    config         jsonb NOT NULL,
+    transport      text,
+    elapsed_s      double precision,
+    records_ok     bigint,
+    records_failed bigint,
+    eps            double precision,
+    error_rate     double precision,
+    p50_ms         double precision,
+    p99_ms         double precision,
+    summary        jsonb NOT NULL
+);
+CREATE INDEX IF NOT EXISTS logpusher_runs_key ON logpusher_runs (config_hash, image_tag, task_size, created);
+CREATE TABLE IF NOT EXISTS logpusher_windows (
+    run_id         bigint NOT NULL REFERENCES logpusher_runs ON DELETE CASCADE,
+    t              double precision NOT NULL,
+    requests       integer,
+    errors         integer,
+    eps            double precision,
+    bytes_per_sec  double precision,
+    error_rate     double precision,
+    p50_ms         double precision,
+    p99_ms         double precision,
+    PRIMARY KEY (run_id, t)
+);
+"""
+WINDOW_COLUMNS = ("t", "requests", "errors", "eps", "bytes_per_sec", "error_rate", "p50_ms", "p99_ms")
+
+# Options that say where the load goes or how it is reported, not what it is.
+NOT_CONFIG = frozenset((
+    "host", "org", "user", "password", "endpoint", "resolve_dns", "grpc_addr", "grpc_token", "drain_node",
+    "quiet", "summary_out", "results_db", "image_tag", "task_size", "profile", "profile_out", "profile_top",
+    "checkpoint", "spool_dir", "scrape_metrics", "scrape_interval", "scrape_include", "spike_factor",
+))
+
+
+def run_config(args):
+    """The workload-defining options of a parsed command line."""
+    return {name: value for name, value in sorted(vars(args).items()) if name not in NOT_CONFIG}
+
+
+def config_hash(config):
+    return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def driver():
+    """The psycopg2 module; checked before a run so a long run is not lost for want of it."""
+    try:
+        import psycopg2
+    except ImportError:
+        raise SystemExit("--results-db requires the psycopg2 package (pip install psycopg2-binary)")
+    return psycopg2
+
+
+def save_run(dsn, summary, config, image_tag=None, task_size=None, transport=None, **sections):
+    """Write one run and its windows; returns the new run_id."""
+    psycopg2 = driver()
+    run = {name: value for name, value in summary.items() if name != "windows"}
+    run.update((name, section) for name, section in sections.items() if section is not None)
+    lat = summary["latency"]
+    rows = io.StringIO()
+    try:
+        conn = psycopg2.connect(dsn)
+    except psycopg2.Error as e:
+        raise SystemExit(f"--results-db: cannot connect: {e}")
+    try:
+        with conn, conn.cursor() as cur:
+            cur.execute(SCHEMA)
+            cur.execute(
+                "INSERT INTO logpusher_runs (image_tag, task_size, config_hash, config, transport, elapsed_s, "
+                "records_ok, records_failed, eps, error_rate, p50_ms, p99_ms, summary) "
+                "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s) RETURNING run_id",
+                (image_tag, task_size, config_hash(config), json.dumps(config, default=str), transport,
+                 summary["elapsed_s"], summary["records_ok"], summary["records_failed"], summary["eps"],
+                 summary["error_rate"], lat["p50_ms"], lat["p99_ms"], json.dumps(run, default=str)))
+            run_id = cur.fetchone()[0]
+            writer = csv.writer(rows)
+            for window in summary.get("windows", ()):
+                writer.writerow([run_id] + [window[column] for column in WINDOW_COLUMNS])
+            rows.seek(0)
+            cur.copy_expert(f"COPY logpusher_windows (run_id, {', '.join(WINDOW_COLUMNS)}) FROM STDIN "
+                            "WITH (FORMAT csv)", rows)
+    except psycopg2.Error as e:
+        raise SystemExit(f"--results-db: the run was not saved: {e}")
+    finally:
+        conn.close()
+    return run_id
@@ -0,0 +1,199 @@
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .buffers import BufferPool, Writer
+from .senders import RETRYABLE
+
+
+def _label(first, last, total):
+    if first == last:
+        return f"Log {first}/{total}"
+    return f"Logs {first}-{last}/{total}"
+
+
+def batches(num_logs, batch_size, make_record):
+    """Yield (first_id, last_id, records) with 1-based log ids; endless if num_logs is None."""
+    starts = itertools.count(1, batch_size) if num_logs is None else range(1, num_logs + 1, batch_size)
+    for start in starts:
+        end = start + batch_size - 1 if num_logs is None else min(start + batch_size - 1, num_logs)
+        yield start, end, [make_record(log_id) for log_id in range(start, end + 1)]
+
+
+class Runner:
+    """Drives a sender with batches of generated records.
+
+    `concurrency` is the number of requests kept in flight; with the default
+    of 1 batches are sent inline, one after the other, as the original script
+    did. `rate` caps throughput in records per second by pacing batch starts.
+    With a `limiter` (see logpusher.adaptive) the number in flight follows the
+    limiter instead, and `concurrency` only bounds the worker threads.
+
+    With `retry`, a batch failing with a retryable status is re-sent with
+    backoff until it gets through (unless a spool takes it), and `on_done`
+    is called as `on_done(first, last, delivered)` once each batch is
+    settled; shippers use both to checkpoint only what was delivered.
+    `stop()` ends the retries: a batch given up that way is left unsettled
+    (no `on_done`), so a checkpoint never moves past it.
+    """
+
+    def __init__(self, sender, stats, batch_size=1, concurrency=1, delay=0.0, verbose=True, spool=None,
+                 buffer_bytes=1024 * 1024, rate=None, checksum=None, limiter=None, retry=False, on_done=None,
+                 backoff=0.5, max_backoff=30.0):
+        self.sender = sender
+        self.spool = spool
+        self.checksum = checksum
+        self.limiter = limiter
+        self.retry = retry
+        self.on_done = on_done
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        # One pre-allocated body buffer per in-flight request, recycled between batches.
+        self.pool = BufferPool(count=max(concurrency, 1), size=buffer_bytes)
+        self.stats = stats
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.delay = delay
+        self.rate = rate
+        self.verbose = verbose
+        self._stopping = threading.Event()
+
+    def stop(self):
+        """Give up on batches still being retried (e.g. on SIGTERM during an outage)."""
+        self._stopping.set()
+
+    def _send(self, first, last, total, records):
+        if not records:
+            # Everything in the batch was filtered out (see logpusher.dedup): settled, nothing to send.
+            if self.on_done is not None:
+                self.on_done(first, last, True)
+            return True
+        delivered = None
+        buf = self.pool.acquire()
+        try:
+            writer = Writer(buf, self.pool)
+            try:
+                self.sender.encode_into(records, writer)
+            except Exception:
+                # A batch that cannot be encoded is settled as not delivered, like one the server rejects.
+                delivered = False
+                raise
+            body = writer.view()
+            try:
+                delivered = self._deliver(first, last, total, records, body)
+            finally:
+                body.release()
+        finally:
+            # Anything else cutting the delivery short (stop(), KeyboardInterrupt) leaves the batch unsettled.
+            self.pool.release(buf)
+            if self.on_done is not None and delivered is not None:
+                self.on_done(first, last, delivered)
+        return delivered
+
+    def _deliver(self, first, last, total, records, body):
+        """Send (or spool) one encoded batch; True once the endpoint or the spool has it.
+
+        None if it was still being retried when the runner was stopped.
+        """
+        if self.spool is not None and self.spool.pending():
+            # Keep delivery ordered: queue behind whatever is already spooled.
+            self.spool.append(body, len(records))
+            if self.checksum is not None:
+                self.checksum.add(records)
+            if self.verbose:
+                print(f"{_label(first, last, total)} spooled")
+            return True
+        delay = self.backoff
+        while True:
+            t0 = time.perf_counter()
+            ok, status, nbytes = self.sender.send_body(body)
+            latency = time.perf_counter() - t0
+            self.stats.record(latency, len(records), ok, status, nbytes)
+            if self.limiter is not None:
+                self.limiter.update(latency, ok)
+            if ok or not self.retry or self.spool is not None or status not in RETRYABLE:
+                break
+            if self.verbose:
+                print(f"{_label(first, last, total)} failed with status code: {status} (retrying in {delay:g}s)")
+            if self._stopping.wait(delay):
+                if self.verbose:
+                    print(f"{_label(first, last, total)} given up: stopping")
+                return None
+            delay = min(delay * 2, self.max_backoff)
+        spooled = not ok and self.spool is not None and status in RETRYABLE
+        if spooled:
+            self.spool.append(body, len(records))
+        if self.checksum is not None and (ok or spooled):
+            self.checksum.add(records)
+        if self.verbose:
+            limit = f" [limit {self.limiter.current}]" if self.limiter is not None else ""
+            if ok:
+                print(f"{_label(first, last, total)} sent successfully{limit}")
+            else:
+                print(f"{_label(first, last, total)} failed with status code: {status}"
+                      + (" (spooled)" if spooled else "") + limit)
+        return ok or spooled
+
+    def _paced(self, num_logs, source, duration):
+        """Batches to send, honouring --delay, the rate limit and the time budget."""
+        started = time.monotonic()
+        sent = 0
+        for first, last, records in source:
+            if duration is not None and time.monotonic() - started >= duration:
+                return
+            if self.rate:
+                wait = started + sent / self.rate - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+            yield first, last, records
+            sent += len(records)
+            # Add delay between requests if specified
+            if self.delay > 0 and (num_logs is None or last < num_logs):
+                time.sleep(self.delay)
+
+    def run(self, num_logs, make_record, duration=None, source=None):
+        """Send num_logs records, or keep sending for `duration` seconds if num_logs is None.
+
+        `source` replaces the generated batches with any iterable of (first_id, last_id, records).
+        """
+        total = num_logs if num_logs is not None else "-"
+        if source is None:
+            source = batches(num_logs, self.batch_size, make_record)
+        if self.concurrency <= 1 and self.limiter is None:
+            try:
+                for first, last, records in self._paced(num_logs, source, duration):
+                    self._send(first, last, total, records)
+            finally:
+                self.stats.finish()
+            return
+
+        slots = self.limiter or threading.BoundedSemaphore(self.concurrency)
+        errors = []
+
+        def task(first, last, records):
+            try:
+                self._send(first, last, total, records)
+            except BaseException as e:
+                # Raised again from run() below, as it would be when sending inline.
+                errors.append(e)
+            finally:
+                slots.release()
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                try:
+                    for first, last, records in self._paced(num_logs, source, duration):
+                        slots.acquire()
+                        if errors:
+                            slots.release()
+                            break
+                        pool.submit(task, first, last, records)
+                except BaseException:
+                    # E.g. KeyboardInterrupt: don't let the pool shutdown wait on batches retrying forever.
+                    self.stop()
+                    raise
+        finally:
+            self.stats.finish()
+        if errors:
+            raise errors[0]
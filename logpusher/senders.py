@@ -0,0 +1,86 @@
+import base64
+import itertools
+import json
+import threading
+
+from .buffers import encode_json_array_into
+from .phases import PhaseStats, PhaseTimer
+from .transports import RequestsTransport
+
+# Statuses worth retrying later: no response, timeouts, throttling and server errors.
+RETRYABLE = frozenset((0, 408, 429, 500, 502, 503, 504))
+
+
+def basic_auth(user, password):
+    return "Basic " + base64.b64encode(bytes(user + ":" + password, "utf-8")).decode("utf-8")
+
+
+class HttpSender:
+    """POSTs batches to the OpenObserve `_json` ingest endpoint.
+
+    Requests go through a `transport` (see logpusher.transports); the
+    default gives each worker thread its own `requests.Session` so
+    connections are kept alive without sharing a session across threads.
+    With a `balancer` (see logpusher.balancer) every request goes to the
+    endpoint it picks instead of `host`.
+    """
+
+    name = "http"
+
+    def __init__(self, host, org, stream, user, password, timeout=30.0, phase_sample=0, phase_fresh=False,
+                 balancer=None, transport=None):
+        self.path = "/api/" + org + "/" + stream + "/_json"
+        self.url = host + self.path
+        self.balancer = balancer
+        self.headers = {"Content-type": "application/json", "Authorization": basic_auth(user, password)}
+        self.timeout = timeout
+        self.transport = transport or RequestsTransport(timeout)
+        self._local = threading.local()
+        # Every `phase_sample`-th request goes through a PhaseTimer instead of the session.
+        self.phase_sample = phase_sample
+        self.phase_fresh = phase_fresh
+        self.phases = PhaseStats() if phase_sample else None
+        self._sent = itertools.count()
+        self._timers = []
+
+    def encode(self, records):
+        return json.dumps(records).encode("utf-8")
+
+    def encode_into(self, records, writer):
+        encode_json_array_into(records, writer)
+
+    def send(self, records):
+        """Send one batch; returns (ok, status_code, body_bytes). Status 0 means no response."""
+        return self.send_body(self.encode(records))
+
+    def _phase_timer(self):
+        timer = getattr(self._local, "phase_timer", None)
+        if timer is None:
+            timer = self._local.phase_timer = PhaseTimer(self.url, self.headers, self.phases,
+                                                         timeout=self.timeout, fresh=self.phase_fresh)
+            self._timers.append(timer)
+        return timer
+
+    def send_body(self, body):
+        """Send an already encoded batch (bytes or memoryview, see `encode`)."""
+        if self.phase_sample and next(self._sent) % self.phase_sample == 0:
+            status = self._phase_timer().post(body)
+            return status == 200, status, len(body)
+        if self.balancer is None:
+            return self._post(self.url, body)
+        endpoint = self.balancer.acquire()
+        ok, status = False, 0
+        try:
+            ok, status, nbytes = self._post(endpoint.url + self.path, body)
+        finally:
+            self.balancer.release(endpoint, ok, status)
+        return ok, status, nbytes
+
+    def _post(self, url, body):
+        status = self.transport.post(url, self.headers, body)
+        return status == 200, status, len(body)
+
+    def close(self):
+        self.transport.close()
+        for timer in self._timers:
+            timer.close()
@@ -0,0 +1,270 @@
+"""Scrape the OpenObserve nodes' Prometheus metrics during a run and line them up with the client.
+
+Every `interval` seconds each node's `/metrics` page is fetched and the
+families whose name matches `include` are kept (by default memtable, WAL,
+pending files, ingest volume and request latencies, e.g.
+`zo_ingest_memtable_bytes`, `zo_ingest_wal_used_bytes`,
+`zo_http_response_time`). Each family is summed over its label sets and
+becomes one series per node:
+
+    gauge (or untyped)    its value at the scrape
+    counter               its rate per second since the previous scrape
+    histogram / summary   "<name> mean": the mean observation since the
+                          previous scrape (delta of _sum over delta of _count)
+
+A scrape covers the time since the previous one, on the same clock as the
+RunStats windows, and each client window takes the values of the scrape
+interval that contains its middle. Every series is then correlated with
+the client p99 over the windows that saw traffic (Pearson's r). Latency
+spikes are runs of windows whose p99 is over `spike_factor` times the
+median; each lists the most correlated series that also moved in the
+direction of their r during the spike, with their value there and their
+median over the rest of the run.
+"""
+import re
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+from .mixed import pearson
+from .senders import basic_auth
+
+DEFAULT_INCLUDE = r"memtable|wal|pending|response_time|ingest_records|ingest_bytes|http_incoming_requests"
+_SUFFIXES = ("_total", "_sum", "_count", "_bucket", "_created")
+_SAMPLE = re.compile(r"([a-zA-Z_:][a-zA-Z0-9_:]*)(\{.*\})?\s+(\S+)")
+TOP_SPIKE_METRICS = 3
+MAX_SPIKES = 10
+
+
+def parse_metrics(text, include=None):
+    """({family: type}, {sample name: value summed over label sets}) of a Prometheus text page.
+
+    Only families matching the `include` regex are kept; histogram buckets
+    and summary quantiles are skipped, as only _sum and _count are used.
+    """
+    types = {}
+    totals = {}
+    for line in text.splitlines():
+        if line.startswith("#"):
+            parts = line.split()
+            if len(parts) >= 4 and parts[1] == "TYPE":
+                types[parts[2]] = parts[3]
+            continue
+        match = _SAMPLE.match(line)
+        if match is None:
+            continue
+        name, labels, value = match.groups()
+        family = _family(name, types)
+        if include is not None and not include.search(family):
+            continue
+        if name.endswith("_bucket") or (labels and 'quantile="' in labels):
+            continue
+        try:
+            value = float(value)
+        except ValueError:
+            continue
+        types.setdefault(family, "untyped")
+        totals[name] = totals.get(name, 0.0) + value
+    return {family: types[family] for family in {_family(name, types) for name in totals}}, totals
+
+
+def _family(name, types):
+    if name in types:
+        return name
+    for suffix in _SUFFIXES:
+        if name.endswith(suffix) and name[:-len(suffix)] in types:
+            return name[:-len(suffix)]
+    return name
+
+
+def derive(types, previous, current, seconds):
+    """{series: value} for one scrape interval, from the totals of its two ends (previous may be None)."""
+    values = {}
+    for family, kind in types.items():
+        if kind == "counter":
+            name = family if family in current else family + "_total"
+            if previous is not None and name in previous and name in current and seconds > 0:
+                delta = current[name] - previous[name]
+                if delta >= 0:      # a negative delta is a counter reset (node restart)
+                    values[family] = delta / seconds
+        elif kind in ("histogram", "summary"):
+            total, count = family + "_sum", family + "_count"
+            if previous is not None and all(n in previous and n in current for n in (total, count)):
+                observations = current[count] - previous[count]
+                if observations > 0:
+                    values[family + " mean"] = (current[total] - previous[total]) / observations
+        elif family in current:
+            values[family] = current[family]
+    return values
+
+
+class MetricsScraper(threading.Thread):
+    def __init__(self, urls, user, password, stats, interval=5.0, include=DEFAULT_INCLUDE, spike_factor=2.0,
+                 timeout=5.0):
+        super().__init__(name="metrics-scraper", daemon=True)
+        self.urls = [_metrics_url(url) for url in urls]
+        self.headers = {"Authorization": basic_auth(user, password)}
+        self.stats = stats
+        self.interval = interval
+        self.include = re.compile(include)
+        self.spike_factor = spike_factor
+        self.timeout = timeout
+        self.scrapes = {url: 0 for url in self.urls}
+        self.errors = {url: 0 for url in self.urls}
+        self.last_error = {url: None for url in self.urls}
+        self.points = {url: [] for url in self.urls}     # url -> [(start_s, end_s, {series: value})]
+        self._last = {}                                  # url -> (t, types, totals)
+        self._stopping = threading.Event()
+
+    def _now(self):
+        # Seconds into the run, on the same clock as the RunStats windows.
+        return time.monotonic() - self.stats.started
+
+    def scrape(self, url):
+        t = self._now()
+        try:
+            response = requests.get(url, headers=self.headers, timeout=self.timeout)
+            response.raise_for_status()
+            types, totals = parse_metrics(response.text, self.include)
+        except requests.RequestException as e:
+            self.errors[url] += 1
+            self.last_error[url] = str(e)
+            return
+        self.scrapes[url] += 1
+        last = self._last.get(url)
+        if last is None:
+            # Nothing to take a rate over yet: gauges only, standing for the run so far.
+            self.points[url].append((0.0, t, derive(types, None, totals, 0)))
+        else:
+            self.points[url].append((last[0], t, derive(types, last[2], totals, t - last[0])))
+        self._last[url] = (t, types, totals)
+
+    def run(self):
+        while True:
+            for url in self.urls:
+                self.scrape(url)
+            if self._stopping.wait(self.interval):
+                return
+
+    def stop(self):
+        """Stop scraping, after one last scrape that closes the final interval."""
+        self._stopping.set()
+        self.join()
+        for url in self.urls:
+            self.scrape(url)
+
+    def _series_name(self, url, series):
+        return series if len(self.urls) == 1 else f"{series}@{urlsplit(url).netloc}"
+
+    def aligned(self, windows):
+        """{series: [value or None per client window]}, each window taking the scrape interval around its middle."""
+        width = self.stats.window
+        aligned = {}
+        for url, points in self.points.items():
+            for i, window in enumerate(windows):
+                middle = window["t"] + width / 2
+                for start, end, values in points:
+                    if start <= middle < end:
+                        for series, value in values.items():
+                            aligned.setdefault(self._series_name(url, series), [None] * len(windows))[i] = value
+                        break
+        return aligned
+
+    def summary(self):
+        windows = self.stats.window_series()
+        aligned = self.aligned(windows)
+        busy = [i for i, w in enumerate(windows) if w["requests"]]
+        correlations = []
+        for series, values in aligned.items():
+            paired = [i for i in busy if values[i] is not None]
+            r = pearson([windows[i]["p99_ms"] for i in paired], [values[i] for i in paired])
+            if r is not None:
+                correlations.append({"metric": series, "r": r, "windows": len(paired)})
+        correlations.sort(key=lambda c: -abs(c["r"]))
+        return {
+            "interval_s": self.interval,
+            "include": self.include.pattern,
+            "nodes": [{"url": url, "scrapes": self.scrapes[url], "errors": self.errors[url],
+                       "last_error": self.last_error[url]} for url in self.urls],
+            "correlations": correlations,
+            "spikes": self._spikes(windows, busy, aligned, correlations),
+            "windows": [dict({"t": w["t"]}, **{series: values[i] for series, values in aligned.items()
+                                                if values[i] is not None})
+                        for i, w in enumerate(windows)],
+        }
+
+    def _spikes(self, windows, busy, aligned, correlations):
+        if not busy:
+            return {"factor": self.spike_factor, "median_p99_ms": None, "threshold_ms": None, "spikes": []}
+        median = statistics.median(windows[i]["p99_ms"] for i in busy)
+        threshold = median * self.spike_factor
+        runs = []
+        for i in busy:
+            if windows[i]["p99_ms"] > threshold:
+                if runs and runs[-1][-1] == i - 1:
+                    runs[-1].append(i)
+                else:
+                    runs.append([i])
+        # Keep the worst spikes, reported in time order.
+        runs = sorted(sorted(runs, key=lambda run: -max(windows[i]["p99_ms"] for i in run))[:MAX_SPIKES])
+        spiking = {i for run in runs for i in run}
+        spikes = []
+        for run in runs:
+            metrics = []
+            for c in correlations:
+                values = aligned[c["metric"]]
+                during = [values[i] for i in run if values[i] is not None]
+                rest = [values[i] for i in busy if i not in spiking and values[i] is not None]
+                if not during or not rest:
+                    continue
+                value, baseline = statistics.fmean(during), statistics.median(rest)
+                if (value - baseline) * c["r"] > 0:
+                    metrics.append({"metric": c["metric"], "r": c["r"], "value": value, "baseline": baseline})
+                    if len(metrics) == TOP_SPIKE_METRICS:
+                        break
+            spikes.append({
+                "start_s": windows[run[0]]["t"],
+                "end_s": windows[run[-1]]["t"] + self.stats.window,
+                "p99_ms": max(windows[i]["p99_ms"] for i in run),
+                "metrics": metrics,
+            })
+        return {"factor": self.spike_factor, "median_p99_ms": median, "threshold_ms": threshold, "spikes": spikes}
+
+
+def _metrics_url(url):
+    url = url.rstrip("/")
+    return url if urlsplit(url).path else url + "/metrics"
+
+
+def _si(value):
+    for factor, suffix in ((1e9, "G"), (1e6, "M"), (1e3, "k")):
+        if abs(value) >= factor:
+            return f"{value / factor:.1f}{suffix}"
+    return f"{value:.3g}"
+
+
+def print_server_metrics_summary(summary, top=5):
+    print("=== Server metrics ===")
+    for node in summary["nodes"]:
+        print(f"  {node['url']}: {node['scrapes']} scrapes every {summary['interval_s']:g}s, "
+              f"{node['errors']} errors" + (f" (last: {node['last_error']})" if node["last_error"] else ""))
+    if not summary["correlations"]:
+        print("  no series to correlate (check --scrape-include and that the run spanned several scrapes)")
+        return
+    print("  most correlated with client p99:")
+    for c in summary["correlations"][:top]:
+        print(f"    r={c['r']:+.2f}  {c['metric']}  ({c['windows']} windows)")
+    spikes = summary["spikes"]
+    if not spikes["spikes"]:
+        print(f"  no latency spikes (p99 never over {spikes['threshold_ms']:.1f} ms, "
+              f"{spikes['factor']:g}x the median)"
+              if spikes["median_p99_ms"] else "  no latency spikes")
+        return
+    print(f"  latency spikes (p99 over {spikes['threshold_ms']:.1f} ms, median {spikes['median_p99_ms']:.1f} ms):")
+    for spike in spikes["spikes"]:
+        related = ", ".join(f"{m['metric']} {_si(m['value'])} vs {_si(m['baseline'])} (r={m['r']:+.2f})"
+                            for m in spike["metrics"]) or "no correlated server metric moved"
+        print(f"    t={spike['start_s']:.0f}-{spike['end_s']:.0f}s p99 {spike['p99_ms']:.1f} ms: {related}")
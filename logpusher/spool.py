@@ -0,0 +1,266 @@
+"""Disk-backed spool for batches the ingester could not accept.
+
+Encoded batches are appended to numbered segment files in the spool
+directory, each entry framed as a `<length, crc32, records>` header followed
+by the body. A single drainer thread reads segments through `mmap` and
+re-sends entries strictly in order, retrying the head entry with backoff
+until the endpoint accepts it. The read position is checkpointed to
+`offset.json` after every delivered entry, so a restarted run resumes
+draining where the previous one stopped; fully drained segments are deleted.
+
+While anything is spooled, new batches are appended behind it instead of
+being sent directly, which keeps delivery ordered. `max_bytes` bounds the
+spool on disk: once reached, `append` blocks the producer until the drainer
+catches up.
+"""
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+HEADER = struct.Struct("<III")
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".spool"
+
+
+def _segment_name(seq):
+    return f"{SEGMENT_PREFIX}{seq:08d}{SEGMENT_SUFFIX}"
+
+
+class Spool:
+    def __init__(self, directory, segment_bytes=64 * 1024 * 1024, max_bytes=1024 * 1024 * 1024):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._cond = threading.Condition()
+        self._offset_path = os.path.join(directory, "offset.json")
+
+        self.segments = sorted(
+            int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+            for name in os.listdir(directory)
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+        )
+        self.read_seq, self.read_pos = self._load_offset()
+        for seq in [s for s in self.segments if s < self.read_seq]:
+            os.remove(self._path(seq))
+            self.segments.remove(seq)
+        if self.segments and self.read_seq not in self.segments:
+            self.read_seq, self.read_pos = self.segments[0], 0
+
+        # Never append to a segment left by an earlier process: its tail may be torn.
+        self.write_seq = (self.segments[-1] + 1) if self.segments else max(self.read_seq, 1)
+        self._writer = None
+        self._written = 0
+
+        self.pending_bytes = sum(os.path.getsize(self._path(s)) for s in self.segments) - (
+            self.read_pos if self.segments else 0)
+        self.recovered_bytes = self.pending_bytes
+        self.peak_bytes = self.pending_bytes
+        self.appended_batches = 0
+        self.appended_records = 0
+        self.delivered_batches = 0
+        self.delivered_records = 0
+        self.corrupt_entries = 0
+        self._map = None
+        self._map_seq = None
+
+    def _path(self, seq):
+        return os.path.join(self.directory, _segment_name(seq))
+
+    def _load_offset(self):
+        try:
+            with open(self._offset_path) as f:
+                state = json.load(f)
+            return int(state["segment"]), int(state["position"])
+        except (OSError, ValueError, KeyError):
+            return 0, 0
+
+    def _save_offset(self):
+        tmp = self._offset_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"segment": self.read_seq, "position": self.read_pos}, f)
+        os.replace(tmp, self._offset_path)
+
+    def pending(self):
+        with self._cond:
+            return self.pending_bytes > 0
+
+    def append(self, body, records):
+        """Append one encoded batch; blocks while the spool is over `max_bytes`."""
+        entry = HEADER.pack(len(body), zlib.crc32(body), records) + body
+        with self._cond:
+            while self.max_bytes and self.pending_bytes + len(entry) > self.max_bytes and self.pending_bytes:
+                self._cond.wait()
+            if self._writer is None or self._written >= self.segment_bytes:
+                self._roll()
+            self._writer.write(entry)
+            self._writer.flush()
+            self._written += len(entry)
+            self.pending_bytes += len(entry)
+            self.peak_bytes = max(self.peak_bytes, self.pending_bytes)
+            self.appended_batches += 1
+            self.appended_records += records
+            self._cond.notify_all()
+
+    def _roll(self):
+        if self._writer is not None:
+            self._writer.close()
+            self.write_seq += 1
+        self._writer = open(self._path(self.write_seq), "ab")
+        self._written = 0
+        self.segments.append(self.write_seq)
+        if len(self.segments) == 1:
+            self.read_seq, self.read_pos = self.write_seq, 0
+
+    def _mapped(self, seq):
+        """mmap of a segment, re-mapped when the writer has grown it since."""
+        size = os.path.getsize(self._path(seq))
+        if self._map is not None and (self._map_seq != seq or len(self._map) < size):
+            self._map.close()
+            self._map = None
+        if self._map is None and size:
+            with open(self._path(seq), "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._map_seq = seq
+        return self._map
+
+    def peek(self, timeout=None):
+        """Next undelivered (body, records) without consuming it; None on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                entry = self._next_entry()
+                if entry is not None:
+                    return entry
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    def _next_entry(self):
+        while self.segments:
+            seq = self.read_seq
+            data = self._mapped(seq)
+            end = len(data) if data is not None else 0
+            if self.read_pos + HEADER.size <= end:
+                length, crc, records = HEADER.unpack_from(data, self.read_pos)
+                start = self.read_pos + HEADER.size
+                body = bytes(data[start:start + length]) if start + length <= end else None
+                if body is not None and zlib.crc32(body) == crc:
+                    return body, records
+                if seq == self.write_seq and self._writer is not None and body is None:
+                    return None
+                # Torn or corrupt tail left by a crash: skip the rest of this segment.
+                self.corrupt_entries += 1
+                self.pending_bytes -= end - self.read_pos
+                self.read_pos = end
+            if seq == self.write_seq and self._writer is not None:
+                return None
+            self.pending_bytes -= max(0, end - self.read_pos)
+            self._drop_head_segment()
+        return None
+
+    def _drop_head_segment(self):
+        seq = self.segments.pop(0)
+        if self._map is not None and self._map_seq == seq:
+            self._map.close()
+            self._map = None
+        os.remove(self._path(seq))
+        self.read_seq, self.read_pos = (self.segments[0], 0) if self.segments else (seq + 1, 0)
+        self._save_offset()
+
+    def commit(self, body):
+        """Mark the entry returned by the last `peek` as delivered."""
+        with self._cond:
+            _, _, records = HEADER.unpack_from(self._map, self.read_pos)
+            size = HEADER.size + len(body)
+            self.read_pos += size
+            self.pending_bytes -= size
+            self.delivered_batches += 1
+            self.delivered_records += records
+            self._save_offset()
+            self._cond.notify_all()
+
+    def wait_empty(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self.pending_bytes > 0:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def close(self):
+        with self._cond:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            self._cond.notify_all()
+
+    def summary(self):
+        with self._cond:
+            return {
+                "directory": self.directory,
+                "recovered_bytes": self.recovered_bytes,
+                "spooled_batches": self.appended_batches,
+                "spooled_records": self.appended_records,
+                "drained_batches": self.delivered_batches,
+                "drained_records": self.delivered_records,
+                "pending_bytes": self.pending_bytes,
+                "peak_bytes": self.peak_bytes,
+                "corrupt_entries": self.corrupt_entries,
+            }
+
+
+class SpoolDrainer(threading.Thread):
+    """Re-sends spooled batches in order, backing off while the endpoint is down."""
+
+    def __init__(self, spool, sender, stats, backoff=0.5, max_backoff=30.0):
+        super().__init__(name="spool-drainer", daemon=True)
+        self.spool = spool
+        self.sender = sender
+        self.stats = stats
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._stopping = threading.Event()
+
+    def run(self):
+        delay = self.backoff
+        while not self._stopping.is_set():
+            entry = self.spool.peek(timeout=0.5)
+            if entry is None:
+                continue
+            body, records = entry
+            t0 = time.perf_counter()
+            ok, status, nbytes = self.sender.send_body(body)
+            self.stats.record(time.perf_counter() - t0, records, ok, status, nbytes)
+            if ok:
+                self.spool.commit(body)
+                delay = self.backoff
+            else:
+                self._stopping.wait(delay)
+                delay = min(delay * 2, self.max_backoff)
+
+    def stop(self):
+        self._stopping.set()
+        self.join()
+
+
+def print_spool_summary(summary):
+    print("=== Spool ===")
+    print(f"  directory:    {summary['directory']}")
+    if summary["recovered_bytes"]:
+        print(f"  recovered:    {summary['recovered_bytes']} bytes left by a previous run")
+    print(f"  spooled:      {summary['spooled_batches']} batches / {summary['spooled_records']} records")
+    print(f"  drained:      {summary['drained_batches']} batches / {summary['drained_records']} records")
+    print(f"  pending:      {summary['pending_bytes']} bytes (peak {summary['peak_bytes']})")
+    if summary["corrupt_entries"]:
+        print(f"  corrupt:      {summary['corrupt_entries']} torn segment tails skipped")
@@ -0,0 +1,202 @@
+import bisect
+import json
+import math
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list (p in 0-100)."""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, math.ceil(p / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process, or None where unsupported."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def latency_summary(latencies):
+    """p50/p90/p99/max of a list of latencies in seconds, reported in ms."""
+    values = sorted(latencies)
+    return {
+        "count": len(values),
+        "mean_ms": (sum(values) / len(values) * 1000) if values else 0.0,
+        "p50_ms": percentile(values, 50) * 1000,
+        "p90_ms": percentile(values, 90) * 1000,
+        "p99_ms": percentile(values, 99) * 1000,
+        "max_ms": (values[-1] * 1000) if values else 0.0,
+    }
+
+
+def bucket_counts(latencies, bounds_ms):
+    """Histogram of latencies (seconds) over upper bounds in ms, plus one overflow bucket."""
+    counts = [0] * (len(bounds_ms) + 1)
+    for v in latencies:
+        counts[bisect.bisect_right(bounds_ms, v * 1000)] += 1
+    return counts
+
+
+class _Window:
+    __slots__ = ("requests", "errors", "records", "bytes", "latencies")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.records = 0
+        self.bytes = 0
+        self.latencies = []
+
+
+class RunStats:
+    """Thread-safe collector for per-request latency and outcome.
+
+    Every send is also bucketed into fixed-length windows (by completion
+    time) so throughput and latency can be followed over the run.
+    """
+
+    def __init__(self, window=1.0):
+        self.window = window
+        self.started = time.monotonic()
+        self.finished = None
+        self.latencies = []
+        self.requests_ok = 0
+        self.requests_failed = 0
+        self.records_ok = 0
+        self.records_failed = 0
+        self.bytes_sent = 0
+        self.status_codes = Counter()
+        self.windows = {}
+        self._lock = threading.Lock()
+
+    def record(self, latency, records, ok, status, nbytes=0):
+        index = int((time.monotonic() - self.started) / self.window)
+        with self._lock:
+            self.latencies.append(latency)
+            self.status_codes[status] += 1
+            if ok:
+                self.requests_ok += 1
+                self.records_ok += records
+                self.bytes_sent += nbytes
+            else:
+                self.requests_failed += 1
+                self.records_failed += records
+            w = self.windows.get(index)
+            if w is None:
+                w = self.windows[index] = _Window()
+            w.requests += 1
+            w.latencies.append(latency)
+            if ok:
+                w.records += records
+                w.bytes += nbytes
+            else:
+                w.errors += 1
+
+    def finish(self):
+        self.finished = time.monotonic()
+
+    def elapsed(self):
+        return (self.finished or time.monotonic()) - self.started
+
+    def window_series(self):
+        """One dict per window, in time order, empty windows included."""
+        with self._lock:
+            snapshot = dict(self.windows)
+        if not snapshot:
+            return []
+        series = []
+        for index in range(max(snapshot) + 1):
+            w = snapshot.get(index) or _Window()
+            lat = latency_summary(w.latencies)
+            series.append({
+                "t": index * self.window,
+                "requests": w.requests,
+                "errors": w.errors,
+                "eps": w.records / self.window,
+                "bytes_per_sec": w.bytes / self.window,
+                "error_rate": (w.errors / w.requests) if w.requests else 0.0,
+                "p50_ms": lat["p50_ms"],
+                "p99_ms": lat["p99_ms"],
+            })
+        return series
+
+    def span(self, start, end=None):
+        """Totals over the windows in [start, end) seconds into the run, rounded to window boundaries."""
+        first = round(start / self.window)
+        last = None if end is None else round(end / self.window)
+        requests = errors = records = 0
+        latencies = []
+        with self._lock:
+            for index, w in self.windows.items():
+                if index < first or (last is not None and index >= last):
+                    continue
+                requests += w.requests
+                errors += w.errors
+                records += w.records
+                latencies.extend(w.latencies)
+        seconds = (last * self.window if last is not None else self.elapsed()) - first * self.window
+        return {
+            "requests": requests,
+            "errors": errors,
+            "error_rate": (errors / requests) if requests else 0.0,
+            "eps": records / seconds if seconds > 0 else 0.0,
+            "latency": latency_summary(latencies),
+        }
+
+    def summary(self):
+        elapsed = self.elapsed()
+        with self._lock:
+            requests_total = self.requests_ok + self.requests_failed
+            result = {
+                "elapsed_s": elapsed,
+                "requests_ok": self.requests_ok,
+                "requests_failed": self.requests_failed,
+                "records_ok": self.records_ok,
+                "records_failed": self.records_failed,
+                "bytes_sent": self.bytes_sent,
+                "eps": self.records_ok / elapsed if elapsed > 0 else 0.0,
+                "requests_per_sec": requests_total / elapsed if elapsed > 0 else 0.0,
+                "error_rate": (self.requests_failed / requests_total) if requests_total else 0.0,
+                "status_codes": {str(k): v for k, v in sorted(self.status_codes.items())},
+                "latency": latency_summary(self.latencies),
+            }
+        result["peak_rss_bytes"] = peak_rss_bytes()
+        result["window_s"] = self.window
+        result["windows"] = self.window_series()
+        return result
+
+
+def save_summary(path, summary, **sections):
+    """Write a run summary (plus any extra report sections) as JSON, e.g. for `compare`."""
+    data = {"created": datetime.now(timezone.utc).isoformat(timespec="seconds"), "command": sys.argv,
+            "summary": summary}
+    data.update((name, section) for name, section in sections.items() if section is not None)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+def print_summary(summary, label="Run summary"):
+    lat = summary["latency"]
+    print(f"=== {label} ===")
+    print(f"  elapsed:      {summary['elapsed_s']:.2f}s")
+    print(f"  requests:     {summary['requests_ok']} ok, {summary['requests_failed']} failed "
+          f"({summary['requests_per_sec']:.1f} req/s, error rate {summary['error_rate'] * 100:.2f}%)")
+    print(f"  records:      {summary['records_ok']} ok, {summary['records_failed']} failed "
+          f"({summary['eps']:.1f} EPS)")
+    print(f"  bytes sent:   {summary['bytes_sent']}")
+    if summary.get("peak_rss_bytes"):
+        print(f"  peak RSS:     {summary['peak_rss_bytes'] / (1024 * 1024):.1f} MiB")
+    print(f"  status codes: {summary['status_codes']}")
+    print(f"  latency (ms): mean {lat['mean_ms']:.1f}  p50 {lat['p50_ms']:.1f}  p90 {lat['p90_ms']:.1f}  "
+          f"p99 {lat['p99_ms']:.1f}  max {lat['max_ms']:.1f}")
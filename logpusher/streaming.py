@@ -0,0 +1,97 @@
+"""One very large batch, streamed as a chunked request body.
+
+Records are generated and JSON-encoded while the request is being sent, so
+memory stays flat however large the body gets; useful for testing near
+`ZO_JSON_LIMIT` / `ZO_PAYLOAD_LIMIT`. The body is a single JSON array, sent
+with `Transfer-Encoding: chunked` in chunks of about `chunk_bytes`.
+
+Besides the status, the upload reports how long the server took to answer
+once the last chunk was written (time to accept), which for a large batch
+is the ingester parsing and writing it, and the client's peak RSS.
+"""
+import json
+import time
+
+import requests
+
+from .stats import peak_rss_bytes
+
+
+class StreamingUpload:
+    def __init__(self, url, headers, timeout=600.0, chunk_bytes=64 * 1024):
+        self.url = url
+        self.headers = dict(headers)
+        self.timeout = timeout
+        self.chunk_bytes = chunk_bytes
+        self.records = 0
+        self.body_bytes = 0
+        self.chunks = 0
+        self.first_chunk_at = None
+        self.body_done_at = None
+
+    def _body(self, make_record, num_records, max_bytes):
+        chunk = bytearray(b"[")
+        log_id = 0
+        while (num_records is None or log_id < num_records) and (max_bytes is None or self.body_bytes
+                                                                  + len(chunk) < max_bytes):
+            log_id += 1
+            if log_id > 1:
+                chunk += b","
+            chunk += json.dumps(make_record(log_id)).encode("utf-8")
+            if len(chunk) >= self.chunk_bytes:
+                yield self._emit(chunk)
+                chunk = bytearray()
+        self.records = log_id
+        chunk += b"]"
+        yield self._emit(chunk)
+        # Resumed once the transport wants the next chunk, i.e. after the last one was written.
+        self.body_done_at = time.perf_counter()
+
+    def _emit(self, chunk):
+        if self.first_chunk_at is None:
+            self.first_chunk_at = time.perf_counter()
+        self.chunks += 1
+        self.body_bytes += len(chunk)
+        return bytes(chunk)
+
+    def run(self, make_record, num_records=None, max_bytes=None):
+        """Upload num_records records, or as many as fit in max_bytes; returns the summary."""
+        started = time.perf_counter()
+        status, error, response_text = 0, None, ""
+        try:
+            response = requests.post(self.url, headers=self.headers, timeout=self.timeout,
+                                     data=self._body(make_record, num_records, max_bytes))
+            status = response.status_code
+            response_text = response.text[:500]
+        except requests.RequestException as e:
+            error = str(e)
+        finished = time.perf_counter()
+        body_done = self.body_done_at or finished
+        return {
+            "url": self.url,
+            "status": status,
+            "ok": status == 200,
+            "error": error,
+            "response": response_text,
+            "records": self.records,
+            "body_bytes": self.body_bytes,
+            "chunks": self.chunks,
+            "upload_s": body_done - started,
+            "accept_s": finished - body_done,
+            "total_s": finished - started,
+            "throughput_mb_s": self.body_bytes / (1024 * 1024) / (body_done - started) if body_done > started else 0.0,
+            "peak_rss_bytes": peak_rss_bytes(),
+        }
+
+
+def print_stream_summary(summary):
+    print("=== Streaming upload ===")
+    print(f"  status:       {summary['status']}" + (f" ({summary['error']})" if summary["error"] else ""))
+    if summary["response"] and not summary["ok"]:
+        print(f"  response:     {summary['response']}")
+    print(f"  body:         {summary['records']} records, {summary['body_bytes'] / (1024 * 1024):.1f} MiB "
+          f"in {summary['chunks']} chunks")
+    print(f"  upload:       {summary['upload_s']:.2f}s ({summary['throughput_mb_s']:.1f} MiB/s)")
+    print(f"  accept:       {summary['accept_s'] * 1000:.0f}ms from last chunk to response")
+    if summary.get("peak_rss_bytes"):
+        print(f"  peak RSS:     {summary['peak_rss_bytes'] / (1024 * 1024):.1f} MiB")
@@ -0,0 +1,397 @@
+"""Syslog listener: receive RFC 3164/5424 messages over UDP and TCP and forward them.
+
+Receiving and parsing are split. Socket reader threads only copy raw
+messages into a bounded in-memory queue, so they get back to the socket
+quickly and the kernel buffer (raised to `rcvbuf` bytes) does not
+overflow. The consumer parses and batches them. When the queue is full,
+because ingest cannot keep up, new messages are dropped and counted
+rather than blocking the readers. On Linux the kernel's own UDP drops for
+the socket are read from /proc/net/udp and reported too. The listener
+lowers the interpreter's thread switch interval so that a reader waiting
+for the GIL gets it back quickly.
+
+TCP accepts both framings of RFC 6587: octet counting (`LEN SP MSG`) and
+newline-terminated messages, detected per message.
+
+Each message becomes a record:
+
+    {"log": msg, "hostname": ..., "appname": ..., "procid": ..., "msgid": ...,
+     "facility": "local0", "severity": "warning", "source": "10.0.0.5",
+     "structured_data": {"id": {"param": "value"}}, "_timestamp": 1760000000000000}
+
+Fields a message does not carry are left out. `_timestamp` is only set
+for RFC 5424, whose timestamps carry a year and zone; RFC 3164 ones are
+kept as `timestamp` and the server's receive time applies. A message that
+matches neither format is forwarded whole as `log`.
+"""
+import os
+import re
+import socket
+import sys
+import threading
+import time
+from datetime import datetime
+
+FACILITIES = ("kern", "user", "mail", "daemon", "auth", "syslog", "lpr", "news", "uucp", "cron", "authpriv",
+              "ftp", "ntp", "security", "console", "solaris-cron", "local0", "local1", "local2", "local3",
+              "local4", "local5", "local6", "local7")
+SEVERITIES = ("emerg", "alert", "crit", "err", "warning", "notice", "info", "debug")
+
+MAX_MESSAGE = 64 * 1024
+SWITCH_INTERVAL = 0.0005
+
+_PRI = re.compile(r"<(\d{1,3})>")
+_RFC5424 = re.compile(r"(\d{1,2}) (\S+) (\S+) (\S+) (\S+) (\S+) ?(.*)", re.S)
+_RFC3164 = re.compile(r"([A-Z][a-z]{2} [ \d]\d \d\d:\d\d:\d\d) (\S+) (?:([^\s:\[]{1,48})(?:\[([^\]]*)\])?: ?)?(.*)",
+                      re.S)
+_SD_ELEMENT = re.compile(r'\[([^\s\]=]+)((?:\s+[^\s=\]]+="(?:[^"\\]|\\.)*")*)\]')
+_SD_PARAM = re.compile(r'([^\s=\]]+)="((?:[^"\\]|\\.)*)"')
+_SD_UNESCAPE = re.compile(r'\\(["\\\]])')
+_BOM = "\ufeff"
+
+
+def _nil(value):
+    return None if value == "-" else value
+
+
+def _structured_data(text):
+    """(parsed elements, rest of the text) for the STRUCTURED-DATA part of an RFC 5424 message."""
+    if text.startswith("-"):
+        return None, text[2:]
+    elements = {}
+    pos = 0
+    while True:
+        m = _SD_ELEMENT.match(text, pos)
+        if not m:
+            break
+        elements[m.group(1)] = {k: _SD_UNESCAPE.sub(r"\1", v) if "\\" in v else v
+                                for k, v in _SD_PARAM.findall(m.group(2))}
+        pos = m.end()
+    return elements or None, text[pos + 1:] if pos else text
+
+
+def _micros(timestamp):
+    try:
+        return int(datetime.fromisoformat(timestamp).timestamp() * 1_000_000)
+    except ValueError:
+        return None
+
+
+def parse(message, source=None):
+    """A record for one syslog message (str, without framing)."""
+    message = message.rstrip("\r\n\x00")
+    record = {}
+    m = _PRI.match(message)
+    if m and int(m.group(1)) < 192:
+        pri = int(m.group(1))
+        record["facility"] = FACILITIES[pri >> 3]
+        record["severity"] = SEVERITIES[pri & 7]
+        body = message[m.end():]
+        m5 = _RFC5424.match(body) if body[:1].isdigit() else None
+        m3 = None if m5 else _RFC3164.match(body)
+        if m5:
+            _, timestamp, hostname, appname, procid, msgid, rest = m5.groups()
+            sd, text = _structured_data(rest)
+            for key, value in (("hostname", hostname), ("appname", appname), ("procid", procid),
+                               ("msgid", msgid)):
+                if value != "-":
+                    record[key] = value
+            if sd:
+                record["structured_data"] = sd
+            if _nil(timestamp):
+                ts = _micros(timestamp)
+                if ts is not None:
+                    record["_timestamp"] = ts
+            record["log"] = text[1:] if text.startswith(_BOM) else text
+        elif m3:
+            timestamp, hostname, tag, procid, text = m3.groups()
+            record["timestamp"] = timestamp
+            record["hostname"] = hostname
+            if tag:
+                record["appname"] = tag
+            if procid:
+                record["procid"] = procid
+            record["log"] = text
+        else:
+            record["log"] = body
+    else:
+        record["log"] = message
+    if source is not None:
+        record["source"] = source
+    return record
+
+
+class _BoundedQueue:
+    """Raw messages from the readers to the consumer; drops (and counts) past `capacity`."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.items = []
+        self.dropped = 0
+        self.peak = 0
+        self._cond = threading.Condition(threading.Lock())
+
+    def put(self, item):
+        with self._cond:
+            n = len(self.items)
+            if n >= self.capacity:
+                self.dropped += 1
+                return False
+            self.items.append(item)
+            if n >= self.peak:
+                self.peak = n + 1
+            if not n:
+                self._cond.notify()
+        return True
+
+    def take(self, timeout):
+        """Everything queued, waiting up to timeout for something to arrive."""
+        with self._cond:
+            if not self.items and timeout > 0:
+                self._cond.wait(timeout)
+            items, self.items = self.items, []
+        return items
+
+
+def parse_listen(text, default_port=514):
+    """(host, port) from "HOST:PORT", ":PORT", "[v6]:PORT" or "HOST"."""
+    host, sep, port = text.rpartition(":")
+    if not sep or "]" in port:
+        host, port = text, default_port
+    host = host.strip("[]") or "0.0.0.0"
+    try:
+        return host, int(port)
+    except ValueError:
+        raise ValueError(f"bad listen address {text!r} (expected HOST:PORT)")
+
+
+def _kernel_drops(sock):
+    """UDP datagrams the kernel dropped for this socket (Linux only, else None)."""
+    inode = str(os.fstat(sock.fileno()).st_ino)
+    for table in ("/proc/net/udp", "/proc/net/udp6"):
+        try:
+            with open(table) as f:
+                next(f)
+                for line in f:
+                    fields = line.split()
+                    if fields[9] == inode:
+                        return int(fields[-1])
+        except OSError:
+            continue
+    return None
+
+
+class SyslogListener:
+    def __init__(self, host="0.0.0.0", port=514, protocols=("udp", "tcp"), queue_size=100_000,
+                 rcvbuf=16 * 1024 * 1024, flush_interval=1.0, poll_interval=0.5):
+        self.host = host
+        self.port = port
+        self.protocols = tuple(protocols)
+        self.rcvbuf = rcvbuf
+        self.flush_interval = flush_interval
+        self.poll_interval = poll_interval
+        self.queue = _BoundedQueue(queue_size)
+        self.received = {protocol: 0 for protocol in self.protocols}
+        self.connections = 0
+        self.rejected_records = 0
+        self._udp = self._tcp = None
+        self._threads = []
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._kernel_drops = None
+
+    def start(self):
+        # Readers give up the GIL on every receive and must win it back from the parsing and encoding
+        # threads; at the default 5ms switch interval that wait lets the socket buffer overflow.
+        sys.setswitchinterval(min(sys.getswitchinterval(), SWITCH_INTERVAL))
+        family = socket.getaddrinfo(self.host, self.port)[0][0]
+        if "udp" in self.protocols:
+            self._udp = socket.socket(family, socket.SOCK_DGRAM)
+            self._udp.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self._set_rcvbuf(self._udp)
+            self._udp.bind((self.host, self.port))
+            self._udp.settimeout(self.poll_interval)
+            self._kernel_drops = _kernel_drops(self._udp)
+            self._spawn(self._read_udp, "syslog-udp")
+        if "tcp" in self.protocols:
+            self._tcp = socket.socket(family, socket.SOCK_STREAM)
+            self._tcp.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self._tcp.bind((self.host, self.port))
+            self._tcp.listen(128)
+            self._tcp.settimeout(self.poll_interval)
+            self._spawn(self._accept, "syslog-tcp")
+
+    def _set_rcvbuf(self, sock):
+        # SO_RCVBUFFORCE (Linux, needs CAP_NET_ADMIN) goes past net.core.rmem_max; SO_RCVBUF is capped by it.
+        force = getattr(socket, "SO_RCVBUFFORCE", 33 if sys.platform.startswith("linux") else None)
+        try:
+            if force is None:
+                raise OSError
+            sock.setsockopt(socket.SOL_SOCKET, force, self.rcvbuf)
+        except OSError:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.rcvbuf)
+        # Linux reports twice the requested size (it counts its own overhead).
+        self.rcvbuf = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+
+    def _spawn(self, target, name, *args):
+        thread = threading.Thread(target=target, args=args, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def stop(self):
+        """Make `batches` send what it holds and return (safe from other threads and signal handlers)."""
+        self._stopping.set()
+
+    def _read_udp(self):
+        recvfrom = self._udp.recvfrom
+        put = self.queue.put
+        received = 0
+        while not self._stopping.is_set():
+            try:
+                data, peer = recvfrom(MAX_MESSAGE)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            put((data, peer[0]))
+            received += 1
+            if not received & 1023:
+                self.received["udp"] = received
+        self.received["udp"] = received
+
+    def _accept(self):
+        while not self._stopping.is_set():
+            try:
+                conn, peer = self._tcp.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            with self._lock:
+                self.connections += 1
+            conn.settimeout(self.poll_interval)
+            self._spawn(self._read_tcp, f"syslog-tcp-{peer[0]}", conn, peer[0])
+
+    def _read_tcp(self, conn, source):
+        put = self.queue.put
+        buf = b""
+        received = 0
+        with conn:
+            while not self._stopping.is_set():
+                try:
+                    data = conn.recv(256 * 1024)
+                except socket.timeout:
+                    continue
+                except OSError:
+                    break
+                if not data:
+                    break
+                buf += data
+                messages, buf = _frames(buf)
+                for message in messages:
+                    put((message, source))
+                received += len(messages)
+        if buf.strip():
+            put((buf, source))
+            received += 1
+        with self._lock:
+            self.received["tcp"] += received
+
+    def batches(self, batch_size):
+        """Yield (first_id, last_id, records) by size, or after `flush_interval`; returns after `stop`."""
+        pending = []
+        oldest = None
+        next_id = 1
+        while True:
+            stopping = self._stopping.is_set()
+            timeout = self.poll_interval if oldest is None else oldest + self.flush_interval - time.monotonic()
+            raw = self.queue.take(0 if stopping else min(timeout, self.poll_interval))
+            if raw:
+                if oldest is None:
+                    oldest = time.monotonic()
+                pending.extend(parse(data.decode("utf-8", "replace"), source) for data, source in raw)
+            while len(pending) >= batch_size:
+                batch, pending = pending[:batch_size], pending[batch_size:]
+                yield next_id, next_id + batch_size - 1, batch
+                next_id += batch_size
+                oldest = time.monotonic() if pending else None
+            if pending and (stopping or time.monotonic() - oldest >= self.flush_interval):
+                yield next_id, next_id + len(pending) - 1, pending
+                next_id += len(pending)
+                pending, oldest = [], None
+            if stopping and not raw:
+                return
+
+    def settled(self, first, last, delivered):
+        """Runner `on_done` hook: counts records the endpoint rejected outright."""
+        if not delivered:
+            with self._lock:
+                self.rejected_records += last - first + 1
+
+    def close(self):
+        self._stopping.set()
+        for sock in (self._udp, self._tcp):
+            if sock is not None:
+                if sock is self._udp and self._kernel_drops is not None:
+                    now = _kernel_drops(sock)
+                    self._kernel_drops = now - self._kernel_drops if now is not None else None
+                sock.close()
+        for thread in self._threads:
+            thread.join(self.poll_interval * 2)
+
+    def summary(self):
+        return {
+            "listen": f"{self.host}:{self.port}",
+            "protocols": list(self.protocols),
+            "received": dict(self.received),
+            "tcp_connections": self.connections,
+            "queue_capacity": self.queue.capacity,
+            "queue_peak": self.queue.peak,
+            "queue_dropped": self.queue.dropped,
+            "socket_dropped": self._kernel_drops if self._udp is not None else None,
+            "rcvbuf_bytes": self.rcvbuf if self._udp is not None else None,
+            "rejected_records": self.rejected_records,
+        }
+
+
+def _frames(buf):
+    """Complete RFC 6587 frames in buf (octet-counted or newline-terminated), and the unconsumed rest."""
+    messages = []
+    pos = 0
+    end = len(buf)
+    while pos < end:
+        if 48 <= buf[pos] <= 57:
+            space = buf.find(b" ", pos, pos + 8)
+            if space > pos and buf[pos:space].isdigit():
+                size = int(buf[pos:space])
+                if space + 1 + size > end:
+                    break
+                messages.append(buf[space + 1:space + 1 + size])
+                pos = space + 1 + size
+                continue
+        newline = buf.find(b"\n", pos)
+        if newline < 0:
+            if end - pos > MAX_MESSAGE:
+                # No terminator in sight: pass it on rather than buffer without bound.
+                messages.append(buf[pos:])
+                pos = end
+            break
+        if newline > pos:
+            messages.append(buf[pos:newline])
+        pos = newline + 1
+    return messages, buf[pos:]
+
+
+def print_syslog_summary(summary):
+    received = summary["received"]
+    print("=== Syslog ===")
+    print(f"  listen:       {summary['listen']} ({', '.join(summary['protocols'])})")
+    print("  received:     " + ", ".join(f"{n} {protocol}" for protocol, n in received.items())
+          + (f" over {summary['tcp_connections']} connections" if "tcp" in received else ""))
+    print(f"  queue:        peak {summary['queue_peak']} of {summary['queue_capacity']}, "
+          f"{summary['queue_dropped']} dropped (ingest behind)")
+    if summary["socket_dropped"] is not None:
+        print(f"  socket:       {summary['socket_dropped']} UDP datagrams dropped by the kernel "
+              f"(receive buffer {summary['rcvbuf_bytes'] / (1024 * 1024):.0f} MiB)")
+    if summary["rejected_records"]:
+        print(f"  rejected:     {summary['rejected_records']} records rejected by the endpoint")
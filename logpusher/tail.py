@@ -0,0 +1,370 @@
+"""Ship newline-delimited logs from stdin or tailed files.
+
+Each line becomes a record `{"log": line, "file": path, "host": hostname}`
+(no `file` for stdin). Files are read in large chunks and split into lines;
+a trailing partial line waits for its newline. Files are followed like
+`tail -F`:
+
+- rotation by rename: when the path points to a new inode, the old file is
+  read to its end before the new one is opened from the start;
+- copytruncate: when the file shrinks below the read position, reading
+  restarts at 0.
+
+On Linux the tailer sleeps on inotify events for the files' directories;
+elsewhere it polls.
+
+Read positions (device, inode, offset per path) are checkpointed to a JSON
+file, but only up to the last batch that was delivered with every earlier
+batch also delivered, so a restart neither resends nor skips lines (a line
+may be resent if the process dies between delivery and the checkpoint
+write). A checkpoint whose inode no longer matches the path means the file
+was rotated while the shipper was down; the new file is read from the
+start. stdin has no checkpoint.
+"""
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import socket
+import sys
+import threading
+import time
+
+CHUNK = 1024 * 1024
+
+_IN_MODIFY = 0x002
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_CLOSE_WRITE = 0x008
+
+
+class _Inotify:
+    """Minimal ctypes inotify: wakes up on changes in the watched directories."""
+
+    def __init__(self, directories):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = _IN_MODIFY | _IN_MOVED_TO | _IN_CREATE | _IN_CLOSE_WRITE
+        for directory in directories:
+            if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+                os.close(self.fd)
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch {directory} failed")
+
+    def wait(self, timeout):
+        if select.select([self.fd], [], [], timeout)[0]:
+            try:
+                while os.read(self.fd, 65536):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def close(self):
+        os.close(self.fd)
+
+
+class _Poller:
+    def wait(self, timeout):
+        time.sleep(timeout)
+
+    def close(self):
+        pass
+
+
+def _watcher(paths):
+    if sys.platform.startswith("linux"):
+        try:
+            return _Inotify(sorted({os.path.dirname(os.path.abspath(p)) for p in paths}))
+        except (OSError, AttributeError):
+            pass
+    return _Poller()
+
+
+class Checkpoints:
+    """Read positions per path, persisted atomically as JSON."""
+
+    def __init__(self, path):
+        self.path = path
+        self.positions = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.positions = json.load(f)
+
+    def get(self, path):
+        return self.positions.get(os.path.abspath(path))
+
+    def update(self, positions):
+        self.positions.update(positions)
+
+    def save(self):
+        if not self.path:
+            return
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.positions, f)
+        os.replace(tmp, self.path)
+
+
+class _Follower:
+    def __init__(self, path, position=None, from_end=False):
+        self.path = path
+        self.key = os.path.abspath(path)
+        self.file = None
+        self.dev = self.ino = None
+        self.offset = 0       # end of the last complete line turned into a record
+        self.partial = b""
+        self.rotations = 0
+        self.truncations = 0
+        self.last_read = 0    # bytes the last read() got, complete lines or not
+        self._open(position, from_end)
+
+    def _open(self, position=None, from_end=False):
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return
+        st = os.fstat(f.fileno())
+        self.file, self.dev, self.ino, self.partial = f, st.st_dev, st.st_ino, b""
+        if position is not None and (position["dev"], position["ino"]) == (st.st_dev, st.st_ino) \
+                and position["offset"] <= st.st_size:
+            self.offset = position["offset"]
+        elif position is None and from_end:
+            self.offset = st.st_size
+        else:
+            self.offset = 0
+        f.seek(self.offset)
+
+    def read(self, max_bytes=CHUNK):
+        """Complete lines available now (up to about max_bytes); they start at `self.offset`."""
+        self.last_read = 0
+        if self.file is None:
+            self._open()
+            if self.file is None:
+                return []
+        data = self.file.read(max_bytes)
+        self.last_read = len(data)
+        if not data:
+            self._check_rotation()
+            return []
+        data = self.partial + data
+        cut = data.rfind(b"\n") + 1
+        self.partial = data[cut:]
+        return data[:cut].split(b"\n")[:-1] if cut else []
+
+    def _check_rotation(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return  # moved away and not recreated yet; keep the old file open
+        if (st.st_dev, st.st_ino) != (self.dev, self.ino):
+            # The old file was read to its end above; an unterminated last line in it is dropped.
+            self.rotations += 1
+            self.file.close()
+            self._open()
+        elif st.st_size < self.file.tell():
+            self.truncations += 1
+            self.file.seek(0)
+            self.offset, self.partial = 0, b""
+
+    def flush_partial(self):
+        """The unterminated last line, for when no more data will come (EOF of a one-shot read)."""
+        line, self.partial = self.partial, b""
+        return [line] if line else []
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+class _StdinFollower:
+    key = dev = ino = file = None
+    offset = 0
+
+    def __init__(self):
+        self.fd = sys.stdin.fileno()
+        self.partial = b""
+        self.eof = False
+        self.rotations = self.truncations = 0
+        self.last_read = 0
+
+    def read(self, max_bytes=CHUNK):
+        self.last_read = 0
+        if self.eof or not select.select([self.fd], [], [], 0)[0]:
+            return []
+        data = os.read(self.fd, max_bytes)
+        self.last_read = len(data)
+        if not data:
+            self.eof = True
+            return self.flush_partial()
+        data = self.partial + data
+        cut = data.rfind(b"\n") + 1
+        self.partial = data[cut:]
+        return data[:cut].split(b"\n")[:-1] if cut else []
+
+    def flush_partial(self):
+        line, self.partial = self.partial, b""
+        return [line] if line else []
+
+    def close(self):
+        pass
+
+
+class OffsetTracker:
+    """Advances checkpoints in batch order as batches are settled (possibly out of order)."""
+
+    def __init__(self, checkpoints, interval=1.0):
+        self.checkpoints = checkpoints
+        self.interval = interval
+        self.dropped_records = 0
+        self._pending = {}   # first id -> (last id, positions)
+        self._settled = {}   # first id -> delivered
+        self._next = 1
+        self._saved = time.monotonic()
+        self._lock = threading.Lock()
+
+    def expect(self, first, last, positions):
+        with self._lock:
+            self._pending[first] = (last, positions)
+
+    def done(self, first, last, delivered):
+        with self._lock:
+            if first not in self._pending:
+                return  # not read from the files (e.g. dedup summary records): no position to advance
+            self._settled[first] = delivered
+            if not delivered:
+                # Rejected outright (e.g. 400): resending would not help, so move past it.
+                self.dropped_records += last - first + 1
+            while self._next in self._settled:
+                del self._settled[self._next]
+                last_id, positions = self._pending.pop(self._next)
+                self.checkpoints.update(positions)
+                self._next = last_id + 1
+            if time.monotonic() - self._saved >= self.interval:
+                self.checkpoints.save()
+                self._saved = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            self.checkpoints.save()
+
+
+class Tailer:
+    def __init__(self, paths, checkpoints, from_end=False, follow=True, flush_interval=1.0, poll_interval=0.5):
+        self.stdin = paths == ["-"]
+        if self.stdin:
+            self.followers = [_StdinFollower()]
+        else:
+            self.followers = [_Follower(p, checkpoints.get(p), from_end) for p in paths]
+        self.follow = follow and not self.stdin
+        self.flush_interval = flush_interval
+        self.poll_interval = poll_interval
+        self.host = socket.gethostname()
+        self.lines = 0
+        self.bytes = 0
+        self._watcher = _watcher(paths) if self.follow else None
+        self._stopping = threading.Event()
+
+    def stop(self):
+        """Make `batches` send what it holds and return (safe from other threads and signal handlers)."""
+        self._stopping.set()
+
+    def _records(self, follower, lines, ends, newline=1):
+        """Records for lines read by follower; appends each line's end position to `ends`."""
+        self.lines += len(lines)
+        records = []
+        path = follower.path if follower.key is not None else None
+        key, dev, ino = follower.key, follower.dev, follower.ino
+        offset = follower.offset
+        for line in lines:
+            offset += len(line) + newline
+            self.bytes += len(line) + newline
+            record = {"log": line.rstrip(b"\r").decode("utf-8", "replace"), "host": self.host}
+            if path is not None:
+                record["file"] = path
+            records.append(record)
+            ends.append((key, dev, ino, offset))
+        follower.offset = offset
+        return records
+
+    def batches(self, batch_size, tracker=None):
+        """Yield (first_id, last_id, records) as lines arrive; registers positions with the tracker."""
+        pending = []
+        ends = []
+        oldest = None
+        next_id = 1
+
+        def emit(records, batch_ends):
+            nonlocal next_id
+            first, last = next_id, next_id + len(records) - 1
+            next_id = last + 1
+            if tracker is not None:
+                positions = {}
+                for key, dev, ino, offset in batch_ends:
+                    if key is not None:
+                        positions[key] = {"dev": dev, "ino": ino, "offset": offset}
+                tracker.expect(first, last, positions)
+            return first, last, records
+
+        while True:
+            got = False
+            for follower in self.followers:
+                lines = follower.read()
+                # A line longer than a read chunk comes in several reads that return no lines yet.
+                got = got or follower.last_read > 0
+                if not lines:
+                    continue
+                pending.extend(self._records(follower, lines, ends))
+                if oldest is None:
+                    oldest = time.monotonic()
+                while len(pending) >= batch_size:
+                    batch, pending = pending[:batch_size], pending[batch_size:]
+                    batch_ends, ends = ends[:batch_size], ends[batch_size:]
+                    yield emit(batch, batch_ends)
+                    oldest = time.monotonic() if pending else None
+            if got and not self._stopping.is_set():
+                continue
+            # Nothing new: ship what is waiting if it waited long enough, or at the end.
+            done = self._stopping.is_set() or (not self.follow and (not self.stdin or self.followers[0].eof))
+            if done and not self.follow:
+                for follower in self.followers:
+                    pending.extend(self._records(follower, follower.flush_partial(), ends, newline=0))
+            if pending and (done or time.monotonic() - oldest >= self.flush_interval):
+                yield emit(pending, ends)
+                pending, ends, oldest = [], [], None
+            if done:
+                return
+            if self._watcher is not None:
+                self._watcher.wait(self.poll_interval)
+            elif self.stdin:
+                select.select([self.followers[0].fd], [], [], self.poll_interval)
+
+    def summary(self):
+        return {
+            "source": "stdin" if self.stdin else [f.path for f in self.followers],
+            "lines": self.lines,
+            "bytes": self.bytes,
+            "rotations": sum(f.rotations for f in self.followers),
+            "truncations": sum(f.truncations for f in self.followers),
+            "watch": type(self._watcher).__name__.strip("_").lower() if self._watcher else "none",
+        }
+
+    def close(self):
+        for follower in self.followers:
+            follower.close()
+        if self._watcher is not None:
+            self._watcher.close()
+
+
+def print_ship_summary(summary, dropped=0, checkpoint=None):
+    print("=== Shipping ===")
+    source = summary["source"]
+    print(f"  source:       {source if isinstance(source, str) else ', '.join(source)} (watch: {summary['watch']})")
+    print(f"  read:         {summary['lines']} lines, {summary['bytes'] / (1024 * 1024):.1f} MiB")
+    if summary["rotations"] or summary["truncations"]:
+        print(f"  rotations:    {summary['rotations']} renamed, {summary['truncations']} truncated")
+    if dropped:
+        print(f"  dropped:      {dropped} records rejected by the endpoint")
+    if checkpoint:
+        print(f"  checkpoint:   {checkpoint}")
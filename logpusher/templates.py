@@ -0,0 +1,269 @@
+"""Record templates: describe a log schema in JSON and compile it into a generator.
+
+A template is a JSON object with a `fields` mapping (emitted in every record)
+and an optional `vars` mapping (generated values that are only available for
+interpolation). Each value is one of:
+
+- a static value (number, bool, null, list, or a string without `{...}`);
+- a string with `{name}` placeholders, filled from other fields/vars or the
+  built-in `log_id` (`{{` and `}}` are literal braces);
+- a generator spec, an object with a `gen` key:
+    {"gen": "uuid"}
+    {"gen": "hex", "length": 16}
+    {"gen": "enum", "values": ["GET", "POST"], "weights": [9, 1]}
+    {"gen": "zipf", "values": ["/", "/cart", "/login"], "s": 1.1}
+    {"gen": "int", "min": 1, "max": 5}
+    {"gen": "timestamp", "format": "iso" | "epoch_ms" | "epoch_us" | "<strftime>"}
+    {"gen": "message", "stack_trace_rate": 0.01, "levels": {"INFO": 70, ...}, "with_level": true}
+- any other object, which becomes a nested object compiled the same way.
+
+`compile_template` turns the spec into Python source for a single
+`make_record(log_id, rng, now)` function and compiles it once, so per-record
+cost is just the generator calls and one dict literal. Generators draw from
+`rng` and timestamps use `now` when given, so a seeded rng and a fixed
+clock make the output deterministic.
+"""
+import bisect
+import itertools
+import json
+import random
+import string
+import uuid
+from datetime import datetime, timezone
+
+HEX = '0123456789abcdef'
+
+
+class TemplateError(ValueError):
+    pass
+
+
+def _param(spec, key, default, convert=float):
+    """spec[key] (or default) converted with `convert`; a bad value is a TemplateError naming both."""
+    value = spec.get(key, default)
+    try:
+        return convert(value)
+    except (TypeError, ValueError):
+        kind = "an integer" if convert is int else "a number"
+        raise TemplateError(f"{spec.get('gen')} generator: {key!r} must be {kind}, not {value!r}")
+
+
+def _gen_uuid(spec):
+    return lambda rng, now: str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _gen_hex(spec):
+    length = _param(spec, "length", 16, int)
+    return lambda rng, now: ''.join(rng.choices(HEX, k=length))
+
+
+def _cumulative(weights):
+    try:
+        cum = list(itertools.accumulate(float(w) for w in weights))
+    except (TypeError, ValueError):
+        raise TemplateError(f"weights must be numbers, not {list(weights)!r}")
+    if not cum or cum[-1] <= 0:
+        raise TemplateError("weights must sum to a positive number")
+    return cum
+
+
+def _weighted_choice(values, cum):
+    total = cum[-1]
+    last = len(values) - 1
+
+    def choose(rng, now):
+        return values[min(bisect.bisect_right(cum, rng.random() * total), last)]
+    return choose
+
+
+def _gen_enum(spec):
+    values = spec.get("values")
+    if not values or not isinstance(values, list):
+        raise TemplateError("enum generator needs a non-empty 'values' list")
+    weights = spec.get("weights")
+    if weights is None:
+        return lambda rng, now: rng.choice(values)
+    if not isinstance(weights, list):
+        raise TemplateError(f"enum 'weights' must be a list, not {weights!r}")
+    if len(weights) != len(values):
+        raise TemplateError("enum 'weights' must match 'values' in length")
+    return _weighted_choice(values, _cumulative(weights))
+
+
+def _gen_zipf(spec):
+    values = spec.get("values")
+    if values is None:
+        n = _param(spec, "n", 0, int)
+        if n <= 0:
+            raise TemplateError("zipf generator needs 'values' or a positive 'n'")
+        values = list(range(1, n + 1))
+    s = _param(spec, "s", 1.0)
+    return _weighted_choice(values, _cumulative(1.0 / (rank ** s) for rank in range(1, len(values) + 1)))
+
+
+def _gen_int(spec):
+    lo, hi = _param(spec, "min", 0, int), _param(spec, "max", 100, int)
+    if lo > hi:
+        raise TemplateError("int generator needs min <= max")
+    return lambda rng, now: rng.randint(lo, hi)
+
+
+def _gen_timestamp(spec):
+    fmt = spec.get("format", "iso")
+    if fmt == "iso":
+        return lambda rng, now: (now or datetime.now(timezone.utc)).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+    if fmt == "epoch_ms":
+        return lambda rng, now: int((now or datetime.now(timezone.utc)).timestamp() * 1000)
+    if fmt == "epoch_us":
+        return lambda rng, now: int((now or datetime.now(timezone.utc)).timestamp() * 1_000_000)
+    return lambda rng, now: (now or datetime.now(timezone.utc)).strftime(fmt)
+
+
+def _gen_message(spec):
+    from .messages import FAMILIES, LEVELS, MessageGenerator
+    levels = spec.get("levels")
+    if levels:
+        if not isinstance(levels, dict):
+            raise TemplateError("message 'levels' must map levels to weights")
+        unknown = [level for level in levels if level not in FAMILIES]
+        if unknown:
+            raise TemplateError(f"unknown message level {unknown[0]!r} (expected one of {', '.join(FAMILIES)})")
+        _cumulative(levels.values())
+        # Run with the weights as validated, so "70" behaves like 70.
+        levels = tuple(zip(levels, map(float, levels.values())))
+    generator = MessageGenerator(stack_trace_rate=_param(spec, "stack_trace_rate", 0.01),
+                                 levels=levels or LEVELS)
+    if spec.get("with_level", True):
+        def message(rng, now):
+            level, text = generator.message(rng)
+            return f"{level} {text}"
+        return message
+    return lambda rng, now: generator.message(rng)[1]
+
+
+GENERATORS = {
+    "uuid": _gen_uuid,
+    "hex": _gen_hex,
+    "enum": _gen_enum,
+    "zipf": _gen_zipf,
+    "int": _gen_int,
+    "timestamp": _gen_timestamp,
+    "message": _gen_message,
+}
+
+
+def _placeholders(text):
+    """Names referenced by `{name}` in text; raises on format specs/positional refs."""
+    names = []
+    try:
+        parsed = list(string.Formatter().parse(text))
+    except ValueError as e:
+        raise TemplateError(f"bad interpolation in {text!r}: {e}")
+    for _, name, fmt_spec, conversion in parsed:
+        if name is None:
+            continue
+        if not name or fmt_spec or conversion:
+            raise TemplateError(f"only plain {{name}} placeholders are supported: {text!r}")
+        names.append(name)
+    return names
+
+
+class _Compiler:
+    def __init__(self):
+        self.consts = {}
+        self.var_of = {}      # template name -> local variable holding its value
+        self.pending = {}     # template name -> raw spec, not yet emitted
+        self.visiting = set()
+        self.lines = []
+        self._ids = itertools.count()
+
+    def const(self, value):
+        name = f"_c{next(self._ids)}"
+        self.consts[name] = value
+        return name
+
+    def declare(self, specs, prefix=""):
+        for key, spec in specs.items():
+            name = prefix + key
+            if name in self.pending or name == "log_id":
+                raise TemplateError(f"duplicate field or var name {name!r}")
+            self.pending[name] = spec
+            # Nested objects declare their children under "parent.child" names.
+            if isinstance(spec, dict) and "gen" not in spec:
+                self.declare(spec, prefix=name + ".")
+
+    def value(self, name):
+        """Local variable for a named field/var, emitting its code on first use."""
+        if name == "log_id":
+            return "log_id"
+        if name in self.var_of:
+            return self.var_of[name]
+        if name not in self.pending:
+            raise TemplateError(f"unknown placeholder {{{name}}}")
+        if name in self.visiting:
+            raise TemplateError(f"placeholder cycle through {name!r}")
+        self.visiting.add(name)
+        expr = self.expr(self.pending[name], name)
+        self.visiting.discard(name)
+        if expr in self.consts:
+            # Static values are referenced directly instead of copied into a local.
+            self.var_of[name] = expr
+            return expr
+        local = f"_v{next(self._ids)}"
+        self.lines.append(f"    {local} = {expr}")
+        self.var_of[name] = local
+        return local
+
+    def expr(self, spec, name):
+        if isinstance(spec, dict) and "gen" in spec:
+            factory = GENERATORS.get(spec["gen"])
+            if factory is None:
+                raise TemplateError(f"{name}: unknown generator {spec['gen']!r} "
+                                    f"(expected one of {', '.join(sorted(GENERATORS))})")
+            return self.const(factory(spec)) + "(rng, now)"
+        if isinstance(spec, dict):
+            items = ", ".join(f"{key!r}: {self.value(name + '.' + key)}" for key in spec)
+            return "{" + items + "}"
+        if isinstance(spec, str):
+            names = _placeholders(spec)
+            if not names:
+                return self.const(spec.format())
+            # Re-number the placeholders positionally so the format call needs no kwargs.
+            positional = iter(range(len(names)))
+            fmt = string.Formatter()
+            pieces = []
+            for literal, field, _, _ in fmt.parse(spec):
+                pieces.append(literal.replace("{", "{{").replace("}", "}}"))
+                if field is not None:
+                    pieces.append("{%d}" % next(positional))
+            args = ", ".join(self.value(n) for n in names)
+            return f"{self.const(''.join(pieces))}.format({args})"
+        return self.const(spec)
+
+
+def compile_template(template):
+    """Compile a parsed template into a `make_record(log_id, rng=random, now=None) -> dict` function."""
+    if not isinstance(template, dict) or not isinstance(template.get("fields"), dict):
+        raise TemplateError("template must be an object with a 'fields' object")
+    compiler = _Compiler()
+    compiler.declare(template.get("vars", {}))
+    fields = template["fields"]
+    compiler.declare(fields)
+
+    items = ", ".join(f"{key!r}: {compiler.value(key)}" for key in fields)
+    source = "\n".join(["def make_record(log_id, rng=_random, now=None):", *compiler.lines,
+                        f"    return {{{items}}}"])
+    namespace = dict(compiler.consts, _random=random)
+    exec(compile(source, "<template>", "exec"), namespace)
+    make_record = namespace["make_record"]
+    make_record.source = source
+    return make_record
+
+
+def load_template(path):
+    with open(path) as f:
+        try:
+            template = json.load(f)
+        except json.JSONDecodeError as e:
+            raise TemplateError(f"{path}: {e}")
+    return compile_template(template)
@@ -0,0 +1,256 @@
+"""HTTP client backends behind HttpSender.
+
+A transport POSTs one body and returns the response status (0 when there
+was no response), keeping connections alive between calls:
+
+    requests    a `requests.Session` per thread (the default)
+    urllib3     one shared `urllib3.PoolManager`, without the requests layer
+    http.client a stdlib `HTTPConnection` per thread and host
+    asyncio     one event loop thread running a minimal HTTP/1.1 client on
+                asyncio streams; callers block on the result, so the loop
+                does all socket I/O while the workers only encode
+
+A request is resent (once) only when a kept-alive connection turns out to
+have been closed by the server before the request reached it; never after
+a timeout, which may come after the server took the batch.
+
+`asyncio` copies each body before handing it to the loop, because the
+caller's pooled buffer is reused as soon as `post` returns.
+"""
+import asyncio
+import http.client
+import socket
+import threading
+from urllib.parse import urlsplit
+
+import requests
+
+TRANSPORTS = ("requests", "urllib3", "http.client", "asyncio")
+
+
+class RequestsTransport:
+    name = "requests"
+
+    def __init__(self, timeout=30.0, connections=10):
+        self.timeout = timeout
+        self._local = threading.local()
+        self._sessions = []
+        self._lock = threading.Lock()
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            with self._lock:
+                self._sessions.append(session)
+        return session
+
+    def post(self, url, headers, body):
+        try:
+            return self._session().post(url, headers=headers, data=body, timeout=self.timeout).status_code
+        except requests.RequestException:
+            return 0
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions:
+                session.close()
+            self._sessions = []
+
+
+class Urllib3Transport:
+    name = "urllib3"
+
+    def __init__(self, timeout=30.0, connections=10):
+        import urllib3
+        self._errors = urllib3.exceptions.HTTPError
+        self.pool = urllib3.PoolManager(num_pools=16, maxsize=connections, retries=False,
+                                        timeout=urllib3.Timeout(total=timeout))
+
+    def post(self, url, headers, body):
+        try:
+            return self.pool.request("POST", url, body=body, headers=headers).status
+        except self._errors:
+            return 0
+
+    def close(self):
+        self.pool.clear()
+
+
+class HttpClientTransport:
+    name = "http.client"
+
+    def __init__(self, timeout=30.0, connections=10):
+        self.timeout = timeout
+        self._local = threading.local()
+        self._all = []
+        self._lock = threading.Lock()
+
+    def _connection(self, scheme, netloc):
+        conns = getattr(self._local, "conns", None)
+        if conns is None:
+            conns = self._local.conns = {}
+        conn = conns.get((scheme, netloc))
+        if conn is None:
+            cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            conn = conns[(scheme, netloc)] = cls(netloc, timeout=self.timeout)
+            with self._lock:
+                self._all.append(conn)
+        return conn
+
+    def post(self, url, headers, body):
+        parts = urlsplit(url)
+        path = parts.path + ("?" + parts.query if parts.query else "")
+        conn = self._connection(parts.scheme, parts.netloc)
+        reused = conn.sock is not None
+        while True:
+            sending = True
+            try:
+                if conn.sock is None:
+                    # Headers and a memoryview body go out as two writes; don't let Nagle hold the second.
+                    conn.connect()
+                    conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                conn.request("POST", path, body=body, headers=headers)
+                sending = False
+                res = conn.getresponse()
+                res.read()
+                return res.status
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                if not (reused and _stale(e, sending)):
+                    return 0
+                reused = False      # retry once, on a new connection
+
+    def close(self):
+        with self._lock:
+            for conn in self._all:
+                conn.close()
+            self._all = []
+
+
+class AsyncioTransport:
+    name = "asyncio"
+
+    def __init__(self, timeout=30.0, connections=10):
+        self.timeout = timeout
+        self.connections = connections
+        self.loop = asyncio.new_event_loop()
+        self._idle = {}     # (scheme, host, port) -> [(reader, writer)]
+        self._thread = threading.Thread(target=self.loop.run_forever, name="asyncio-transport", daemon=True)
+        self._thread.start()
+
+    def post(self, url, headers, body):
+        future = asyncio.run_coroutine_threadsafe(self._post(url, headers, bytes(body)), self.loop)
+        try:
+            return future.result()
+        except (OSError, asyncio.TimeoutError, ValueError, EOFError):
+            return 0
+
+    async def _post(self, url, headers, body):
+        parts = urlsplit(url)
+        https = parts.scheme == "https"
+        key = (parts.scheme, parts.hostname, parts.port or (443 if https else 80))
+        path = parts.path + ("?" + parts.query if parts.query else "")
+        head = [f"POST {path} HTTP/1.1", f"Host: {parts.netloc}", f"Content-Length: {len(body)}"]
+        head += [f"{name}: {value}" for name, value in headers.items()]
+        request = ("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body
+        idle = self._idle.setdefault(key, [])
+        deadline = self.loop.time() + self.timeout
+        retried = False
+        while True:
+            reused = bool(idle) and not retried
+            if reused:
+                reader, writer = idle.pop()
+            else:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(key[1], key[2], ssl=https or None), deadline - self.loop.time())
+            try:
+                writer.write(request)
+                status_line = await asyncio.wait_for(reader.readuntil(b"\r\n"), deadline - self.loop.time())
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                writer.close()
+                # Closed by the server while idle, before a byte of response: retry once on a new connection.
+                if reused and not getattr(e, "partial", b""):
+                    retried = True
+                    continue
+                raise EOFError(str(e))
+            except BaseException:
+                writer.close()
+                raise
+            try:
+                status, keep_alive = await asyncio.wait_for(_read_response(reader, status_line),
+                                                            deadline - self.loop.time())
+            except BaseException:
+                writer.close()
+                raise
+            if keep_alive and len(idle) < self.connections:
+                idle.append((reader, writer))
+            else:
+                writer.close()
+            return status
+
+    def close(self):
+        async def shutdown():
+            for idle in self._idle.values():
+                for _, writer in idle:
+                    writer.close()
+            self._idle = {}
+        asyncio.run_coroutine_threadsafe(shutdown(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+
+def _stale(error, sending):
+    """Whether a failed request on a kept-alive connection never reached the server, so resending is safe.
+
+    That is the server having closed the connection while it was idle: the
+    write fails, or the connection ends before a byte of response. A
+    timeout, or any failure once the response started, may come after the
+    server took the request, and is not retried.
+    """
+    return isinstance(error, http.client.RemoteDisconnected) or (sending and isinstance(error, ConnectionError))
+
+
+async def _read_response(reader, status_line):
+    """(status, keep_alive) after reading the rest of an HTTP/1.1 response."""
+    status = int(status_line.split(b" ", 2)[1])
+    length = None
+    chunked = False
+    keep_alive = not status_line.startswith(b"HTTP/1.0")
+    while True:
+        line = await reader.readuntil(b"\r\n")
+        if line == b"\r\n":
+            break
+        name, _, value = line.partition(b":")
+        name = name.strip().lower()
+        value = value.strip().lower()
+        if name == b"content-length":
+            length = int(value)
+        elif name == b"transfer-encoding":
+            chunked = b"chunked" in value
+        elif name == b"connection":
+            keep_alive = value == b"keep-alive" or (keep_alive and value != b"close")
+    if status < 200:
+        # An interim response (100 Continue): bodyless, the final one follows.
+        return await _read_response(reader, await reader.readuntil(b"\r\n"))
+    if status in (204, 304):
+        pass    # no body, whatever the headers say
+    elif chunked:
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif length is not None:
+        await reader.readexactly(length)
+    else:
+        await reader.read()
+        keep_alive = False
+    return status, keep_alive
+
+
+def make_transport(name, timeout=30.0, connections=10):
+    """A transport by name (see TRANSPORTS); `connections` sizes the shared pools."""
+    classes = {cls.name: cls for cls in (RequestsTransport, Urllib3Transport, HttpClientTransport, AsyncioTransport)}
+    return classes[name](timeout=timeout, connections=connections)
@@ -1,85 +1,797 @@
-import base64, json
-import requests
-from datetime import datetime, timezone
 import argparse
-import time
-import uuid
 import random
+import re
+import signal
+import sys
+import threading
+from urllib.parse import urlparse
 
-# Parse command line arguments
-parser = argparse.ArgumentParser(description='Send multiple logs to OpenObserve')
-parser.add_argument('--host', type=str, default='https://openobserve-ingester.example.com', help='OpenObserve host')
-parser.add_argument('--org', type=str, default='default', help='OpenObserve organization')
-parser.add_argument('--stream', type=str, default='quickstart1', help='OpenObserve stream')
-parser.add_argument('--user', type=str, default='root@example.com', help='OpenObserve user')
-parser.add_argument('--password', type=str, default='xyzabc123', help='OpenObserve password')
-
-parser.add_argument('num_logs', type=int, help='Number of logs to send')
-parser.add_argument('--delay', type=float, default=0.0,
-                    help='Delay in seconds between log sends (default: 0.0)')
-args = parser.parse_args()
-
-# user = "admin@calanalytics.com"
-user = args.user
-# password = "oNJST18BnmzjyOQB"
-password = args.password
-bas64encoded_creds = base64.b64encode(bytes(user + ":" + password, "utf-8")).decode("utf-8")
-
-headers = {"Content-type": "application/json", "Authorization": "Basic " + bas64encoded_creds}
-# org = "default"
-org = args.org
-# stream = "quickstart1"
-stream = args.stream
-openobserve_host = args.host
-openobserve_url = openobserve_host + "/api/" + org + "/" + stream + "/_json"
-
-print(f"Sending {args.num_logs} logs to OpenObserve...")
-
-for i in range(args.num_logs):
-    # Generate fresh UTC timestamp for each log
-    current_timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
-
-    # Generate unique identifiers for each log
-    unique_pod_id = str(uuid.uuid4())
-    unique_docker_id = ''.join(random.choices('0123456789abcdef', k=64))
-    unique_revision_hash = ''.join(random.choices('0123456789abcdef', k=16))
-    pod_instance = random.randint(1, 5)  # Random pod instance 1-5
-
-    data = [{
-        "kubernetes.annotations.kubectl.kubernetes.io/default-container": "prometheus",
-        "kubernetes.annotations.kubernetes.io/psp": "eks.privileged",
-        "kubernetes.container_hash": "quay.io/prometheus/prometheus@sha256:4748e26f9369ee7270a7cd3fb9385c1adb441c05792ce2bce2f6dd622fd91d38",
-        "kubernetes.container_image": "quay.io/prometheus/prometheus:v2.39.1",
-        "kubernetes.container_name": "prometheus",
-        "kubernetes.docker_id": unique_docker_id,
-        "kubernetes.host": "ip-10-2-50-35.us-east-2.compute.internal",
-        "kubernetes.labels.app.kubernetes.io/component": "prometheus",
-        "kubernetes.labels.app.kubernetes.io/instance": "k8s",
-        "kubernetes.labels.app.kubernetes.io/managed-by": "prometheus-operator",
-        "kubernetes.labels.app.kubernetes.io/name": "prometheus",
-        "kubernetes.labels.app.kubernetes.io/part-of": "kube-prometheus",
-        "kubernetes.labels.app.kubernetes.io/version": "2.39.1",
-        "kubernetes.labels.controller-revision-hash": f"prometheus-k8s-{unique_revision_hash}",
-        "kubernetes.labels.operator.prometheus.io/name": "k8s",
-        "kubernetes.labels.operator.prometheus.io/shard": "0",
-        "kubernetes.labels.prometheus": "k8s",
-        "kubernetes.labels.statefulset.kubernetes.io/pod-name": f"prometheus-k8s-{pod_instance}",
-        "kubernetes.namespace_name": "monitoring",
-        "kubernetes.pod_id": unique_pod_id,
-        "kubernetes.pod_name": f"prometheus-k8s-{pod_instance}",
-        "log": f"ts={current_timestamp} caller=klog.go:108 level=warn component=k8s_client_runtime func=Warningf msg=\"pkg/mod/k8s.io/client-go@v0.25.1/tools/cache/reflector.go:169: failed to list *v1.Pod: pods is forbidden: User \\\"system:serviceaccount:monitoring:prometheus-k8s\\\" cannot list resource \\\"pods\\\" in API group \\\"\\\" at the cluster scope\" log_id={i+1} unique_id={unique_pod_id[:8]}",
-        "stream": "stderr"
-    }]
-
-    res = requests.post(openobserve_url, headers=headers, data=json.dumps(data))
-
-    if res.status_code == 200:
-        print(f"Log {i+1}/{args.num_logs} sent successfully")
+from logpusher.adaptive import AimdLimit, print_limit_summary
+from logpusher.balancer import POLICIES, Balancer, print_balancer_summary, resolve_endpoints
+from logpusher.backfill import ORDERS, Backfill, parse_time, print_backfill_summary
+from logpusher.capacity import CapacitySearch, print_capacity_result
+from logpusher.dedup import Deduplicator, print_dedup_summary
+from logpusher.drain import DrainChaos, print_drain_summary
+from logpusher.phases import print_phase_summary
+from logpusher.records import prometheus_record, prometheus_record_with_messages
+from logpusher.runner import Runner, batches
+from logpusher.seeding import DEFAULT_EPOCH, Checksum, print_checksum_summary, seeded
+from logpusher.senders import HttpSender
+from logpusher.servermetrics import DEFAULT_INCLUDE, MetricsScraper, print_server_metrics_summary
+from logpusher.spool import Spool, SpoolDrainer, print_spool_summary
+from logpusher.stats import RunStats, print_summary, save_summary
+from logpusher.streaming import StreamingUpload, print_stream_summary
+from logpusher.transports import TRANSPORTS, make_transport
+
+
+def build_parser():
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(description='Send multiple logs to OpenObserve',
+                                     epilog='Use "%(prog)s compare -h" to compare two runs saved with --summary-out, '
+                                            'and "%(prog)s bench-clients -h" to benchmark the HTTP clients.')
+    parser.add_argument('--host', type=str, default='https://openobserve-ingester.example.com', help='OpenObserve host')
+    parser.add_argument('--org', type=str, default='default', help='OpenObserve organization')
+    parser.add_argument('--stream', type=str, default='quickstart1', help='OpenObserve stream')
+    parser.add_argument('--user', type=str, default='root@example.com', help='OpenObserve user')
+    parser.add_argument('--password', type=str, default='xyzabc123', help='OpenObserve password')
+
+    parser.add_argument('num_logs', type=int, nargs='?', default=None,
+                        help='Number of logs to send (not needed with --duration or --capacity-search)')
+    parser.add_argument('--delay', type=float, default=0.0,
+                        help='Delay in seconds between log sends (default: 0.0)')
+    parser.add_argument('--rate', type=float, default=None,
+                        help='Cap throughput at this many records per second')
+    parser.add_argument('--duration', type=float, default=None,
+                        help='Keep sending for this many seconds instead of a fixed number of logs')
+    parser.add_argument('--batch-size', type=int, default=1,
+                        help='Records per request (default: 1)')
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='Requests kept in flight at once (default: 1)')
+    parser.add_argument('--buffer-kb', type=int, default=1024,
+                        help='Initial size of each pooled request-body buffer (default: 1024)')
+    parser.add_argument('--template', type=str, default=None,
+                        help='JSON record template (see templates/); default is the prometheus-k8s klog record')
+    parser.add_argument('--messages', choices=['klog', 'realistic'], default='klog',
+                        help='Body of the default record: the fixed klog warning, or weighted '
+                             'production-like messages with levels and stack traces (default: klog)')
+    parser.add_argument('--stack-trace-rate', type=float, default=0.01,
+                        help='Fraction of realistic messages that carry a multi-line stack trace (default: 0.01)')
+    parser.add_argument('--quiet', action='store_true',
+                        help='Only print the run summary, not one line per request')
+    parser.add_argument('--summary-out', type=str, default=None,
+                        help='Also write the run summary, with per-window samples, as JSON to this file '
+                             '(input of the compare subcommand)')
+
+    adaptive = parser.add_argument_group('adaptive concurrency (AIMD)')
+    adaptive.add_argument('--adaptive', action='store_true',
+                          help='Grow the in-flight limit by ~1 per round trip while latency stays under '
+                               '--target-latency-ms, halve it on errors or slow responses; --concurrency '
+                               'becomes the upper bound')
+    adaptive.add_argument('--target-latency-ms', type=float, default=250.0,
+                          help='Latency above which the limit is cut (default: 250)')
+    adaptive.add_argument('--min-concurrency', type=int, default=1,
+                          help='Floor and starting point of the adaptive limit (default: 1)')
+
+    drain = parser.add_argument_group('drain chaos')
+    drain.add_argument('--drain-node', type=str, default=None,
+                       help='Ingester node to put into drain mode mid-run, addressed directly '
+                            '(e.g. http://10.0.1.23:5080), like the entrypoint.sh pre-stop hook does')
+    drain.add_argument('--drain-after', type=float, default=30.0,
+                       help='Seconds into the run to disable the node (default: 30)')
+    drain.add_argument('--drain-poll', type=float, default=2.0,
+                       help='Seconds between /node/drain_status polls (default: 2)')
+    drain.add_argument('--drain-max-wait', type=float, default=1000.0,
+                       help='Stop polling after this many seconds of draining (default: 1000, as entrypoint.sh)')
+    drain.add_argument('--drain-keep-disabled', action='store_true',
+                       help='Leave the node disabled instead of enabling it again at the end of the run')
+
+    scrape = parser.add_argument_group('server metrics')
+    scrape.add_argument('--scrape-metrics', nargs='+', default=None, metavar='URL',
+                        help='OpenObserve nodes whose Prometheus /metrics to scrape during the run, addressed '
+                             'directly (e.g. http://10.0.1.23:5080); the samples are aligned to the run windows '
+                             'and correlated with client p99')
+    scrape.add_argument('--scrape-interval', type=float, default=5.0,
+                        help='Seconds between scrapes (default: 5)')
+    scrape.add_argument('--scrape-include', type=str, default=DEFAULT_INCLUDE,
+                        help='Regex of the metric families to keep (default: memtable, WAL, pending files, '
+                             'ingest volume and request latencies)')
+    scrape.add_argument('--spike-factor', type=float, default=2.0,
+                        help='A window is a latency spike when its p99 is over this many times the median '
+                             '(default: 2)')
+
+    determinism = parser.add_argument_group('deterministic generation')
+    determinism.add_argument('--seed', type=int, default=None,
+                             help='Generate every record from (seed, log_id) with a fixed clock, so runs with '
+                                  'the same seed send identical bytes')
+    determinism.add_argument('--seed-epoch', type=str, default=None,
+                             help='Clock of seeded records: log N is stamped epoch + N ms '
+                                  '(ISO-8601, default: 2026-01-01T00:00:00Z)')
+    determinism.add_argument('--checksum', action='store_true',
+                             help='Add a content hash field to every record and report count/sum/digest '
+                                  'over the delivered records')
+    determinism.add_argument('--checksum-field', type=str, default='record_hash',
+                             help='Name of the content hash field (default: record_hash)')
+
+    backfill = parser.add_argument_group('historical backfill')
+    backfill.add_argument('--start', type=str, default=None,
+                          help='Backfill start: ISO-8601 time (UTC if no offset) or relative like now-6h, now-2d')
+    backfill.add_argument('--end', type=str, default=None,
+                          help='Backfill end (default: now)')
+    backfill.add_argument('--backfill-order', choices=ORDERS, default='partition',
+                          help='partition: ascending hour by hour; shuffled-partitions: time-contiguous '
+                               'batches in random order; random: every record at a random time '
+                               '(default: partition)')
+
+    profiling = parser.add_argument_group('profiling the pusher itself')
+    profiling.add_argument('--profile', choices=['cpu', 'sample', 'alloc'], default=None,
+                           help='cpu: cProfile (pstats + top-N report); sample: low-overhead stack sampler '
+                                '(collapsed stacks for flamegraphs); alloc: tracemalloc top-N per pipeline stage')
+    profiling.add_argument('--profile-out', type=str, default='profile',
+                           help='Directory for profile output (default: ./profile)')
+    profiling.add_argument('--profile-top', type=int, default=25,
+                           help='Entries per section in the text reports (default: 25)')
+
+    capacity = parser.add_argument_group('capacity search')
+    capacity.add_argument('--capacity-search', action='store_true',
+                          help='Ramp and bisect the rate to find the highest EPS that stays within the SLOs')
+    capacity.add_argument('--slo-p99-ms', type=float, default=1000.0,
+                          help='p99 latency SLO per step in ms (default: 1000)')
+    capacity.add_argument('--slo-error-rate', type=float, default=0.01,
+                          help='Maximum failed-request ratio per step (default: 0.01)')
+    capacity.add_argument('--step-seconds', type=float, default=30.0,
+                          help='Measured window per rate step (default: 30)')
+    capacity.add_argument('--warmup-seconds', type=float, default=5.0,
+                          help='Unmeasured warm-up before each step (default: 5)')
+    capacity.add_argument('--start-eps', type=float, default=1000.0,
+                          help='First rate tried (default: 1000)')
+    capacity.add_argument('--max-eps', type=float, default=1_000_000.0,
+                          help='Stop ramping at this rate (default: 1000000)')
+    capacity.add_argument('--tolerance', type=float, default=0.05,
+                          help='Stop bisecting once pass/fail rates are this close, relatively (default: 0.05)')
+
+    shipping = parser.add_argument_group('shipping real logs')
+    shipping.add_argument('--ship', nargs='+', default=None, metavar='PATH',
+                          help='Ship newline-delimited logs from these files (followed like tail -F) or '
+                               'from stdin ("-") instead of generating records')
+    shipping.add_argument('--checkpoint', type=str, default='logpusher-offsets.json',
+                          help='File keeping the delivered read positions across restarts '
+                               '(default: logpusher-offsets.json)')
+    shipping.add_argument('--from-end', action='store_true',
+                          help='Start files without a checkpoint at their end instead of their start')
+    shipping.add_argument('--no-follow', action='store_true',
+                          help='Exit once the files are read to the end')
+    shipping.add_argument('--flush-interval', type=float, default=1.0,
+                          help='Send a partial batch once its oldest line (or syslog message) waited this long '
+                               '(default: 1)')
+
+    syslog = parser.add_argument_group('syslog listener')
+    syslog.add_argument('--syslog', type=str, default=None, metavar='[HOST:]PORT',
+                        help='Listen for RFC 3164/5424 syslog on this address and forward the messages instead '
+                             'of generating records')
+    syslog.add_argument('--syslog-protocol', choices=['udp', 'tcp', 'both'], default='both',
+                        help='Transports to listen on (default: both)')
+    syslog.add_argument('--syslog-queue', type=int, default=100_000,
+                        help='Messages held while ingest catches up; more are dropped (default: 100000)')
+    syslog.add_argument('--syslog-rcvbuf-mb', type=int, default=16,
+                        help='UDP socket receive buffer, to ride out bursts (default: 16)')
+
+    results = parser.add_argument_group('results database')
+    results.add_argument('--results-db', type=str, default=None, metavar='DSN',
+                         help='Also store the run summary and its per-window series in PostgreSQL, e.g. '
+                              '"postgresql://user:pass@db:5432/loadtests" (needs psycopg2)')
+    results.add_argument('--image-tag', type=str, default=None,
+                         help='OpenObserve image tag under test, stored with the results')
+    results.add_argument('--task-size', type=str, default=None,
+                         help='Ingester task size under test (e.g. 4vCPU/8GB), stored with the results')
+
+    dedup = parser.add_argument_group('sampling and dedup')
+    dedup.add_argument('--dedup', choices=['approx', 'exact'], default=None,
+                       help='Suppress repeats of the same message within a window before batching, counting '
+                            'them in a count-min sketch (approx) or a dict (exact)')
+    dedup.add_argument('--dedup-field', type=str, default='log',
+                       help='Field whose text (digits ignored) identifies a message (default: log)')
+    dedup.add_argument('--dedup-window', type=float, default=60.0,
+                       help='Seconds per dedup window; suppressed counts are sent when it closes (default: 60)')
+    dedup.add_argument('--dedup-keep', type=int, default=1,
+                       help='Records of each message sent per window before suppressing (default: 1)')
+    dedup.add_argument('--sample-rate', type=float, default=0.0,
+                       help='Probability that a repeat past --dedup-keep is sent anyway (default: 0)')
+    dedup.add_argument('--sketch-width', type=int, default=65536,
+                       help='Counters per count-min row with --dedup approx (default: 65536)')
+    dedup.add_argument('--dedup-max-summaries', type=int, default=1000,
+                       help='Messages per window that get a summary record of their own; suppressed repeats of '
+                            'any others share one generic summary record (default: 1000)')
+
+    queries = parser.add_argument_group('query load')
+    queries.add_argument('--query-load', action='store_true',
+                         help='Run _search queries for --duration seconds instead of ingesting, with up to '
+                              '--concurrency in flight')
+    queries.add_argument('--mixed', action='store_true',
+                         help='Run the query load alongside ingest for --duration seconds and report how '
+                              'write throughput and query latency move together')
+    queries.add_argument('--qps', type=float, default=5.0,
+                         help='Target queries per second (default: 5)')
+    queries.add_argument('--query-mix', type=str, default=None,
+                         help='JSON list of query classes (name, sql, weight, size); default: full-text, '
+                              'aggregation, histogram and range-scan queries over the klog records')
+    queries.add_argument('--query-range', type=float, default=900.0,
+                         help='Seconds back from now that every query covers (default: 900)')
+    queries.add_argument('--query-concurrency', type=int, default=None,
+                         help='Queries kept in flight at once (default: --concurrency)')
+    queries.add_argument('--mixed-report', type=float, default=10.0,
+                         help='Seconds per row of the --mixed interference table (default: 10)')
+
+    dashboards = parser.add_argument_group('dashboard refresh simulation')
+    dashboards.add_argument('--dashboard-users', type=int, default=0, metavar='N',
+                            help='Simulate N UI users refreshing a dashboard for --duration seconds instead '
+                                 'of ingesting')
+    dashboards.add_argument('--dashboard', type=str, default=None,
+                            help='Dashboard JSON (title, panels with name/sql/range/size); default: a '
+                                 'five-panel overview of the klog records')
+    dashboards.add_argument('--refresh', type=float, default=30.0,
+                            help='Seconds between a user\'s dashboard loads (default: 30)')
+    dashboards.add_argument('--refresh-jitter', type=float, default=0.1,
+                            help='Random +/- fraction of the refresh interval (default: 0.1)')
+    dashboards.add_argument('--browser-connections', type=int, default=6,
+                            help='Panel queries a user runs in parallel, like a browser\'s '
+                                 'per-host connection limit (default: 6)')
+    dashboards.add_argument('--users-ramp', type=float, default=0.0,
+                            help='Spread user start times over this many seconds (default: 0, all at once)')
+
+    streaming = parser.add_argument_group('streaming upload')
+    streaming.add_argument('--stream-upload', action='store_true',
+                           help='Send num_logs records (or --stream-mb) as one chunked request body, '
+                                'generated while it is sent, and report the time to accept')
+    streaming.add_argument('--stream-mb', type=float, default=None,
+                           help='Size the streamed body to about this many MiB instead of num_logs')
+    streaming.add_argument('--stream-chunk-kb', type=int, default=64,
+                           help='Chunk size of the streamed body (default: 64)')
+
+    balancing = parser.add_argument_group('client-side load balancing')
+    balancing.add_argument('--endpoint', action='append', default=None, metavar='URL',
+                           help='Ingester endpoint to send to instead of --host; repeat to balance across several')
+    balancing.add_argument('--resolve-dns', action='store_true',
+                           help='Expand each endpoint (or --host) into one endpoint per DNS A record')
+    balancing.add_argument('--balance', choices=POLICIES, default='round-robin',
+                           help='Endpoint choice: round-robin, least-outstanding or p2c (power of two choices) '
+                                '(default: round-robin)')
+    balancing.add_argument('--eject-after', type=int, default=3,
+                           help='Eject an endpoint after this many consecutive retryable failures (default: 3)')
+    balancing.add_argument('--eject-seconds', type=float, default=10.0,
+                           help='First ejection time, doubled on repeated ejections (default: 10)')
+
+    phases = parser.add_argument_group('connection phase timing')
+    phases.add_argument('--phase-sample', type=int, default=0, metavar='N',
+                        help='Time DNS/connect/TLS/send/TTFB/transfer separately for every Nth HTTP '
+                             'request (1 = all requests; default: off)')
+    phases.add_argument('--phase-fresh', action='store_true',
+                        help='Open a new connection for every sampled request instead of keeping it alive')
+
+    spool = parser.add_argument_group('spool')
+    spool.add_argument('--spool-dir', type=str, default=None,
+                       help='Spool batches that fail with a retryable error to this directory and '
+                            're-send them in order once the endpoint recovers')
+    spool.add_argument('--spool-max-mb', type=int, default=1024,
+                       help='Block generation once this much data is spooled (default: 1024)')
+    spool.add_argument('--spool-segment-mb', type=int, default=64,
+                       help='Size of each spool segment file (default: 64)')
+    spool.add_argument('--spool-drain-timeout', type=float, default=300.0,
+                       help='Seconds to keep draining after generation finishes (default: 300)')
+
+    grpc = parser.add_argument_group('transports')
+    grpc.add_argument('--transport', choices=['http', 'firehose', 'grpc'], default='http',
+                      help='Send over the HTTP _json API, the Kinesis Firehose endpoint (/aws/.../_kinesis_firehose) '
+                           'or the ingester gRPC port (default: http)')
+    grpc.add_argument('--http-client', choices=TRANSPORTS, default='requests',
+                      help='HTTP client library for the http and firehose transports (default: requests)')
+    grpc.add_argument('--grpc-addr', type=str, default=None,
+                      help='host:port of ZO_GRPC_PORT (default: --host hostname on port 5081)')
+    grpc.add_argument('--grpc-token', type=str, default=None,
+                      help='Authorization metadata value, e.g. the cluster internal gRPC token '
+                           '(default: basic auth from --user/--password)')
+    grpc.add_argument('--grpc-tls', action='store_true', help='Use TLS on the gRPC channel')
+    return parser
+
+
+def make_balancer(args, parser):
+    if not args.endpoint and not args.resolve_dns:
+        return None
+    if args.transport == 'grpc':
+        parser.error("--endpoint/--resolve-dns are only available with --transport http or firehose")
+    if args.phase_sample:
+        parser.error("--phase-sample cannot be combined with --endpoint/--resolve-dns")
+    urls = args.endpoint or [args.host]
+    if args.resolve_dns:
+        if any(urlparse(url).scheme == 'https' for url in urls):
+            parser.error("--resolve-dns needs http:// endpoints (certificates do not cover the addresses)")
+        try:
+            urls = resolve_endpoints(urls)
+        except OSError as e:
+            parser.error(f"--resolve-dns: {e}")
+    return Balancer(urls, policy=args.balance, eject_after=args.eject_after, eject_seconds=args.eject_seconds)
+
+
+def make_sender(args, balancer=None):
+    if args.transport == 'grpc':
+        from logpusher.grpc_ingest import GrpcSender
+        target = args.grpc_addr or f"{urlparse(args.host).hostname}:5081"
+        return GrpcSender(target, args.org, args.stream, args.user, args.password,
+                          token=args.grpc_token, tls=args.grpc_tls)
+    if args.transport == 'firehose':
+        from logpusher.firehose import FirehoseSender
+        return FirehoseSender(args.host, args.org, args.stream, args.user, args.password,
+                              phase_sample=args.phase_sample, phase_fresh=args.phase_fresh, balancer=balancer,
+                              transport=make_transport(args.http_client, connections=args.concurrency))
+    return HttpSender(args.host, args.org, args.stream, args.user, args.password,
+                      phase_sample=args.phase_sample, phase_fresh=args.phase_fresh, balancer=balancer,
+                      transport=make_transport(args.http_client, connections=args.concurrency))
+
+
+def run_key(args):
+    """What a stored run is compared by: the image and task size under test and the workload's hash."""
+    from logpusher.resultsdb import config_hash, run_config
+    return {"image_tag": args.image_tag, "task_size": args.task_size, "config_hash": config_hash(run_config(args))}
+
+
+def make_dedup(args, parser, checksum=None):
+    if not args.dedup:
+        return None
+    if not 0.0 <= args.sample_rate <= 1.0:
+        parser.error("--sample-rate is a probability between 0 and 1")
+    if args.dedup_window <= 0 or args.dedup_keep < 0 or args.sketch_width < 1 or args.dedup_max_summaries < 0:
+        parser.error("--dedup-window and --sketch-width must be positive and --dedup-keep and "
+                     "--dedup-max-summaries not negative")
+    return Deduplicator(field=args.dedup_field, window=args.dedup_window, keep=args.dedup_keep,
+                        sample_rate=args.sample_rate, mode=args.dedup, width=args.sketch_width,
+                        max_summaries=args.dedup_max_summaries,
+                        rng=random.Random(args.seed) if args.seed is not None else random,
+                        stamp=checksum.stamp if checksum is not None else None)
+
+
+def make_record_source(args, parser):
+    if args.template:
+        from logpusher.templates import TemplateError, load_template
+        try:
+            return load_template(args.template)
+        except (OSError, TemplateError) as e:
+            parser.error(f"--template: {e}")
+    if args.messages == 'realistic':
+        from logpusher.messages import MessageGenerator
+        return prometheus_record_with_messages(MessageGenerator(stack_trace_rate=args.stack_trace_rate))
+    return prometheus_record
+
+
+def run_capacity_search(args, make_record, balancer=None):
+    sender = make_sender(args, balancer)
+    runner = Runner(sender, RunStats(), batch_size=args.batch_size, concurrency=args.concurrency,
+                    verbose=False, buffer_bytes=args.buffer_kb * 1024)
+    search = CapacitySearch(runner, make_record, p99_slo_ms=args.slo_p99_ms, max_error_rate=args.slo_error_rate,
+                            step_seconds=args.step_seconds, warmup_seconds=args.warmup_seconds,
+                            start_eps=args.start_eps, max_eps=args.max_eps, tolerance=args.tolerance)
+    print(f"Searching for the maximum sustainable rate of {args.host} ({sender.name})...")
+    try:
+        result = search.search()
+    finally:
+        sender.close()
+    print_capacity_result(result)
+    if balancer is not None:
+        print_balancer_summary(balancer.summary())
+    return result
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ['compare']:
+        from logpusher.compare import compare_main
+        return compare_main(argv[1:])
+    if argv[:1] == ['bench-clients']:
+        from logpusher.clientbench import bench_main
+        return bench_main(argv[1:])
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.profile:
+        from logpusher.profiling import Profiling
+        with Profiling(args.profile, out_dir=args.profile_out, top=args.profile_top):
+            return run(args, parser)
+    return run(args, parser)
+
+
+def run_stream_upload(args, make_record):
+    sender = make_sender(args)
+    upload = StreamingUpload(sender.url, sender.headers, chunk_bytes=args.stream_chunk_kb * 1024)
+    size = f"{args.stream_mb:.0f} MiB" if args.stream_mb else f"{args.num_logs} logs"
+    print(f"Streaming {size} to OpenObserve in one request...")
+    summary = upload.run(make_record, num_records=args.num_logs,
+                         max_bytes=int(args.stream_mb * 1024 * 1024) if args.stream_mb else None)
+    print_stream_summary(summary)
+
+
+def make_query_load(args, parser, stats=None):
+    from logpusher.queries import DEFAULT_MIX, QueryLoad, load_mix
+    if args.qps <= 0:
+        parser.error("--qps must be positive")
+    if args.query_concurrency is not None and args.query_concurrency <= 0:
+        parser.error("--query-concurrency must be positive")
+    mix = DEFAULT_MIX
+    if args.query_mix:
+        try:
+            mix = load_mix(args.query_mix)
+        except (OSError, ValueError) as e:
+            parser.error(f"--query-mix: {e}")
+    return QueryLoad(args.host, args.org, args.stream, args.user, args.password, mix=mix, qps=args.qps,
+                     concurrency=args.query_concurrency or args.concurrency, range_seconds=args.query_range,
+                     stats=stats)
+
+
+def run_query_load(args, parser):
+    from logpusher.queries import print_query_summary
+    if args.duration is None:
+        parser.error("--query-load needs --duration")
+    load = make_query_load(args, parser)
+    print(f"Querying {args.stream} at {args.qps:g} QPS for {args.duration:.0f}s...")
+    load.run(args.duration)
+    print_query_summary(load.summary())
+
+
+def run_dashboards(args, parser):
+    from logpusher.dashboards import DEFAULT_DASHBOARD, DashboardSimulation, load_dashboard, print_dashboard_summary
+    if args.duration is None:
+        parser.error("--dashboard-users needs --duration")
+    dashboard = DEFAULT_DASHBOARD
+    if args.dashboard:
+        try:
+            dashboard = load_dashboard(args.dashboard)
+        except (OSError, ValueError) as e:
+            parser.error(f"--dashboard: {e}")
+    try:
+        simulation = DashboardSimulation(args.host, args.org, args.stream, args.user, args.password,
+                                         dashboard=dashboard, users=args.dashboard_users, refresh=args.refresh,
+                                         jitter=args.refresh_jitter, connections=args.browser_connections,
+                                         ramp=args.users_ramp)
+    except ValueError as e:
+        parser.error(f"--dashboard: {e}")
+    print(f"Simulating {args.dashboard_users} users on '{simulation.title}' for {args.duration:.0f}s...")
+    simulation.run(args.duration)
+    print_dashboard_summary(simulation.summary())
+
+
+def run_ship(args, parser):
+    from logpusher.tail import Checkpoints, OffsetTracker, Tailer, print_ship_summary
+    stdin = '-' in args.ship
+    if stdin and len(args.ship) > 1:
+        parser.error("--ship reads either stdin (-) or files, not both")
+    if args.num_logs is not None or args.capacity_search:
+        parser.error("--ship sends the given logs; it takes neither num_logs nor --capacity-search")
+    try:
+        checkpoints = Checkpoints(None if stdin else args.checkpoint)
+    except (OSError, ValueError) as e:
+        parser.error(f"--checkpoint: {e}")
+    tailer = Tailer(args.ship, checkpoints, from_end=args.from_end, follow=not args.no_follow,
+                    flush_interval=args.flush_interval)
+    tracker = OffsetTracker(checkpoints)
+    dedup = make_dedup(args, parser)
+    balancer = make_balancer(args, parser)
+    sender = make_sender(args, balancer)
+    stats = RunStats()
+    spool = drainer = None
+    if args.spool_dir:
+        spool = Spool(args.spool_dir, segment_bytes=args.spool_segment_mb * 1024 * 1024,
+                      max_bytes=args.spool_max_mb * 1024 * 1024)
+        drainer = SpoolDrainer(spool, sender, stats)
+        drainer.start()
+    runner = Runner(sender, stats, batch_size=args.batch_size, concurrency=args.concurrency,
+                    delay=args.delay, verbose=not args.quiet, spool=spool, buffer_bytes=args.buffer_kb * 1024,
+                    rate=args.rate, retry=True, on_done=tracker.done)
+
+    print(f"Shipping {'stdin' if stdin else ', '.join(args.ship)} to OpenObserve...")
+    # The tailer waits for new lines, so stopping (--duration, SIGTERM) has to wake it up. SIGTERM also
+    # gives up on batches retrying through an outage; they stay past the checkpoint and are read again.
+    signal.signal(signal.SIGTERM, lambda signum, frame: (tailer.stop(), runner.stop()))
+    timer = None
+    if args.duration is not None:
+        timer = threading.Timer(args.duration, tailer.stop)
+        timer.daemon = True
+        timer.start()
+    try:
+        source = tailer.batches(args.batch_size, tracker)
+        runner.run(None, None, source=dedup.apply(source) if dedup is not None else source)
+        if spool is not None and spool.pending():
+            print(f"Draining spool (up to {args.spool_drain_timeout:.0f}s)...")
+            spool.wait_empty(args.spool_drain_timeout)
+    except KeyboardInterrupt:
+        # In-flight batches were settled when the worker pool shut down.
+        print("Interrupted; saving the checkpoint.")
+    finally:
+        if timer is not None:
+            timer.cancel()
+        stats.finish()
+        tracker.close()
+        tailer.close()
+        if drainer is not None:
+            drainer.stop()
+            spool.close()
+        sender.close()
+
+    print_summary(stats.summary(), label=f"{sender.name} shipping summary")
+    print_ship_summary(tailer.summary(), dropped=tracker.dropped_records,
+                       checkpoint=None if stdin else args.checkpoint)
+    if dedup is not None:
+        print_dedup_summary(dedup.summary())
+    if balancer is not None:
+        print_balancer_summary(balancer.summary())
+    if spool is not None:
+        print_spool_summary(spool.summary())
+
+
+def run_syslog(args, parser):
+    from logpusher.syslog import SyslogListener, parse_listen, print_syslog_summary
+    if args.num_logs is not None or args.capacity_search:
+        parser.error("--syslog forwards what it receives; it takes neither num_logs nor --capacity-search")
+    try:
+        host, port = parse_listen(args.syslog)
+    except ValueError as e:
+        parser.error(f"--syslog: {e}")
+    protocols = ('udp', 'tcp') if args.syslog_protocol == 'both' else (args.syslog_protocol,)
+    listener = SyslogListener(host, port, protocols=protocols, queue_size=args.syslog_queue,
+                              rcvbuf=args.syslog_rcvbuf_mb * 1024 * 1024, flush_interval=args.flush_interval)
+    try:
+        listener.start()
+    except OSError as e:
+        parser.error(f"--syslog: cannot listen on {args.syslog}: {e}")
+    dedup = make_dedup(args, parser)
+    balancer = make_balancer(args, parser)
+    sender = make_sender(args, balancer)
+    stats = RunStats()
+    spool = drainer = None
+    if args.spool_dir:
+        spool = Spool(args.spool_dir, segment_bytes=args.spool_segment_mb * 1024 * 1024,
+                      max_bytes=args.spool_max_mb * 1024 * 1024)
+        drainer = SpoolDrainer(spool, sender, stats)
+        drainer.start()
+    runner = Runner(sender, stats, batch_size=args.batch_size, concurrency=args.concurrency,
+                    delay=args.delay, verbose=not args.quiet, spool=spool, buffer_bytes=args.buffer_kb * 1024,
+                    rate=args.rate, retry=True, on_done=listener.settled)
+
+    print(f"Listening for syslog on {host}:{port} ({', '.join(protocols)}), forwarding to OpenObserve...")
+    signal.signal(signal.SIGTERM, lambda signum, frame: (listener.stop(), runner.stop()))
+    timer = None
+    if args.duration is not None:
+        timer = threading.Timer(args.duration, listener.stop)
+        timer.daemon = True
+        timer.start()
+    try:
+        source = listener.batches(args.batch_size)
+        runner.run(None, None, source=dedup.apply(source) if dedup is not None else source)
+        if spool is not None and spool.pending():
+            print(f"Draining spool (up to {args.spool_drain_timeout:.0f}s)...")
+            spool.wait_empty(args.spool_drain_timeout)
+    except KeyboardInterrupt:
+        print("Interrupted.")
+    finally:
+        if timer is not None:
+            timer.cancel()
+        stats.finish()
+        listener.close()
+        if drainer is not None:
+            drainer.stop()
+            spool.close()
+        sender.close()
+
+    print_summary(stats.summary(), label=f"{sender.name} syslog forwarding summary")
+    print_syslog_summary(listener.summary())
+    if dedup is not None:
+        print_dedup_summary(dedup.summary())
+    if balancer is not None:
+        print_balancer_summary(balancer.summary())
+    if spool is not None:
+        print_spool_summary(spool.summary())
+
+
+def run(args, parser):
+    # Modes other than the main load run, which alone stores results and scrapes server metrics.
+    not_load_run = (args.ship or args.syslog or args.dashboard_users or args.query_load or args.capacity_search
+                    or args.stream_upload)
+    for option, enabled in (('--results-db', args.results_db), ('--scrape-metrics', args.scrape_metrics)):
+        if enabled and not_load_run:
+            parser.error(f"{option} only works with load runs; it cannot be combined with --ship, --syslog, "
+                         "--dashboard-users, --query-load, --capacity-search or --stream-upload")
+    if args.results_db:
+        from logpusher.resultsdb import driver
+        driver()
+    if args.scrape_metrics:
+        try:
+            re.compile(args.scrape_include)
+        except re.error as e:
+            parser.error(f"--scrape-include: {e}")
+    if args.ship and args.syslog:
+        parser.error("--ship and --syslog are separate modes; run one process for each")
+    if args.syslog:
+        return run_syslog(args, parser)
+    if args.ship:
+        return run_ship(args, parser)
+    if args.dashboard_users:
+        return run_dashboards(args, parser)
+    if args.query_load:
+        if args.mixed:
+            parser.error("--query-load only queries; use --mixed to query while ingesting")
+        return run_query_load(args, parser)
+    if args.mixed and (args.duration is None or args.num_logs is not None):
+        parser.error("--mixed runs for --duration seconds (without num_logs)")
+    make_record = make_record_source(args, parser)
+    if args.seed is not None:
+        try:
+            epoch = parse_time(args.seed_epoch) if args.seed_epoch else DEFAULT_EPOCH
+        except ValueError as e:
+            parser.error(f"--seed-epoch: {e}")
+        make_record = seeded(make_record, args.seed, epoch)
+    elif args.seed_epoch:
+        parser.error("--seed-epoch needs --seed")
+    if args.phase_sample and args.transport == 'grpc':
+        parser.error("--phase-sample is only available with --transport http or firehose")
+    if args.http_client != 'requests' and args.transport == 'grpc':
+        parser.error("--http-client applies to the http and firehose transports, not grpc")
+    if args.adaptive and args.concurrency <= args.min_concurrency:
+        parser.error("--adaptive needs --concurrency (the upper bound) above --min-concurrency")
+    balancer = make_balancer(args, parser)
+    if args.capacity_search:
+        if args.adaptive:
+            parser.error("--capacity-search cannot be combined with --adaptive")
+        if args.drain_node:
+            parser.error("--capacity-search cannot be combined with --drain-node")
+        if args.spool_dir:
+            parser.error("--capacity-search cannot be combined with --spool-dir")
+        if args.dedup:
+            parser.error("--capacity-search cannot be combined with --dedup")
+        return run_capacity_search(args, make_record, balancer)
+    if args.num_logs is None and args.duration is None and not (args.stream_upload and args.stream_mb):
+        parser.error("num_logs is required unless --duration, --stream-mb or --capacity-search is given")
+    backfill = None
+    if args.start:
+        if args.num_logs is None:
+            parser.error("--start needs num_logs to spread over the range")
+        try:
+            backfill = Backfill(parse_time(args.start), parse_time(args.end or 'now'), args.num_logs,
+                                args.batch_size, order=args.backfill_order,
+                                rng=random.Random(args.seed) if args.seed is not None else random)
+        except ValueError as e:
+            parser.error(f"--start/--end: {e}")
+        make_record = backfill.wrap(make_record)
+    elif args.end:
+        parser.error("--end needs --start")
+    if args.stream_upload:
+        if args.transport != 'http' or balancer is not None or args.spool_dir or args.dedup:
+            parser.error("--stream-upload sends one plain HTTP request to --host; it cannot be combined "
+                         "with --transport grpc/firehose, --endpoint/--resolve-dns, --spool-dir or --dedup")
+        if args.checksum or args.summary_out or args.adaptive or args.drain_node or args.mixed:
+            parser.error("--stream-upload only reports its own upload summary; it cannot be combined with "
+                         "--checksum, --summary-out, --adaptive, --drain-node or --mixed")
+        return run_stream_upload(args, make_record)
+    checksum = None
+    if args.checksum:
+        checksum = Checksum(args.checksum_field)
+        make_record = checksum.wrap(make_record)
+    dedup = make_dedup(args, parser, checksum)
+
+    query_load = query_thread = None
+    if args.mixed:
+        query_load = make_query_load(args, parser, stats=RunStats())
+
+    sender = make_sender(args, balancer)
+    stats = RunStats()
+    spool = drainer = None
+    if args.spool_dir:
+        spool = Spool(args.spool_dir, segment_bytes=args.spool_segment_mb * 1024 * 1024,
+                      max_bytes=args.spool_max_mb * 1024 * 1024)
+        drainer = SpoolDrainer(spool, sender, stats)
+        drainer.start()
+    chaos = None
+    if args.drain_node:
+        chaos = DrainChaos(args.drain_node, args.user, args.password, stats, after=args.drain_after,
+                           poll_interval=args.drain_poll, max_wait=args.drain_max_wait,
+                           reenable=not args.drain_keep_disabled)
+        chaos.start()
+    scraper = None
+    if args.scrape_metrics:
+        scraper = MetricsScraper(args.scrape_metrics, args.user, args.password, stats,
+                                 interval=args.scrape_interval, include=args.scrape_include,
+                                 spike_factor=args.spike_factor)
+        scraper.start()
+    limiter = None
+    if args.adaptive:
+        limiter = AimdLimit(args.target_latency_ms / 1000, min_limit=args.min_concurrency,
+                            max_limit=args.concurrency)
+    runner = Runner(sender, stats, batch_size=args.batch_size, concurrency=args.concurrency,
+                    delay=args.delay, verbose=not args.quiet, spool=spool,
+                    buffer_bytes=args.buffer_kb * 1024, rate=args.rate, checksum=checksum, limiter=limiter)
+
+    if args.num_logs is None:
+        print(f"Sending logs to OpenObserve for {args.duration:.0f}s...")
     else:
-        print(f"Log {i+1}/{args.num_logs} failed with status code: {res.status_code}")
+        print(f"Sending {args.num_logs} logs to OpenObserve...")
+    if query_load is not None:
+        # Same clock for both workloads, so their windows line up.
+        query_load.stats.started = stats.started
+        query_thread = threading.Thread(target=query_load.run, args=(args.duration,), name="query-load",
+                                        daemon=True)
+        query_thread.start()
+    try:
+        source = None
+        if dedup is not None:
+            source = dedup.apply(batches(args.num_logs, args.batch_size, make_record))
+        runner.run(args.num_logs, make_record, duration=args.duration, source=source)
+        if dedup is not None:
+            # A --duration run stops mid-stream, before the last window's summaries were sent.
+            rest = dedup.finish()
+            if rest:
+                runner.run(None, None, source=[(dedup.last_id + 1, dedup.last_id + len(rest), rest)])
+        if query_thread is not None:
+            query_thread.join()
+            query_load.stats.finish()
+        if spool is not None and spool.pending():
+            print(f"Draining spool (up to {args.spool_drain_timeout:.0f}s)...")
+            spool.wait_empty(args.spool_drain_timeout)
+            stats.finish()
+    finally:
+        if chaos is not None:
+            chaos.stop()
+        if scraper is not None:
+            scraper.stop()
+        if drainer is not None:
+            drainer.stop()
+            spool.close()
+        sender.close()
+
+    print(f"Finished sending {args.num_logs if args.num_logs is not None else stats.records_ok} logs!")
+    print_summary(stats.summary(), label=f"{sender.name} run summary")
+    pool = runner.pool.summary()
+    print(f"  body buffers: {pool['allocated']} allocated, {pool['reused']} reuses, {pool['grown']} grown")
+    if query_load is not None:
+        from logpusher.mixed import interference, print_interference
+        from logpusher.queries import print_query_summary
+        print_query_summary(query_load.summary())
+        print_interference(interference(stats, query_load.stats, every=args.mixed_report))
+    if balancer is not None:
+        print_balancer_summary(balancer.summary())
+    if chaos is not None:
+        print_drain_summary(chaos.summary())
+    if limiter is not None:
+        print_limit_summary(limiter.summary())
+    if backfill is not None:
+        print_backfill_summary(backfill.summary())
+    if getattr(sender, 'phases', None) is not None:
+        print_phase_summary(sender.phases.summary())
+    if spool is not None:
+        print_spool_summary(spool.summary())
+    if checksum is not None:
+        print_checksum_summary(checksum.summary(), args.stream)
+    if dedup is not None:
+        print_dedup_summary(dedup.summary())
+    server_metrics = scraper.summary() if scraper is not None else None
+    if server_metrics is not None:
+        print_server_metrics_summary(server_metrics)
+    # The same sections go to the JSON file and the results DB.
+    sections = dict(
+        adaptive=limiter.summary() if limiter is not None else None,
+        drain=chaos.summary() if chaos is not None else None,
+        endpoints=balancer.summary() if balancer is not None else None,
+        backfill=backfill.summary() if backfill is not None else None,
+        checksum=checksum.summary() if checksum is not None else None,
+        dedup=dedup.summary() if dedup is not None else None,
+        queries=query_load.summary() if query_load is not None else None,
+        server_metrics=server_metrics,
+        phases=sender.phases.summary() if getattr(sender, 'phases', None) is not None else None,
+        spool=spool.summary() if spool is not None else None,
+        run=run_key(args),
+    )
+    if args.summary_out:
+        save_summary(args.summary_out, stats.summary(), transport=sender.name, **sections)
+        print(f"Summary written to {args.summary_out}")
+    if args.results_db:
+        from logpusher.resultsdb import run_config, save_run
+        run_id = save_run(args.results_db, stats.summary(), run_config(args), image_tag=args.image_tag,
+                          task_size=args.task_size, transport=sender.name, **sections)
+        print(f"Results stored as run {run_id}")
 
-    # Add delay between requests if specified
-    if args.delay > 0 and i < args.num_logs - 1:
-        time.sleep(args.delay)
 
-print(f"Finished sending {args.num_logs} logs!")
+if __name__ == '__main__':
+    main()